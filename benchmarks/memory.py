@@ -0,0 +1,86 @@
+"""
+Memory footprint of live entities and scheduled events, compared with the layout they had before __slots__:
+an instance dict per object, a logging.Logger per entity and a keyword arguments dict per event.
+Run with: PYTHONPATH=src python benchmarks/memory.py
+"""
+import tracemalloc
+from logging import Logger
+from tepuy.intelligent_objects import Entity
+from tepuy.processes import SimEvent
+
+
+class BaselineEntity:
+    """
+    Entity as laid out before __slots__.
+    """
+    def __init__(self, name: str, creation_date: float = 0.0):
+        self.__name = name
+        self.__logger = Logger(name=name)
+        self.__available_date = None
+        self.__creation_date = creation_date
+        self.__sort_property = 1
+        self.__destination = None
+        self.__network = None
+        self.__current_node = None
+
+
+class BaselineEvent:
+    """
+    SimEvent as laid out before __slots__, its action arguments passed as keywords.
+    """
+    def __init__(self, start_date: float, end_date: float, event_name: str, action, action_kwargs: dict):
+        self.__start_date = start_date
+        self.__end_date = end_date
+        self.__sorting_feature = 'end_date'
+        self.__sorting_policy = 'smallest'
+        self.__object_dictionary = None
+        self.__action_string = None
+        self.__action = action
+        self.__action_kwargs = action_kwargs
+        self.__event_name = event_name
+
+
+def bytes_per_object(factory, n: int = 100000):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [factory(i) for i in range(n)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    # The list holding the objects is not part of their footprint.
+    allocated -= objects.__sizeof__()
+    return allocated / n
+
+
+def entity_factory(i: int):
+    return Entity(name='entity', creation_date=float(i))
+
+
+def baseline_entity_factory(i: int):
+    return BaselineEntity(name='entity', creation_date=float(i))
+
+
+def event_factory(i: int):
+    return SimEvent(start_date=float(i),
+                    end_date=float(i),
+                    event_name='created_entity',
+                    action=print,
+                    action_args=('entity', float(i), None, None, None))
+
+
+def baseline_event_factory(i: int):
+    return BaselineEvent(start_date=float(i),
+                         end_date=float(i),
+                         event_name='created_entity',
+                         action=print,
+                         action_kwargs={'entity_name': 'entity', 'creation_date': float(i), 'network': None,
+                                        'actions_queue': None, 'clock': None})
+
+
+if __name__ == '__main__':
+    for name, factory, baseline_factory in [('Entity', entity_factory, baseline_entity_factory),
+                                            ('SimEvent', event_factory, baseline_event_factory)]:
+        current = bytes_per_object(factory)
+        baseline = bytes_per_object(baseline_factory)
+        print(f'{name}: {current:.0f} bytes per live object, baseline layout {baseline:.0f} bytes, '
+              f'{current - baseline:+.0f} bytes ({current/baseline - 1:+.0%})')
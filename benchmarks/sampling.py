@@ -0,0 +1,34 @@
+"""
+Cost of one random process delay drawn from its sample buffer, compared with a plain NumPy scalar draw.
+Run with: PYTHONPATH=src python benchmarks/sampling.py
+"""
+import timeit
+import numpy as np
+from tepuy.distributions import Exponential
+from tepuy.intelligent_objects import Entity
+from tepuy.processes import DelayProcess, EmptyProcess
+
+
+def microseconds_per_call(statement, number: int = 200000, repeat: int = 5):
+    return min(timeit.repeat(statement, number=number, repeat=repeat))/number*1e6
+
+
+if __name__ == '__main__':
+    distribution = Exponential(2.0)
+    rng = np.random.default_rng(1)
+    process = EmptyProcess(name='drill', associated_object=None, context_object=None)
+    process.seed_streams(1)
+    sample_buffer = process.sample_buffer(distribution)
+    entity = Entity(name='entity')
+    random_delay = DelayProcess(name='drill_delay', duration=distribution)
+    random_delay.seed_streams(1)
+    fixed_delay = DelayProcess(name='drill_delay', duration=2.0)
+    numpy_draw = microseconds_per_call(lambda: rng.exponential(2.0))
+    buffered_draw = microseconds_per_call(sample_buffer.next)
+    random_run = microseconds_per_call(lambda: random_delay.run_process(entity=entity))
+    fixed_run = microseconds_per_call(lambda: fixed_delay.run_process(entity=entity))
+    print(f'numpy scalar draw: {numpy_draw:.2f} us per sample')
+    print(f'SampleBuffer.next: {buffered_draw:.2f} us per sample')
+    print(f'SimProcess.sample: {microseconds_per_call(lambda: process.sample(distribution)):.2f} us per sample')
+    print(f'DelayProcess.run_process: {random_run:.2f} us with a random duration, {fixed_run:.2f} us with a fixed '
+          f'one, {random_run - fixed_run:.2f} us per random draw')
@@ -0,0 +1,301 @@
+import copy
+import itertools
+import math
+from typing import Union, Iterable
+import numpy as np
+import pandas as pd
+from tepuy.clock import SimClock, SECONDS_PER_UNIT
+from tepuy.distributions import Distribution, Exponential, PiecewiseRate
+
+
+class ArrivalSource:
+    def __init__(self,
+                 datetime_column: str,
+                 name_column: Union[str, None] = None,
+                 chunksize: int = 10000,
+                 clock: Union[SimClock, None] = None):
+        """
+        Reads arrivals lazily, chunk by chunk, yielding (arrival_date, entity_name) tuples sorted by date.
+        Only one chunk is held in memory at a time.
+        :param datetime_column: column with the arrival dates.
+        :param name_column: column with the entity names. If None, names are entity_<row number>.
+        :param chunksize: number of rows converted at once.
+        :param clock: if given, arrival dates are yielded as simulation times of this clock.
+        """
+        self.__datetime_column = datetime_column
+        self.__name_column = name_column
+        self.__chunksize = chunksize
+        self.__clock = clock
+
+    def chunks(self):
+        raise NotImplementedError
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            if self.clock is None:
+                arrival_dates = pd.DatetimeIndex(pd.to_datetime(chunk[self.datetime_column])
+                                                 .to_numpy(dtype='datetime64[ns]'))
+            else:
+                arrival_dates = self.clock.to_simulation_times(chunk[self.datetime_column]).tolist()
+            if self.name_column is None:
+                entity_names = ('entity_' + chunk.index.astype(str)).to_numpy()
+            else:
+                entity_names = chunk[self.name_column].to_numpy()
+            yield from zip(arrival_dates, entity_names)
+
+    # Getters and setters
+    @property
+    def datetime_column(self):
+        return self.__datetime_column
+
+    @property
+    def name_column(self):
+        return self.__name_column
+
+    @property
+    def chunksize(self):
+        return self.__chunksize
+
+    @property
+    def clock(self):
+        return self.__clock
+
+
+class DataFrameArrivals(ArrivalSource):
+    def __init__(self,
+                 arrival_table: pd.DataFrame,
+                 datetime_column: str,
+                 name_column: Union[str, None] = None,
+                 chunksize: int = 10000,
+                 clock: Union[SimClock, None] = None):
+        super().__init__(datetime_column=datetime_column,
+                         name_column=name_column,
+                         chunksize=chunksize,
+                         clock=clock)
+        self.__arrival_table = arrival_table
+
+    def chunks(self):
+        for start in range(0, len(self.__arrival_table), self.chunksize):
+            yield self.__arrival_table.iloc[start:start + self.chunksize]
+
+
+class CsvArrivals(ArrivalSource):
+    def __init__(self,
+                 path: str,
+                 datetime_column: str,
+                 name_column: Union[str, None] = None,
+                 chunksize: int = 10000,
+                 clock: Union[SimClock, None] = None):
+        super().__init__(datetime_column=datetime_column,
+                         name_column=name_column,
+                         chunksize=chunksize,
+                         clock=clock)
+        self.__path = path
+
+    def chunks(self):
+        with pd.read_csv(self.__path, chunksize=self.chunksize) as reader:
+            yield from reader
+
+    @property
+    def path(self):
+        return self.__path
+
+
+class ParquetArrivals(ArrivalSource):
+    def __init__(self,
+                 path: str,
+                 datetime_column: str,
+                 name_column: Union[str, None] = None,
+                 chunksize: int = 10000,
+                 clock: Union[SimClock, None] = None):
+        super().__init__(datetime_column=datetime_column,
+                         name_column=name_column,
+                         chunksize=chunksize,
+                         clock=clock)
+        self.__path = path
+
+    def chunks(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('pyarrow is required to stream arrivals from parquet files.')
+        columns = [self.datetime_column] if self.name_column is None else [self.datetime_column,
+                                                                            self.name_column]
+        rows_read = 0
+        for batch in pq.ParquetFile(self.__path).iter_batches(batch_size=self.chunksize, columns=columns):
+            chunk = batch.to_pandas()
+            chunk.index = chunk.index + rows_read
+            rows_read += len(chunk)
+            yield chunk
+
+    @property
+    def path(self):
+        return self.__path
+
+
+class IterableArrivals:
+    def __init__(self, arrivals: Iterable, clock: SimClock):
+        """
+        Converts the dates of an iterable of (arrival_date, entity_name) tuples to simulation times of clock.
+        Unlike a generator it can be pickled and iterated again, as long as arrivals can.
+        """
+        self.__arrivals = arrivals
+        self.__clock = clock
+
+    def __iter__(self):
+        for arrival_date, entity_name in self.__arrivals:
+            yield self.__clock.to_simulation_time(arrival_date), entity_name
+
+    # Getters and setters
+    @property
+    def arrivals(self):
+        return self.__arrivals
+
+    @property
+    def clock(self):
+        return self.__clock
+
+
+class RateArrivals:
+    def __init__(self,
+                 arrival_rate: Union[float, Distribution, PiecewiseRate],
+                 rng: np.random.Generator,
+                 time_unit: str = 'hours',
+                 horizon: Union[float, None] = None,
+                 max_arrivals: Union[int, None] = None,
+                 block_size: int = 1024):
+        """
+        Random arrivals, yielded as (simulation time, entity_name) tuples. Arrival times are drawn block_size
+        at a time with NumPy and the next block is only drawn once the previous one is consumed.
+        :param arrival_rate: arrivals per time unit of a Poisson process, a Distribution of the inter-arrival
+        times in time units (renewal process) or a PiecewiseRate (non-homogeneous Poisson process).
+        :param rng: random generator of the stream.
+        :param time_unit: unit of rates, inter-arrival times and horizon.
+        :param horizon: no arrival after horizon time units since the model start.
+        :param max_arrivals: number of arrivals after which the stream stops.
+        """
+        if horizon is None and max_arrivals is None:
+            raise ValueError('Random arrivals need a horizon or a max_arrivals bound.')
+        if time_unit not in SECONDS_PER_UNIT:
+            raise ValueError(f'{time_unit} is not a valid time_unit. '
+                             f'Valid options are: {", ".join(SECONDS_PER_UNIT.keys())}')
+        if isinstance(arrival_rate, (int, float)):
+            arrival_rate = Exponential(mean=1/arrival_rate)
+        self.__arrival_rate = arrival_rate
+        self.__rng = rng
+        self.__time_unit = time_unit
+        self.__horizon = math.inf if horizon is None else horizon
+        self.__max_arrivals = math.inf if max_arrivals is None else max_arrivals
+        self.__block_size = block_size
+
+    def blocks(self):
+        """
+        :return: generator of arrays of arrival times, in time units since the model start.
+        """
+        # Draws from a copy, so the stream can be read again from its start, e.g. when a snapshot is restored.
+        rng = copy.deepcopy(self.__rng)
+        last_time = 0.0
+        arrivals = 0
+        while last_time < self.__horizon and arrivals < self.__max_arrivals:
+            if isinstance(self.__arrival_rate, PiecewiseRate):
+                times, last_time = self.__arrival_rate.arrival_times(rng, last_time, self.__block_size)
+            else:
+                times = last_time + np.cumsum(self.__arrival_rate.sample(rng, self.__block_size))
+                last_time = float(times[-1])
+            times = times[times <= self.__horizon]
+            if arrivals + len(times) > self.__max_arrivals:
+                times = times[:int(self.__max_arrivals - arrivals)]
+            arrivals += len(times)
+            yield times
+
+    def __iter__(self):
+        seconds_per_unit = SECONDS_PER_UNIT[self.__time_unit]
+        arrivals = 0
+        for times in self.blocks():
+            for arrival_time in (times*seconds_per_unit).tolist():
+                yield arrival_time, f'entity_{arrivals}'
+                arrivals += 1
+
+    # Getters and setters
+    @property
+    def arrival_rate(self):
+        return self.__arrival_rate
+
+    @property
+    def time_unit(self):
+        return self.__time_unit
+
+    @property
+    def horizon(self):
+        return self.__horizon
+
+    @property
+    def max_arrivals(self):
+        return self.__max_arrivals
+
+
+class ResumableArrivals:
+    def __init__(self, source: Iterable):
+        """
+        Iterator over an arrival source that can be pickled. Only the source and the number of arrivals read are
+        stored, the source is opened again and the arrivals already read are skipped when iteration resumes.
+        :param source: arrival source that can be iterated more than once, e.g. an ArrivalSource, a RateArrivals
+        or a list.
+        """
+        self.__source = source
+        self.__position = 0
+        self.__iterator = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.__iterator is None:
+            self.__iterator = iter(self.__source)
+            next(itertools.islice(self.__iterator, self.__position, self.__position), None)
+        arrival = next(self.__iterator)
+        self.__position += 1
+        return arrival
+
+    def __getstate__(self):
+        return {'source': self.__source, 'position': self.__position}
+
+    def __setstate__(self, state: dict):
+        self.__source = state['source']
+        self.__position = state['position']
+        self.__iterator = None
+
+    @property
+    def position(self):
+        return self.__position
+
+
+def make_arrival_source(arrival_table: Union[pd.DataFrame, str, Iterable],
+                        datetime_column: str,
+                        name_column: Union[str, None] = None,
+                        clock: Union[SimClock, None] = None) -> Iterable:
+    """
+    Builds the arrival source used by streaming creators.
+    :param arrival_table: sorted DataFrame, path to a csv or parquet file, or any iterable of
+    (arrival_date, entity_name) tuples.
+    :param clock: if given, arrival dates are yielded as simulation times of this clock.
+    :return: iterable of (arrival_date, entity_name) tuples.
+    """
+    if isinstance(arrival_table, pd.DataFrame):
+        return DataFrameArrivals(arrival_table=arrival_table,
+                                 datetime_column=datetime_column,
+                                 name_column=name_column,
+                                 clock=clock)
+    if isinstance(arrival_table, str):
+        if arrival_table.endswith('.parquet'):
+            return ParquetArrivals(path=arrival_table,
+                                   datetime_column=datetime_column,
+                                   name_column=name_column,
+                                   clock=clock)
+        return CsvArrivals(path=arrival_table,
+                           datetime_column=datetime_column,
+                           name_column=name_column,
+                           clock=clock)
+    if clock is None:
+        return arrival_table
+    return IterableArrivals(arrivals=arrival_table, clock=clock)
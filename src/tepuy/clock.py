@@ -0,0 +1,50 @@
+import datetime
+from typing import Union
+import numpy as np
+import pandas as pd
+
+SECONDS_PER_UNIT = {
+    'seconds': 1.0,
+    'minutes': 60.0,
+    'hours': 3600.0,
+    'days': 86400.0,
+}
+
+
+class SimClock:
+    def __init__(self, start_date: Union[datetime.datetime, str]):
+        """
+        Simulation time base. Inside the model every date is a float number of seconds since start_date,
+        pandas dates are only used to read input tables and to report results.
+        :param start_date: date matching simulation time 0.
+        """
+        self.__start_date = pd.Timestamp(start_date)
+        self.__start_ns = self.__start_date.value
+
+    def to_simulation_time(self, date: Union[datetime.datetime, str]) -> float:
+        """
+        :return: seconds elapsed from start_date to date.
+        """
+        return (pd.Timestamp(date).value - self.__start_ns) / 1e9
+
+    def to_simulation_times(self, dates) -> np.ndarray:
+        """
+        Vectorized version of to_simulation_time.
+        :param dates: array-like of dates.
+        :return: float64 array with the seconds elapsed from start_date.
+        """
+        dates = pd.to_datetime(dates).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        return (dates - self.__start_ns) / 1e9
+
+    def to_datetime(self, simulation_time: float) -> pd.Timestamp:
+        return self.__start_date + pd.to_timedelta(simulation_time, unit='s')
+
+    def to_datetimes(self, simulation_times) -> pd.DatetimeIndex:
+        """
+        Vectorized version of to_datetime.
+        """
+        return self.__start_date + pd.to_timedelta(np.asarray(simulation_times, dtype=np.float64), unit='s')
+
+    @property
+    def start_date(self):
+        return self.__start_date
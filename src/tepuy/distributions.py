@@ -0,0 +1,234 @@
+import zlib
+from typing import Union
+import numpy as np
+
+
+def object_rng(seed: Union[int, None], name: str):
+    """
+    Random generator of one object of a model. Its stream only depends on seed and on the object name, so the
+    same object draws the same numbers in every run with the same seed, whatever the other objects do.
+    :param seed: seed of the run. If None, the stream is not reproducible.
+    """
+    return np.random.default_rng(np.random.SeedSequence(entropy=seed, spawn_key=(zlib.crc32(name.encode()),)))
+
+
+class Distribution:
+    """
+    Base class of the distributions of random times. Samples are drawn in blocks. Distributions with the same
+    class and parameters are equal, so they share sample buffers even if created again at every use.
+    Distributions are immutable: their parameters and hash are computed once, every random draw looks its
+    sample buffer up by distribution.
+    """
+    def parameters(self):
+        try:
+            return self.__parameters
+        except AttributeError:
+            self.__parameters = (type(self).__name__,) + tuple(
+                (key, value.tobytes() if isinstance(value, np.ndarray) else value)
+                for key, value in sorted(vars(self).items()) if not key.startswith('_Distribution__'))
+            self.__hash = hash(self.__parameters)
+            return self.__parameters
+
+    def __eq__(self, other):
+        return self is other or (isinstance(other, Distribution) and self.parameters() == other.parameters())
+
+    def __hash__(self):
+        try:
+            return self.__hash
+        except AttributeError:
+            self.parameters()
+            return self.__hash
+
+    def sample(self, rng: np.random.Generator, size: int):
+        raise NotImplementedError
+
+    @property
+    def mean(self):
+        raise NotImplementedError
+
+
+class Constant(Distribution):
+    def __init__(self, value: float):
+        self.__value = value
+
+    def sample(self, rng: np.random.Generator, size: int):
+        return np.full(size, self.__value, dtype=np.float64)
+
+    @property
+    def mean(self):
+        return self.__value
+
+    @property
+    def value(self):
+        return self.__value
+
+
+class Exponential(Distribution):
+    def __init__(self, mean: float):
+        self.__mean = mean
+
+    def sample(self, rng: np.random.Generator, size: int):
+        return rng.exponential(self.__mean, size)
+
+    @property
+    def mean(self):
+        return self.__mean
+
+
+class Gamma(Distribution):
+    def __init__(self, shape: float, scale: float):
+        self.__shape = shape
+        self.__scale = scale
+
+    def sample(self, rng: np.random.Generator, size: int):
+        return rng.gamma(self.__shape, self.__scale, size)
+
+    @property
+    def mean(self):
+        return self.__shape*self.__scale
+
+    @property
+    def shape(self):
+        return self.__shape
+
+    @property
+    def scale(self):
+        return self.__scale
+
+
+class Uniform(Distribution):
+    def __init__(self, low: float, high: float):
+        self.__low = low
+        self.__high = high
+
+    def sample(self, rng: np.random.Generator, size: int):
+        return rng.uniform(self.__low, self.__high, size)
+
+    @property
+    def mean(self):
+        return (self.__low + self.__high)/2
+
+
+class Triangular(Distribution):
+    def __init__(self, low: float, mode: float, high: float):
+        self.__low = low
+        self.__mode = mode
+        self.__high = high
+
+    def sample(self, rng: np.random.Generator, size: int):
+        return rng.triangular(self.__low, self.__mode, self.__high, size)
+
+    @property
+    def mean(self):
+        return (self.__low + self.__mode + self.__high)/3
+
+
+class Empirical(Distribution):
+    def __init__(self,
+                 values,
+                 weights=None):
+        """
+        Resamples observed values, e.g. historical inter-arrival times.
+        :param weights: relative frequency of every value. If None, values are equally likely.
+        """
+        self.__values = np.asarray(values, dtype=np.float64)
+        if weights is None:
+            self.__probabilities = None
+        else:
+            weights = np.asarray(weights, dtype=np.float64)
+            self.__probabilities = weights/weights.sum()
+
+    def sample(self, rng: np.random.Generator, size: int):
+        return rng.choice(self.__values, size=size, p=self.__probabilities)
+
+    @property
+    def mean(self):
+        if self.__probabilities is None:
+            return float(self.__values.mean())
+        return float(self.__values @ self.__probabilities)
+
+    @property
+    def values(self):
+        return self.__values
+
+
+class PiecewiseRate:
+    def __init__(self,
+                 rates,
+                 breakpoints,
+                 period: Union[float, None] = None):
+        """
+        Time-varying arrival rate, constant between breakpoints, of a non-homogeneous Poisson process.
+        :param rates: arrivals per time unit from every breakpoint to the next one.
+        :param breakpoints: start of every rate, in time units since the model start. The first one must be 0.
+        :param period: if given, the profile repeats every period time units, e.g. 24 for a daily profile in
+        hours. Otherwise the last rate holds forever.
+        """
+        self.__rates = np.asarray(rates, dtype=np.float64)
+        self.__breakpoints = np.asarray(breakpoints, dtype=np.float64)
+        if len(self.__rates) != len(self.__breakpoints) or self.__breakpoints[0] != 0:
+            raise ValueError('PiecewiseRate needs one rate per breakpoint and a first breakpoint at 0.')
+        self.__period = period
+        self.__max_rate = float(self.__rates.max())
+
+    def rate_at(self, times: np.ndarray):
+        """
+        :return: rate in force at every time, in time units since the model start.
+        """
+        if self.__period is not None:
+            times = np.mod(times, self.__period)
+        return self.__rates[np.searchsorted(self.__breakpoints, times, side='right') - 1]
+
+    def arrival_times(self, rng: np.random.Generator, start: float, size: int):
+        """
+        Draws a block of arrival times after start by thinning: candidates of a Poisson process at the largest
+        rate are kept with probability rate(t)/largest rate.
+        :return: (accepted arrival times, time of the last candidate).
+        """
+        candidates = start + np.cumsum(rng.exponential(1/self.__max_rate, size))
+        keep = rng.random(size)*self.__max_rate < self.rate_at(candidates)
+        return candidates[keep], float(candidates[-1])
+
+    @property
+    def rates(self):
+        return self.__rates
+
+    @property
+    def breakpoints(self):
+        return self.__breakpoints
+
+    @property
+    def period(self):
+        return self.__period
+
+
+class SampleBuffer:
+    def __init__(self,
+                 distribution: Distribution,
+                 rng: np.random.Generator,
+                 block_size: int = 4096):
+        """
+        Pre-drawn samples of a distribution. Samples are drawn block_size at a time and handed out one by one
+        as plain floats.
+        """
+        self.__distribution = distribution
+        self.__rng = rng
+        self.__block_size = block_size
+        self.__samples = list()
+        self.__position = 0
+
+    def next(self):
+        if self.__position == len(self.__samples):
+            self.__samples = self.__distribution.sample(self.__rng, self.__block_size).tolist()
+            self.__position = 0
+        value = self.__samples[self.__position]
+        self.__position += 1
+        return value
+
+    @property
+    def distribution(self):
+        return self.__distribution
+
+    @property
+    def rng(self):
+        return self.__rng
@@ -0,0 +1,320 @@
+import hashlib
+import itertools
+import os
+import pickle
+from functools import partial
+from typing import Callable, Union
+import numpy as np
+import pandas as pd
+from tepuy.distributions import Distribution, PiecewiseRate
+from tepuy.intelligent_objects import IntelligentObject, MainSimModel
+from tepuy.ledger import MaterialLedger
+from tepuy.processes import Material, SimProcess
+from tepuy.replications import run_replication, run_replications
+
+
+class ParameterGrid:
+    def __init__(self, grid: dict):
+        """
+        Cartesian grid over attributes of the objects of a model.
+        :param grid: dictionary mapping '<object name>.<attribute>' to the list of values to sweep, e.g.
+        {'main_type.lead_time': [1, 2], 'wo_creator_output_node.capacity': [1, 2]}. Further dotted parts index
+        dictionary attributes, 'mat_1.bom.mat_a' sets the mat_a quantity of the bom of mat_1.
+        """
+        self.__grid = grid
+
+    def __iter__(self):
+        keys = list(self.__grid.keys())
+        for values in itertools.product(*[self.__grid[key] for key in keys]):
+            yield dict(zip(keys, values))
+
+    def __len__(self):
+        return int(np.prod([len(values) for values in self.__grid.values()]))
+
+    @property
+    def grid(self):
+        return self.__grid
+
+
+def model_objects(model: MainSimModel, objects: Union[dict, Callable, None] = None):
+    """
+    :param objects: extra objects, indexed by name, that are not part of the model network, or a callable
+    returning them for model.
+    :return: dictionary with the objects of the network, the materials of the model ledger and objects, indexed
+    by name.
+    """
+    named_objects = model.network_objects()
+    if model.ledger is not None:
+        for material_name in model.ledger.names:
+            named_objects.setdefault(material_name, Material.of(ledger=model.ledger, name=material_name))
+    if callable(objects):
+        objects = objects(model)
+    if objects is not None:
+        named_objects.update(objects)
+    return named_objects
+
+
+def apply_parameters(model: MainSimModel,
+                     parameters: dict,
+                     objects: Union[dict, Callable, None] = None):
+    """
+    Sets the attributes described by parameters on the objects of a model.
+    :param objects: extra objects, see model_objects.
+    """
+    named_objects = model_objects(model=model, objects=objects)
+    for key, value in parameters.items():
+        object_name, attribute, *item_keys = key.split('.')
+        try:
+            target = named_objects[object_name]
+        except KeyError:
+            raise KeyError(f'{object_name} is not an object of model {model.name}.')
+        if len(item_keys) == 0:
+            setattr(target, attribute, value)
+            continue
+        attribute_value = getattr(target, attribute)
+        container = attribute_value
+        for item_key in item_keys[:-1]:
+            container = container[item_key]
+        container[item_keys[-1]] = value
+        # Properties may return a copy, e.g. Material.bom, the modified value is set back.
+        try:
+            setattr(target, attribute, attribute_value)
+        except AttributeError:
+            if getattr(target, attribute) is not attribute_value:
+                raise AttributeError(f'{key} can not be set, {attribute} of {object_name} is a copy without '
+                                     f'setter.')
+
+
+def configured_model(model_factory: Callable,
+                     parameters: dict,
+                     objects: Union[dict, Callable, None] = None):
+    """
+    Builds a model with model_factory and applies parameters to it.
+    :param objects: extra objects, see model_objects.
+    """
+    model = model_factory()
+    apply_parameters(model=model, parameters=parameters, objects=objects)
+    return model
+
+
+# Content hash of the input files already read, by path, size and modification time.
+_FILE_HASHES = dict()
+
+
+def describe_file(path: str):
+    """
+    :return: sha256 of the content of the file at path. Files are hashed again only when their size or
+    modification time change.
+    """
+    status = os.stat(path)
+    key = (os.path.abspath(path), status.st_size, status.st_mtime_ns)
+    try:
+        return _FILE_HASHES[key]
+    except KeyError:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as input_file:
+            for block in iter(lambda: input_file.read(2**20), b''):
+                digest.update(block)
+        _FILE_HASHES[key] = digest.hexdigest()
+        return _FILE_HASHES[key]
+
+
+def _describe_value(value):
+    if isinstance(value, IntelligentObject):
+        return f'{type(value).__name__}:{value.name}'
+    if isinstance(value, pd.DataFrame):
+        return pd.util.hash_pandas_object(value, index=True).values.tobytes().hex()
+    if isinstance(value, np.ndarray):
+        return f'{value.dtype}:{hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()}'
+    if isinstance(value, Distribution):
+        return _describe_value(value.parameters())
+    if isinstance(value, bytes):
+        return hashlib.sha256(value).hexdigest()
+    if isinstance(value, (PiecewiseRate, SimProcess)):
+        return describe_object(value)
+    if isinstance(value, MaterialLedger):
+        return repr([(name, value.quantity(name), value.unit(name), _describe_value(value.bom(name)))
+                     for name in value.names])
+    if isinstance(value, dict):
+        return repr(sorted((repr(key), _describe_value(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return repr([_describe_value(item) for item in value])
+    if isinstance(value, str) and os.path.isfile(value):
+        # Paths, e.g. csv or parquet arrival tables, are described by the content of the file.
+        return f'{value!r}:{describe_file(value)}'
+    if isinstance(value, (str, int, float, bool, type(None), np.number)):
+        return repr(value)
+    return type(value).__name__
+
+
+def describe_object(target: object):
+    """
+    :return: text describing the class and every public property of target. Objects are described by name,
+    DataFrames and input files by the hash of their content. Properties a class does not implement are
+    marked as such, any other error is raised.
+    """
+    properties = sorted(attribute for attribute in dir(type(target))
+                        if not attribute.startswith('_') and isinstance(getattr(type(target), attribute), property))
+    description = [type(target).__name__]
+    for attribute in properties:
+        try:
+            description.append(f'{attribute}={_describe_value(getattr(target, attribute))}')
+        except NotImplementedError:
+            description.append(f'{attribute}!NotImplementedError')
+    return ';'.join(description)
+
+
+def fingerprint(model: MainSimModel,
+                input_tables: Union[dict, None] = None,
+                objects: Union[dict, None] = None):
+    """
+    Hash identifying the configuration of a model: its seed, routing, solver and ledger, every object of its
+    network with its properties, processes included, the arrival tables of its creators, with the content of
+    the csv or parquet files they are read from, and any other input table the model depends on.
+    :param input_tables: extra tables, indexed by name, used by the model.
+    :param objects: extra objects, see model_objects.
+    :return: hexadecimal sha256 digest.
+    """
+    digest = hashlib.sha256()
+    named_objects = model_objects(model=model, objects=objects)
+    digest.update(repr(model.start_date).encode())
+    digest.update(_describe_value((model.seed, model.routing, model.solver, model.ledger)).encode())
+    for object_name in sorted(named_objects):
+        digest.update(object_name.encode())
+        digest.update(describe_object(named_objects[object_name]).encode())
+    for table_name in sorted(input_tables or dict()):
+        digest.update(table_name.encode())
+        digest.update(_describe_value(input_tables[table_name]).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self,
+                 directory: str,
+                 max_bytes: int = 2**30):
+        """
+        On disk cache of run summaries indexed by configuration fingerprint. When the files exceed max_bytes,
+        the least recently used ones are deleted.
+        :param directory: folder holding the cached results.
+        :param max_bytes: bound of the total size of the cached files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.__directory = directory
+        self.__max_bytes = max_bytes
+
+    def __path(self, key: str):
+        return os.path.join(self.__directory, f'{key}.pkl')
+
+    def get(self, key: str):
+        """
+        :return: the cached summary of key, None if it is not cached.
+        """
+        try:
+            with open(self.__path(key), 'rb') as cached_file:
+                summary = pickle.load(cached_file)
+        except FileNotFoundError:
+            return None
+        os.utime(self.__path(key))
+        return summary
+
+    def put(self, key: str, summary: dict):
+        with open(self.__path(key), 'wb') as cached_file:
+            pickle.dump(summary, cached_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.evict()
+
+    def evict(self):
+        """
+        Deletes the least recently used results until the cache fits in max_bytes.
+        """
+        entries = [entry for entry in os.scandir(self.__directory) if entry.name.endswith('.pkl')]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        total_bytes = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total_bytes <= self.__max_bytes:
+                break
+            total_bytes -= entry.stat().st_size
+            os.remove(entry.path)
+
+    def __contains__(self, key: str):
+        return os.path.exists(self.__path(key))
+
+    @property
+    def directory(self):
+        return self.__directory
+
+    @property
+    def max_bytes(self):
+        return self.__max_bytes
+
+    @property
+    def size(self):
+        return sum(entry.stat().st_size for entry in os.scandir(self.__directory) if entry.name.endswith('.pkl'))
+
+
+class Experiment:
+    def __init__(self,
+                 name: str,
+                 model_factory: Callable,
+                 grid: Union[ParameterGrid, dict],
+                 input_tables: Union[dict, None] = None,
+                 cache: Union[ResultCache, None] = None,
+                 objects: Union[Callable, None] = None):
+        """
+        Parameter sweep over a model. Points whose configuration was already simulated are read from cache.
+        :param model_factory: picklable callable without arguments returning a MainSimModel ready to run.
+        :param grid: ParameterGrid, or the dictionary defining it.
+        :param input_tables: tables the model depends on that are not arrival tables of its creators.
+        :param cache: result cache shared by experiments. Without it every point is simulated.
+        :param objects: picklable callable returning, for a model built by model_factory, the objects that are
+        not part of its network nor materials of its ledger, indexed by name, so their attributes can be swept.
+        """
+        self.__name = name
+        self.__model_factory = model_factory
+        self.__grid = grid if isinstance(grid, ParameterGrid) else ParameterGrid(grid=grid)
+        self.__input_tables = input_tables
+        self.__cache = cache
+        self.__objects = objects
+
+    def run(self, max_workers: Union[int, None] = 1):
+        """
+        Simulates every point of the grid that is not cached.
+        :param max_workers: number of worker processes, 1 runs the points in this process.
+        :return: DataFrame with one row per point: parameters, fingerprint, cached flag and run summary.
+        """
+        points = list(self.__grid)
+        keys = [fingerprint(model=configured_model(self.__model_factory, parameters, objects=self.__objects),
+                            input_tables=self.__input_tables,
+                            objects=self.__objects) for parameters in points]
+        summaries = [None if self.__cache is None else self.__cache.get(key) for key in keys]
+        cached = [summary is not None for summary in summaries]
+        pending = [idx for idx, summary in enumerate(summaries) if summary is None]
+        factory = partial(configured_model, self.__model_factory, objects=self.__objects)
+        if max_workers == 1:
+            new_summaries = [run_replication(factory, points[idx]) for idx in pending]
+        else:
+            new_summaries = run_replications(model_factory=factory,
+                                             parameters=[points[idx] for idx in pending],
+                                             max_workers=max_workers).summaries
+        for idx, summary in zip(pending, new_summaries):
+            summaries[idx] = summary
+            if self.__cache is not None:
+                self.__cache.put(keys[idx], summary)
+        results = pd.DataFrame(points)
+        results['fingerprint'] = keys
+        results['cached'] = cached
+        metrics = pd.DataFrame([{key: value for key, value in summary.items() if key != 'parameters'}
+                                for summary in summaries])
+        return pd.concat([results, metrics], axis=1)
+
+    # Getters and setters
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def grid(self):
+        return self.__grid
+
+    @property
+    def cache(self):
+        return self.__cache
@@ -0,0 +1,132 @@
+import cProfile
+import pstats
+from collections import defaultdict
+from time import perf_counter
+from typing import Union
+import pandas as pd
+
+
+class EventLoopHook:
+    """
+    Base class of the hooks MainSimModel calls while running its event loop. Every method is a no-op, hooks
+    override the ones they need. Without hooks the model runs a loop free of any instrumentation.
+    """
+    def on_run_start(self, model):
+        pass
+
+    def on_event_start(self, event, calendar_length: int):
+        pass
+
+    def on_event_end(self, event, result):
+        pass
+
+    def on_process(self, process, elapsed: float):
+        pass
+
+    def on_run_end(self, model):
+        pass
+
+
+class EventProfiler(EventLoopHook):
+    def __init__(self, sample_every: int = 1000):
+        """
+        Collects events per second, wall time by event name, length of the event calendar over time and
+        wall time spent in SimProcess.run_process by process class.
+        :param sample_every: the calendar length is sampled once every sample_every events.
+        """
+        self.__sample_every = sample_every
+        self.__event_counts = defaultdict(int)
+        self.__event_times = defaultdict(float)
+        self.__process_counts = defaultdict(int)
+        self.__process_times = defaultdict(float)
+        self.__calendar_samples = list()
+        self.__events_processed = 0
+        self.__run_start = None
+        self.__wall_time = 0.0
+        self.__event_start = 0.0
+
+    def on_run_start(self, model):
+        self.__run_start = perf_counter()
+
+    def on_event_start(self, event, calendar_length: int):
+        if self.__events_processed % self.__sample_every == 0:
+            self.__calendar_samples.append((event.end_date, calendar_length))
+        self.__event_start = perf_counter()
+
+    def on_event_end(self, event, result):
+        elapsed = perf_counter() - self.__event_start
+        self.__event_counts[event.name] += 1
+        self.__event_times[event.name] += elapsed
+        self.__events_processed += 1
+
+    def on_process(self, process, elapsed: float):
+        self.__process_counts[type(process).__name__] += 1
+        self.__process_times[type(process).__name__] += elapsed
+
+    def on_run_end(self, model):
+        self.__wall_time += perf_counter() - self.__run_start
+
+    @property
+    def events_per_second(self):
+        return self.__events_processed/self.__wall_time if self.__wall_time > 0 else 0.0
+
+    def to_dict(self):
+        return {'events_processed': self.__events_processed,
+                'wall_time': self.__wall_time,
+                'events_per_second': self.events_per_second,
+                'events': {name: {'count': count, 'wall_time': self.__event_times[name]}
+                           for name, count in self.__event_counts.items()},
+                'processes': {name: {'count': count, 'wall_time': self.__process_times[name]}
+                              for name, count in self.__process_counts.items()},
+                'calendar_length': list(self.__calendar_samples)}
+
+    def to_dataframe(self):
+        """
+        :return: DataFrame with count, total and mean wall time by event name, slowest first.
+        """
+        events = pd.DataFrame({'count': pd.Series(self.__event_counts, dtype='int64'),
+                               'wall_time': pd.Series(self.__event_times, dtype='float64')})
+        events['mean_wall_time'] = events['wall_time']/events['count']
+        return events.sort_values('wall_time', ascending=False)
+
+    def processes_dataframe(self):
+        processes = pd.DataFrame({'count': pd.Series(self.__process_counts, dtype='int64'),
+                                  'wall_time': pd.Series(self.__process_times, dtype='float64')})
+        processes['mean_wall_time'] = processes['wall_time']/processes['count']
+        return processes.sort_values('wall_time', ascending=False)
+
+    def calendar_dataframe(self):
+        """
+        :return: DataFrame with the simulation time and the calendar length of every sample.
+        """
+        return pd.DataFrame(self.__calendar_samples, columns=['simulation_time', 'calendar_length'])
+
+    @property
+    def sample_every(self):
+        return self.__sample_every
+
+
+class CProfileHook(EventLoopHook):
+    def __init__(self):
+        """
+        Runs the event loop under cProfile.
+        """
+        self.__profile = cProfile.Profile()
+
+    def on_run_start(self, model):
+        self.__profile.enable()
+
+    def on_run_end(self, model):
+        self.__profile.disable()
+
+    def stats(self, sort_by: Union[str, None] = 'cumulative'):
+        """
+        :return: pstats.Stats of the profiled runs.
+        """
+        stats = pstats.Stats(self.__profile)
+        if sort_by is not None:
+            stats.sort_stats(sort_by)
+        return stats
+
+    def dump_stats(self, path: str):
+        self.__profile.dump_stats(path)
@@ -1,20 +1,40 @@
 import datetime
-from typing import Union
+import gzip
+import itertools
+import math
+import pickle
+from types import MappingProxyType
+from typing import Union, Iterable, Callable
 import pandas as pd
-from tepuy.processes import SimEvent, SimProcess, EmptyProcess
-from logging import Logger
+from tepuy.processes import SimEvent, SimProcess, EMPTY_PROCESS
+from tepuy.queues import HeapQueue, SortedQueue
+from tepuy.arrivals import make_arrival_source, RateArrivals, ResumableArrivals
+from tepuy.distributions import Distribution, PiecewiseRate, object_rng
+from tepuy.clock import SimClock
+from tepuy.trace import TraceRecorder
+from tepuy.network import Network
+from tepuy.serial_line import serial_line, solve_serial_line
+from tepuy.ledger import MaterialLedger
+import logging
 import numpy as np
 
+# Batch handlers of the objects that have none.
+NO_BATCH_HANDLERS = MappingProxyType(dict())
+
 
 class IntelligentObject:
+    __slots__ = ('__name', '__available_date')
+
     def __init__(self, name: str):
         self.__name = name
-        self.__logger = Logger(name=name)
         self.__available_date = None
 
     @property
     def logger(self):
-        return self.__logger
+        """
+        Logger shared by every object of the same class.
+        """
+        return logging.getLogger(f'tepuy.{type(self).__name__}')
 
     @property
     def name(self):
@@ -29,38 +49,73 @@ class IntelligentObject:
         return self.__available_date
 
     @available_date.setter
-    def available_date(self, available_date: datetime.datetime):
+    def available_date(self, available_date: float):
         self.__available_date = available_date
 
 
-class Entity(IntelligentObject):
+class BaseEntity:
+    """
+    Behaviour shared by Entity and TableEntity. It has no slots of its own, so TableEntity views only hold
+    their table and row.
+    """
+    __slots__ = ()
+
+    def set_destination(self):
+        """
+        Updates entity's destination, chosen by the network among the outgoing paths of the current node, and
+        returns lead time to arrive there in seconds.
+        :return:lead time to arrive destination from current node in seconds.
+        """
+        self.destination, path, lead_time = self.network.route(self.current_node)
+        return lead_time
+
+
+class Entity(IntelligentObject, BaseEntity):
+    __slots__ = ('__entity_id', '__creation_date', '__exit_date', '__sort_property', '__destination', '__network',
+                 '__current_node')
+    __entity_ids = itertools.count()
+
     def __init__(self,
                  name: str,
-                 creation_date: datetime.datetime = datetime.datetime.now(),
+                 creation_date: float = 0.0,
                  sort_property_value: int = 1,
-                 network: dict = None,
+                 network: Union[Network, None] = None,
                  destination: Union[IntelligentObject, None] = None):
         super().__init__(name=name)
+        self.__entity_id = next(Entity.__entity_ids)
         self.__creation_date = creation_date
+        self.__exit_date = None
         self.__sort_property = sort_property_value
         self.__destination = destination
         self.__network = network
         self.__current_node = None
 
-    def set_destination(self):
+    @staticmethod
+    def reserve_entity_ids(first_free_id: int):
         """
-        Updates entity's destination and returns lead time to arrive there in hours.
-        :return:lead time to arrive destination from current node in hours.
+        Makes new entities get ids from first_free_id on, unless ids are already past it.
+        :return: the first id new entities will get.
         """
-        # TODO: consider new implementation with multiple paths possible.
-        self.destination = self.network[self.current_node]['next']
-        lead_time = self.network[self.current_node]['path'].lead_time
-        return datetime.timedelta(hours=lead_time)
+        next_id = max(next(Entity.__entity_ids), first_free_id)
+        Entity.__entity_ids = itertools.count(next_id)
+        return next_id
+
+    @property
+    def entity_id(self):
+        return self.__entity_id
 
     @property
     def creation_date(self):
         return self.__creation_date
 
+    @property
+    def exit_date(self):
+        return self.__exit_date
+
+    @exit_date.setter
+    def exit_date(self, new_exit_date: float):
+        self.__exit_date = new_exit_date
+
     @property
     def destination(self):
         return self.__destination
@@ -90,58 +145,274 @@ class Entity(IntelligentObject):
         return self.__network
 
     @network.setter
-    def network(self, new_network: dict):
+    def network(self, new_network: Network):
         self.__network = new_network
 
 
-class SimQueue(IntelligentObject):
+class EntityTable:
     def __init__(self,
                  name: str,
-                 sorting_feature: Union[str, None] = None,
-                 sorting_policy: str = 'smallest'):
-        super().__init__(name=name)
-        self.__sorting_feature = sorting_feature
-        self.__sorting_policy = sorting_policy
-        self.__content = list()
+                 network: Union[Network, None] = None,
+                 initial_capacity: int = 1024):
+        """
+        Columnar store of entity state backed by NumPy arrays, one row per entity. Entities created by the
+        table are TableEntity views over their row, so aggregate queries never walk Python objects.
+        Nodes are stored as integer codes, -1 meaning no node.
+        :param name: name of the table.
+        :param network: network shared by every entity of the table.
+        :param initial_capacity: number of preallocated rows, the columns double their size when full.
+        """
+        self.__name = name
+        self.__network = network
+        self.__size = 0
+        self.__names = list()
+        self.__nodes = list()
+        self.__node_codes = dict()
+        self.__fill_values = {'creation_date': np.nan,
+                              'exit_date': np.nan,
+                              'available_date': np.nan,
+                              'sort_property': 1,
+                              'current_node': -1,
+                              'destination': -1}
+        self.__dtypes = {'creation_date': np.float64,
+                         'exit_date': np.float64,
+                         'available_date': np.float64,
+                         'sort_property': np.int64,
+                         'current_node': np.int32,
+                         'destination': np.int32}
+        self.__columns = {column_name: np.full(initial_capacity, fill_value, dtype=self.__dtypes[column_name])
+                          for column_name, fill_value in self.__fill_values.items()}
+
+    def __grow(self, new_rows: int):
+        capacity = len(self.__columns['creation_date'])
+        if self.__size + new_rows <= capacity:
+            return
+        new_capacity = max(2*capacity, self.__size + new_rows)
+        for column_name, column in self.__columns.items():
+            new_column = np.full(new_capacity, self.__fill_values[column_name], dtype=self.__dtypes[column_name])
+            new_column[:capacity] = column
+            self.__columns[column_name] = new_column
+
+    def new_entity(self,
+                   name: str,
+                   creation_date: float = 0.0,
+                   sort_property_value: int = 1):
+        """
+        Adds a row to the table.
+        :return: TableEntity view over the new row.
+        """
+        return self.new_entities(names=[name],
+                                 creation_dates=[creation_date],
+                                 sort_property_value=sort_property_value)[0]
+
+    def new_entities(self,
+                     names: Iterable,
+                     creation_dates: Iterable,
+                     sort_property_value: int = 1):
+        """
+        Adds one row per entity name, filling the columns in one step.
+        :return: list of TableEntity views over the new rows.
+        """
+        names = list(names)
+        creation_dates = np.asarray(creation_dates, dtype=np.float64)
+        first_row = self.__size
+        self.__grow(len(names))
+        self.__size += len(names)
+        self.__names.extend(names)
+        self.__columns['creation_date'][first_row:self.__size] = creation_dates
+        self.__columns['sort_property'][first_row:self.__size] = sort_property_value
+        return [TableEntity(table=self, row=row) for row in range(first_row, self.__size)]
+
+    def node_code(self, node: Union[IntelligentObject, None]):
+        if node is None:
+            return -1
+        try:
+            return self.__node_codes[node]
+        except KeyError:
+            self.__node_codes[node] = len(self.__nodes)
+            self.__nodes.append(node)
+            return self.__node_codes[node]
+
+    def node(self, code: int):
+        return None if code < 0 else self.__nodes[code]
+
+    def column(self, column_name: str):
+        """
+        :return: view of the filled part of a column.
+        """
+        return self.__columns[column_name][:self.__size]
 
-    def add_entity(self, entity: Union[Entity, SimEvent]):
-        if self.sorting_feature is None:
-            entity.sort_property = len(self.content) + 1
-        self.content.append(entity)
-        self.sort_queue()
+    # Aggregates
+    def in_system(self):
+        """
+        :return: boolean mask of the entities that did not reach a destructor yet.
+        """
+        return np.isnan(self.column('exit_date'))
 
-    def sort_queue(self):
-        reverse_list = not (self.sorting_policy == 'smallest')
-        if self.sorting_feature is not None:
-            self.content.sort(key=lambda x: getattr(x, self.sorting_feature),
-                              reverse=reverse_list)
+    def time_in_system(self):
+        """
+        :return: time in system, in seconds, of every entity that reached a destructor.
+        """
+        exited = ~self.in_system()
+        return self.column('exit_date')[exited] - self.column('creation_date')[exited]
 
-    def print_content_names(self):
-        return [item.name for item in self.content]
+    def count_by_node(self):
+        """
+        :return: dictionary with the number of entities currently in each node.
+        """
+        current_nodes = self.column('current_node')[self.in_system()]
+        counts = np.bincount(current_nodes[current_nodes >= 0], minlength=len(self.__nodes))
+        return {node.name: int(count) for node, count in zip(self.__nodes, counts)}
 
+    def statistics(self):
+        """
+        :return: end of run statistics of the entities of the table.
+        """
+        time_in_system = self.time_in_system()
+        return {'entities_created': self.__size,
+                'entities_destroyed': len(time_in_system),
+                'work_in_process': int(self.in_system().sum()),
+                'mean_time_in_system': float(time_in_system.mean()) if len(time_in_system) else np.nan,
+                'max_time_in_system': float(time_in_system.max()) if len(time_in_system) else np.nan}
+
+    def to_dataframe(self, clock: Union[SimClock, None] = None):
+        """
+        :param clock: if given, date columns are reported as dates of this clock.
+        :return: DataFrame with one row per entity.
+        """
+        table = pd.DataFrame({'name': self.__names,
+                              'creation_date': self.column('creation_date'),
+                              'exit_date': self.column('exit_date'),
+                              'current_node': [node.name if node is not None else None
+                                               for node in map(self.node, self.column('current_node'))]})
+        if clock is not None:
+            table['creation_date'] = clock.to_datetimes(table['creation_date'])
+            table['exit_date'] = clock.to_datetimes(table['exit_date'])
+        return table
+
+    # Getters and setters
     @property
-    def content(self):
-        return self.__content
+    def name(self):
+        return self.__name
 
     @property
-    def sorting_feature(self):
-        return self.__sorting_feature
+    def network(self):
+        return self.__network
 
-    @sorting_feature.setter
-    def sorting_feature(self, value: Union[str, None]):
-        self.__sorting_feature = value
+    @network.setter
+    def network(self, new_network: Network):
+        self.__network = new_network
 
     @property
-    def sorting_policy(self):
-        return self.__sorting_policy
-
-    @sorting_policy.setter
-    def sorting_policy(self, value: Union[str, None]):
-        self.__sorting_policy = value
+    def names(self):
+        return self.__names
 
     @property
     def length(self):
-        return len(self.content)
+        return self.__size
+
+
+class TableEntity(BaseEntity):
+    __slots__ = ('__table', '__row')
+
+    def __init__(self,
+                 table: EntityTable,
+                 row: int):
+        """
+        Entity whose state lives in one row of an EntityTable. It has the properties of Entity, every one of
+        them, setters included, reads or writes the table.
+        """
+        self.__table = table
+        self.__row = row
+
+    @property
+    def table(self):
+        return self.__table
+
+    @property
+    def entity_id(self):
+        return self.__row
+
+    @property
+    def name(self):
+        return self.__table.names[self.__row]
+
+    @name.setter
+    def name(self, new_name: str):
+        self.__table.names[self.__row] = new_name
+
+    @property
+    def creation_date(self):
+        return float(self.__table.column('creation_date')[self.__row])
+
+    @property
+    def exit_date(self):
+        exit_date = self.__table.column('exit_date')[self.__row]
+        return None if np.isnan(exit_date) else float(exit_date)
+
+    @exit_date.setter
+    def exit_date(self, new_exit_date: float):
+        self.__table.column('exit_date')[self.__row] = new_exit_date
+
+    @property
+    def available_date(self):
+        available_date = self.__table.column('available_date')[self.__row]
+        return None if np.isnan(available_date) else float(available_date)
+
+    @available_date.setter
+    def available_date(self, new_available_date: float):
+        self.__table.column('available_date')[self.__row] = new_available_date
+
+    @property
+    def sort_property(self):
+        return int(self.__table.column('sort_property')[self.__row])
+
+    @sort_property.setter
+    def sort_property(self, value: int):
+        self.__table.column('sort_property')[self.__row] = value
+
+    @property
+    def destination(self):
+        return self.__table.node(self.__table.column('destination')[self.__row])
+
+    @destination.setter
+    def destination(self, new_destination: IntelligentObject):
+        self.__table.column('destination')[self.__row] = self.__table.node_code(new_destination)
+
+    @property
+    def current_node(self):
+        return self.__table.node(self.__table.column('current_node')[self.__row])
+
+    @current_node.setter
+    def current_node(self, new_node: IntelligentObject):
+        self.__table.column('current_node')[self.__row] = self.__table.node_code(new_node)
+
+    @property
+    def network(self):
+        return self.__table.network
+
+    @network.setter
+    def network(self, new_network: Network):
+        """
+        The network is shared by every entity of the table.
+        """
+        self.__table.network = new_network
+
+
+class SimQueue(IntelligentObject, SortedQueue):
+    def __init__(self,
+                 name: str,
+                 sorting_feature: Union[str, tuple, None] = None,
+                 sorting_policy: Union[str, tuple] = 'smallest'):
+        """
+        Queue of the entities, or any other items, of a model object. Items are indexed, so any of them is
+        removed in O(log n), see SortedQueue.
+        """
+        IntelligentObject.__init__(self, name=name)
+        SortedQueue.__init__(self,
+                             name=name,
+                             sorting_feature=sorting_feature,
+                             sorting_policy=sorting_policy)
 
 
 class SimNode(IntelligentObject):
@@ -150,107 +421,156 @@ class SimNode(IntelligentObject):
                  position: tuple,
                  capacity: int = 1,
                  next_node: Union[IntelligentObject, None] = None,
-                 is_destructor: bool = False):
+                 is_destructor: bool = False,
+                 entry_process: Union[SimProcess, None] = None,
+                 exit_process: Union[SimProcess, None] = None):
+        """
+        Node of the model network holding up to capacity entities, the others wait in its FIFO queue.
+        :param next_node: if given, entities leaving the node go straight to it instead of being routed by the
+        network.
+        :param entry_process: process run when an entity is admitted. If it returns a SimEvent, the entity is
+        held in the node until its end_date. The process is shared by every entity, see DelayProcess.
+        :param exit_process: process run when an entity leaves the node.
+        """
         super().__init__(name=name)
         self.__capacity = capacity
         self.__position = position
         self.__available = True
-        self.__population = []
+        self.__population = SimQueue(name='-'.join([name, 'population']))
         self.__queue = SimQueue(name='-'.join([name, 'queue']))
+        self.__waiting_processes = dict()
         self.__next_node = next_node
+        self.__entry_process = entry_process if entry_process is not None else EMPTY_PROCESS
+        self.__exit_process = exit_process if exit_process is not None else EMPTY_PROCESS
         self.__is_destructor = is_destructor
+        self.__destroyed_count = 0
+        self.__time_in_system_total = 0.0
+        self.__time_in_system_squares = 0.0
+        self.__node_id = None
 
     def on_entered(self,
-                   entity: Entity,
-                   events: dict,
-                   actions: SimQueue,
-                   enter_date: datetime.datetime,
+                   entity: BaseEntity,
+                   actions: HeapQueue,
+                   enter_date: float,
                    process: Union[SimProcess, None] = None):
-        enter_date = pd.to_datetime(enter_date)
-        if process is None:
-            process = EmptyProcess(name='empty_process',
-                                   associated_object=entity,
-                                   context_object=self)
+        """
+        Admits entity if the node has free capacity, otherwise the entity waits in the node queue until an
+        exit frees a place.
+        """
         if self.available:
-            self.population.append(entity)
-            if len(self.population) == self.capacity:
-                self.available = False
-            entity.current_node = self
-            process.run_process(entity=entity,
-                                events=events,
-                                actions=actions)
-            new_event = SimEvent(start_date=enter_date,
-                                 end_date=enter_date,
-                                 event_name=f'on_entered_{self.name}',
-                                 object_dictionary={'my_entity': entity,
-                                                    'my_node': self,
-                                                    'events': events,
-                                                    'actions': actions,
-                                                    'exit_date': enter_date},
-                                 action_string='my_node.on_exited('
-                                               'entity=my_entity,'
-                                               'events=events,'
-                                               'actions=actions,'
-                                               'exit_date=exit_date)')
-            actions.add_entity(entity=new_event)
+            self.__admit(entity=entity,
+                         actions=actions,
+                         enter_date=enter_date,
+                         process=process)
         else:
-            new_event = SimEvent(start_date=enter_date,
-                                 end_date=enter_date,
-                                 event_name='created_entity',
-                                 object_dictionary={'new_entity': entity,
-                                                    'output_node': self,
-                                                    'events_dict': events,
-                                                    'actions_queue': actions},
-                                 action_string='output_node.on_entered(entity=new_entity, '
-                                               'enter_date=creation_date, '
-                                               'events=events,'
-                                               'actions=actions)')
-            try:
-                events[f'on_exited_{self.name}'].append(new_event)
-            except KeyError:
-                events[f'on_exited_{self.name}'] = list()
-                events[f'on_exited_{self.name}'].append(new_event)
+            if process is not None:
+                self.__waiting_processes[entity] = process
             self.queue.add_entity(entity)
 
+    def on_entered_batch(self,
+                         entities: list,
+                         actions: HeapQueue,
+                         enter_date: float):
+        """
+        Same as calling on_entered for every entity in order: entities are admitted while the node has free
+        capacity and the rest wait in the node queue. Without entry process, exit events are scheduled with one
+        bulk insert. An entry process may schedule events or depend on the population, so each entity is then
+        admitted, and its exit event scheduled, right after the previous one.
+        """
+        if self.__entry_process is not EMPTY_PROCESS:
+            for entity in entities:
+                self.on_entered(entity=entity, actions=actions, enter_date=enter_date)
+            return
+        free_places = max(self.capacity - self.population.length, 0) if self.available else 0
+        admitted = entities[:free_places]
+        self.population.add_entities(admitted)
+        if self.population.length >= self.capacity:
+            self.available = False
+        exit_events = list()
+        for entity in admitted:
+            entity.current_node = self
+            EMPTY_PROCESS.execute(entity=entity, actions=actions, date=enter_date)
+            exit_events.append(SimEvent(start_date=enter_date,
+                                        end_date=enter_date,
+                                        event_name=f'on_exited_{self.name}',
+                                        action=self.on_exited,
+                                        action_args=(entity, actions, enter_date)))
+        actions.add_entities(exit_events)
+        self.queue.add_entities(entities[free_places:])
+
+    def __admit(self,
+                entity: BaseEntity,
+                actions: HeapQueue,
+                enter_date: float,
+                process: Union[SimProcess, None]):
+        if process is None:
+            process = self.__entry_process
+        self.population.add_entity(entity)
+        if self.population.length >= self.capacity:
+            self.available = False
+        entity.current_node = self
+        hold = process.execute(entity=entity,
+                               actions=actions,
+                               date=enter_date)
+        exit_date = hold.end_date if isinstance(hold, SimEvent) else enter_date
+        new_event = SimEvent(start_date=enter_date,
+                             end_date=exit_date,
+                             event_name=f'on_exited_{self.name}',
+                             action=self.on_exited,
+                             action_args=(entity, actions, exit_date))
+        actions.add_entity(entity=new_event)
+
     def on_exited(self,
-                  entity: Entity,
-                  events: dict,
-                  actions: SimQueue,
-                  exit_date: datetime.datetime,
+                  entity: BaseEntity,
+                  actions: HeapQueue,
+                  exit_date: float,
                   process: Union[SimProcess, None] = None
                   ):
+        """
+        Removes entity from the node, admits the next waiting entity, if any, and sends entity to its next
+        destination.
+        """
         if process is None:
-            process = EmptyProcess(name='empty_process',
-                                   associated_object=entity,
-                                   context_object=self)
-        exit_date = pd.to_datetime(exit_date)
+            process = self.__exit_process
         self.population.remove(entity)
         self.available = True
-        process.run_process(entity=entity,
-                            events=events,
-                            actions=actions)
-        try:
-            events = events[f'on_exited_{self.name}']
-            for ev in events:
-                ev.end_date = exit_date
-                actions.add_entity(ev)
-        except KeyError:
-            pass
-        lead_time = entity.set_destination()
+        process.execute(entity=entity,
+                        actions=actions,
+                        date=exit_date)
+        if self.queue.length > 0:
+            waiting_entity = self.queue.pop()
+            self.__admit(entity=waiting_entity,
+                         actions=actions,
+                         enter_date=exit_date,
+                         process=self.__waiting_processes.pop(waiting_entity, None))
+        if self.is_destructor:
+            entity.exit_date = exit_date
+            time_in_system = exit_date - entity.creation_date
+            self.__destroyed_count += 1
+            self.__time_in_system_total += time_in_system
+            self.__time_in_system_squares += time_in_system*time_in_system
+            return
+        if self.next_node is not None:
+            entity.destination = self.next_node
+            lead_time = 0.0
+        else:
+            lead_time = entity.set_destination()
         new_event = SimEvent(start_date=exit_date,
                              end_date=exit_date+lead_time,
                              event_name=f'on_entered_{entity.destination.name}',
-                             object_dictionary={'new_entity': entity,
-                                                'enter_node': entity.destination,
-                                                'enter_date': exit_date+lead_time,
-                                                'events_dict': events,
-                                                'actions_queue': actions},
-                             action_string='enter_node.on_entered(entity=new_entity, '
-                                           'enter_date=enter_date, '
-                                           'events=events,'
-                                           'actions=actions)')
+                             action=entity.destination.on_entered,
+                             action_args=(entity, actions, exit_date+lead_time))
         actions.add_entity(entity=new_event)
 
+    def record_destroyed(self, times_in_system: np.ndarray):
+        """
+        Adds entities destroyed outside the event loop, given their time in system in seconds, to the destructor
+        statistics of the node.
+        """
+        self.__destroyed_count += len(times_in_system)
+        self.__time_in_system_total += float(times_in_system.sum())
+        self.__time_in_system_squares += float(times_in_system @ times_in_system)
+
     # Getters and setters
     @property
     def capacity(self):
@@ -288,51 +608,332 @@ class SimNode(IntelligentObject):
     def next_node(self):
         return self.__next_node
 
+    @property
+    def entry_process(self):
+        return self.__entry_process
+
+    @property
+    def exit_process(self):
+        return self.__exit_process
+
     @property
     def is_destructor(self):
         return self.__is_destructor
 
+    @property
+    def destroyed_count(self):
+        return self.__destroyed_count
+
+    @property
+    def time_in_system_total(self):
+        return self.__time_in_system_total
+
+    @property
+    def time_in_system_squares(self):
+        return self.__time_in_system_squares
+
+    @property
+    def node_id(self):
+        return self.__node_id
+
+    @node_id.setter
+    def node_id(self, new_node_id: int):
+        self.__node_id = new_node_id
+
 
 class MainSimModel:
     def __init__(self,
                  name: str,
                  model_network: dict,
-                 start_date: datetime.datetime):
+                 start_date: datetime.datetime,
+                 entity_table: Union[EntityTable, None] = None,
+                 hooks: Union[list, None] = None,
+                 history: Union[TraceRecorder, None] = None,
+                 routing: str = 'weighted',
+                 seed: Union[int, None] = None,
+                 ledger: Union[MaterialLedger, None] = None,
+                 solver: str = 'auto'):
+        """
+        :param model_network: dictionary with a 'start' entry pointing to the creator, and one entry per node
+        with either 'next' and 'path' keys, or a 'paths' list of the alternative outgoing paths of the node.
+        :param entity_table: if given, created entities are stored as rows of this table instead of as
+        independent Entity objects.
+        :param hooks: EventLoopHook instances called while the event loop runs, e.g. an EventProfiler.
+        :param history: if given, every processed event is recorded in this trace.
+        :param routing: routing policy of the compiled network, see Network.
+        :param seed: seed of the random routing, lead times and process durations. Every object draws from its
+        own stream, so runs of different configurations with the same seed use common random numbers.
+        :param ledger: material ledger of the model, saved with it in snapshots.
+        :param solver: 'events' runs the event loop. 'serial_line' solves serial lines, see
+        tepuy.serial_line.serial_line, with a vectorized Lindley recursion instead: destructor statistics and end
+        time are the same, but no entity is created and no event is processed. It raises if the run stops at a
+        date or the calendar holds events scheduled before the run. 'auto' uses the serial line solver when the
+        network allows it and the run is a complete, first run without hooks, entity table nor scheduled events,
+        otherwise it runs the event loop.
+        """
+        valid_solvers = ['auto', 'events', 'serial_line']
+        if solver not in valid_solvers:
+            raise NotImplementedError(f'{solver} not a valid solver. '
+                                      f'Valid options are: {", ".join(valid_solvers)}')
+        self.__solver = solver
         self.__name = name
-        self.__history = SimQueue(name=f'history_{name}',
-                                  sorting_feature='end_date',
-                                  sorting_policy='greatest')
+        self.__history = history
         self.__network = model_network
-        self.__alerts = dict()
+        self.__routing = routing
+        self.__seed = seed
+        self.__ledger = ledger
+        self.__compiled_network = None
+        self.__initialized = False
+        self.__current_time = 0.0
         self.__start_date = start_date
-        self.__actions = SimQueue(name=f'actions_{name}',
-                                  sorting_feature='end_date',
-                                  sorting_policy='smallest')
-
-    def run(self):
-        # Look at the start of the network:
-        source = self.network['start']['next']
-        source.create_entities_from_arrival_table(events_dict=self.alerts,
-                                                  network=self.network,
-                                                  actions_queue=self.actions)
-        first_action = self.actions.content.pop()
-        def_string = first_action.create_definition_string(name='first_action')
-        exec(def_string)
-        exec(first_action.action_string)
-        while self.actions.length > 0:
-            # TODO encapsulate exec in a method to avoid overriding variables.
-            # TODO implement scape option to avoid infinite loop.
-            next_action = self.actions.content.pop()
-            def_string = next_action.create_definition_string(name='next_action')
-            exec(def_string)
-            exec(next_action.action_string)
-        print('hello')
+        self.__clock = SimClock(start_date=start_date)
+        self.__entity_table = entity_table
+        self.__events_processed = 0
+        self.__end_time = 0.0
+        self.__hooks = list(hooks) if hooks is not None else list()
+        if history is not None:
+            self.__hooks.append(history)
+        self.__actions = HeapQueue(name=f'actions_{name}',
+                                   sorting_feature='end_date',
+                                   sorting_policy='smallest')
+
+    def compile_network(self):
+        """
+        Builds the indexed routing structure of the model network. It is done when the model runs, so changes
+        made to the network objects before, e.g. by an experiment, are taken into account.
+        """
+        self.__compiled_network = Network(model_network=self.network, routing=self.__routing, seed=self.__seed)
+        return self.__compiled_network
+
+    def initialize(self, network: Union[Network, None] = None):
+        """
+        Compiles the network and schedules the arrivals. Called by the first run, later runs resume from the
+        state the previous one stopped at.
+        :param network: network compiled by the same run, it is compiled if None.
+        """
+        network = network if network is not None else self.compile_network()
+        source = network.creators[0]
+        if self.entity_table is not None:
+            self.entity_table.network = network
+            source.entity_table = self.entity_table
+        source.schedule_arrivals(network=network,
+                                 actions_queue=self.actions,
+                                 clock=self.clock)
+        self.__initialized = True
+
+    def run(self, until: Union[float, datetime.datetime, None] = None):
+        """
+        Runs the events of the calendar.
+        :param until: simulation time, in seconds, or date at which the run stops. Events ending later stay in
+        the calendar and a later call to run resumes from them. If None, runs until the calendar is empty.
+        """
+        network = None
+        if self.__solver == 'serial_line' and (until is not None or self.__initialized or self.actions.length > 0):
+            raise ValueError(f'The serial line solver of {self.name} only solves complete, first runs without '
+                             f'scheduled events.')
+        if self.__solver != 'events' and not self.__initialized and until is None and self.actions.length == 0:
+            network = self.compile_network()
+            if self.__run_serial_line(network):
+                return
+        if not self.__initialized:
+            self.initialize(network)
+        else:
+            # Takes into account changes made to the network objects since the previous run.
+            self.compiled_network.compile()
+        if isinstance(until, datetime.datetime):
+            until = self.clock.to_simulation_time(until)
+        until = math.inf if until is None else until
+        if self.hooks:
+            self.__run_instrumented_events(until)
+        else:
+            self.__run_events(until)
+        self.__current_time = max(self.__current_time, self.__end_time if until == math.inf else until)
+
+    def __run_serial_line(self, network: Network):
+        """
+        Solves the whole run with the serial line solver, if the model allows it.
+        :param network: compiled network of the model, reused by the event loop when the model is not a serial line.
+        :return: True if the run was solved.
+        """
+        stages = serial_line(network)
+        if stages is None or self.hooks or self.entity_table is not None:
+            if self.__solver == 'serial_line':
+                raise ValueError(f'{self.name} is not a serial line without hooks nor entity table.')
+            return False
+        creation_dates = network.creators[0].arrival_times(self.clock)
+        destroy_dates = solve_serial_line(stages=stages, arrivals=creation_dates, seed=self.__seed)
+        destructor_node = stages[-1][0]
+        destructor_node.record_destroyed(destroy_dates - creation_dates)
+        if len(destroy_dates) > 0:
+            self.__end_time = float(destroy_dates.max())
+        self.__current_time = max(self.__current_time, self.__end_time)
+        self.__initialized = True
+        return True
+
+    def __run_events(self, until: float):
+        """
+        Runs the events one at a time, so any of them can cancel or reschedule the following ones, even at the
+        same date. Consecutive events with the same end date running the same action of an object with a batch
+        handler (see Creator.batch_handlers) are run in bulk, in the order they would run one by one.
+        """
+        namespace = globals()
+        actions = self.actions
+        events_processed = 0
+        # Batch handler of every action, resolved once per run.
+        handlers = dict()
+        while actions.length > 0 and actions.peek().end_date <= until:
+            event = actions.pop()
+            events_processed += 1
+            self.__end_time = event.end_date
+            action = event.action
+            try:
+                handler = handlers[action]
+            except KeyError:
+                handler = handlers[action] = self.batch_handler(event)
+            if handler is None:
+                event.run_action(namespace=namespace)
+                continue
+            group = [event]
+            while actions.length > 0:
+                next_event = actions.peek()
+                if next_event.end_date != event.end_date or next_event.action != event.action:
+                    break
+                group.append(actions.pop())
+            events_processed += len(group) - 1
+            if len(group) > 1:
+                handler(group)
+            else:
+                event.run_action(namespace=namespace)
+        self.__events_processed += events_processed
+
+    @staticmethod
+    def batch_handler(event: SimEvent):
+        """
+        :return: bound method running in bulk events with the action of event, None if there is none.
+        """
+        owner = getattr(event.action, '__self__', None)
+        handler_name = getattr(owner, 'batch_handlers', NO_BATCH_HANDLERS).get(getattr(event.action, '__name__', None))
+        return None if handler_name is None else getattr(owner, handler_name)
+
+    def __run_instrumented_events(self, until: float):
+        namespace = globals()
+        actions = self.actions
+        hooks = tuple(self.hooks)
+        SimProcess.hooks = hooks
+        for hook in hooks:
+            hook.on_run_start(model=self)
+        try:
+            while actions.length > 0 and actions.peek().end_date <= until:
+                next_action = actions.pop()
+                for hook in hooks:
+                    hook.on_event_start(event=next_action, calendar_length=actions.length)
+                result = next_action.run_action(namespace=namespace)
+                for hook in hooks:
+                    hook.on_event_end(event=next_action, result=result)
+                self.__events_processed += 1
+                self.__end_time = next_action.end_date
+        finally:
+            SimProcess.hooks = ()
+            for hook in hooks:
+                hook.on_run_end(model=self)
+
+    def add_hook(self, hook):
+        self.__hooks.append(hook)
+
+    # Snapshots
+    def __getstate__(self):
+        """
+        Hooks and history observe a run, they are not part of the model state and are left out of snapshots.
+        """
+        state = self.__dict__.copy()
+        state['_MainSimModel__hooks'] = list()
+        state['_MainSimModel__history'] = None
+        return state
+
+    def snapshot(self, path: str):
+        """
+        Saves the state of the model, calendar, entities, nodes, queues, random streams and material ledger
+        included, to a compressed pickle. Streamed arrivals are saved as their source and the number of arrivals
+        read, so arrival tables streamed from files are read again from disk on resume.
+        """
+        with gzip.open(path, 'wb') as snapshot_file:
+            pickle.dump({'model': self,
+                         'first_free_entity_id': Entity.reserve_entity_ids(0)},
+                        snapshot_file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def restore(path: str):
+        """
+        Loads a model saved by snapshot. Calling run on it resumes the simulation where the snapshot was taken.
+        """
+        with gzip.open(path, 'rb') as snapshot_file:
+            state = pickle.load(snapshot_file)
+        Entity.reserve_entity_ids(state['first_free_entity_id'])
+        return state['model']
+
+    def fork(self):
+        """
+        In memory copy of the model, to branch scenarios from the current state without touching it.
+        """
+        return pickle.loads(pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def network_objects(self):
+        """
+        :return: dictionary with every creator, node and path of the network, indexed by name.
+        """
+        objects = dict()
+        for key, item in self.network.items():
+            if isinstance(key, IntelligentObject):
+                objects[key.name] = key
+            for value in item.values():
+                for network_object in value if isinstance(value, (list, tuple)) else [value]:
+                    if isinstance(network_object, IntelligentObject):
+                        objects[network_object.name] = network_object
+                    if isinstance(network_object, Path):
+                        objects[network_object.node_to.name] = network_object.node_to
+        return objects
+
+    def summary(self):
+        """
+        Compact, picklable summary of the last run.
+        :return: dictionary with the number of processed events, the simulation time of the last event and the
+        time in system statistics, in seconds, of the entities that reached a destructor.
+        """
+        network = self.compiled_network if self.compiled_network is not None else self.compile_network()
+        destructor_nodes = [network.nodes[node_id] for node_id in network.destructor_ids]
+        destroyed_count = sum(node.destroyed_count for node in destructor_nodes)
+        time_in_system_total = sum(node.time_in_system_total for node in destructor_nodes)
+        time_in_system_squares = sum(node.time_in_system_squares for node in destructor_nodes)
+        mean_time_in_system = time_in_system_total/destroyed_count if destroyed_count else np.nan
+        summary = {'events_processed': self.__events_processed,
+                   'end_time': self.__end_time,
+                   'entities_destroyed': destroyed_count,
+                   'mean_time_in_system': mean_time_in_system,
+                   'std_time_in_system': np.sqrt(max(time_in_system_squares/destroyed_count -
+                                                     mean_time_in_system**2, 0.0))
+                   if destroyed_count else np.nan}
+        if self.entity_table is not None:
+            summary['work_in_process'] = self.entity_table.statistics()['work_in_process']
+        return summary
 
     # Setters and getters
     @property
     def start_date(self):
         return self.__start_date
 
+    @property
+    def clock(self):
+        return self.__clock
+
+    @property
+    def entity_table(self):
+        return self.__entity_table
+
+    @property
+    def hooks(self):
+        return self.__hooks
+
     @property
     def name(self):
         return self.__name
@@ -343,11 +944,7 @@ class MainSimModel:
 
     @property
     def history(self):
-        return self.__name
-
-    @property
-    def alerts(self):
-        return self.__alerts
+        return self.__history
 
     @property
     def actions(self):
@@ -357,40 +954,236 @@ class MainSimModel:
     def network(self):
         return self.__network
 
+    @property
+    def compiled_network(self):
+        return self.__compiled_network
+
+    @property
+    def routing(self):
+        return self.__routing
+
+    @property
+    def solver(self):
+        return self.__solver
+
+    @property
+    def ledger(self):
+        return self.__ledger
+
+    @property
+    def current_time(self):
+        """
+        :return: simulation time, in seconds, the model was run up to.
+        """
+        return self.__current_time
+
+    @property
+    def seed(self):
+        return self.__seed
+
+    @seed.setter
+    def seed(self, new_seed: Union[int, None]):
+        self.__seed = new_seed
+
+
+class ResourceRequest:
+    __slots__ = ('requester', 'units', 'request_date', 'on_granted')
+
+    def __init__(self,
+                 requester,
+                 units: int,
+                 request_date: float,
+                 on_granted: Union[Callable, None]):
+        """
+        Pending request of a Resource waiting line. Other attributes are read from the requester, so the
+        waiting line sorts requests on the features of their requesters.
+        """
+        self.requester = requester
+        self.units = units
+        self.request_date = request_date
+        self.on_granted = on_granted
+
+    def __getattr__(self, name: str):
+        if name == 'requester' or name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.requester, name)
+
 
 class Resource(IntelligentObject):
     def __init__(self,
                  name: str,
                  owner: Union[IntelligentObject, None] = None,
-                 sorting_feature: Union[str, None] = None,
-                 sorting_policy: str = 'smallest'):
+                 sorting_feature: Union[str, tuple, None] = None,
+                 sorting_policy: Union[str, tuple] = 'smallest',
+                 capacity: int = 1):
+        """
+        Resource with capacity units that requesters seize and release. Requests that can not be served wait
+        in a SimQueue sorted by the sorting_feature of the requester, read once when the request is made, FIFO
+        when it is None or tied. A tuple of features, e.g. ('priority', 'due_date'), sorts on each in turn. Released
+        units are granted right away to the waiting requests, scheduling a wake-up event for each of them.
+        Busy units and waiting line length are integrated over time as they change.
+        :param owner: initial holder of the resource, it seizes one unit.
+        :param capacity: number of units of the resource.
+        """
         super().__init__(name=name)
-        self.__seized = False
-        self.__owner = owner
+        self.__capacity = capacity
+        self.__sorting_feature = sorting_feature
         self.__ride_request_queue = SimQueue(name=f'{name}_ride_request_queue',
                                              sorting_feature=sorting_feature,
                                              sorting_policy=sorting_policy)
+        self.__holders = dict()
+        self.__owner = None
+        self.__units_in_use = 0
+        self.__last_change_date = 0.0
+        self.__busy_time = 0.0
+        self.__queue_time = 0.0
+        self.__seize_count = 0
+        self.__wait_time_total = 0.0
+        if owner is not None:
+            self.__grant(owner, units=1)
+
+    def __accumulate(self, date: float):
+        """
+        Integrates busy units and waiting line length from the last change up to date.
+        """
+        elapsed = date - self.__last_change_date
+        if elapsed > 0:
+            self.__busy_time += elapsed*self.__units_in_use
+            self.__queue_time += elapsed*self.__ride_request_queue.length
+            self.__last_change_date = date
+
+    def __grant(self, requester, units: int):
+        self.__units_in_use += units
+        self.__holders[requester] = self.__holders.get(requester, 0) + units
+        self.__owner = requester
+        self.__seize_count += 1
+
+    def seize(self,
+              requester,
+              date: float,
+              units: int = 1,
+              on_granted: Union[Callable, None] = None):
+        """
+        Requests units of the resource for requester. They are granted right away if free and nobody is
+        waiting, otherwise the request joins the waiting line.
+        :param on_granted: called as on_granted(requester, date) when a waiting request is granted.
+        :return: True if the units were granted right away.
+        """
+        if units > self.__capacity:
+            raise ValueError(f'{self.name} has {self.__capacity} units, {units} can not be seized.')
+        self.__accumulate(date)
+        if self.__ride_request_queue.length == 0 and self.__units_in_use + units <= self.__capacity:
+            self.__grant(requester, units=units)
+            return True
+        self.__ride_request_queue.add_entity(ResourceRequest(requester=requester,
+                                                             units=units,
+                                                             request_date=date,
+                                                             on_granted=on_granted))
+        return False
+
+    def release(self,
+                date: float,
+                actions: Union[HeapQueue, None] = None,
+                holder=None,
+                units: int = 1):
+        """
+        Releases units held by holder, the current owner by default, and grants the freed units to the waiting
+        requests in priority order. A wake-up event calling on_granted is scheduled in actions for every granted
+        request, on_granted is called directly if actions is None.
+        :return: list of the requesters granted.
+        """
+        holder = self.__owner if holder is None else holder
+        held_units = self.__holders.get(holder, 0)
+        if held_units < units:
+            raise ValueError(f'{getattr(holder, "name", holder)} does not hold {units} units of {self.name}.')
+        self.__accumulate(date)
+        if held_units == units:
+            del self.__holders[holder]
+        else:
+            self.__holders[holder] = held_units - units
+        self.__units_in_use -= units
+        if self.__owner is holder and holder not in self.__holders:
+            self.__owner = next(reversed(self.__holders), None)
+        granted = list()
+        waiting_line = self.__ride_request_queue
+        while waiting_line.length > 0 and self.__units_in_use + waiting_line.peek().units <= self.__capacity:
+            request = waiting_line.pop()
+            self.__grant(request.requester, units=request.units)
+            self.__wait_time_total += date - request.request_date
+            granted.append(request.requester)
+            if request.on_granted is None:
+                continue
+            if actions is None:
+                request.on_granted(request.requester, date)
+            else:
+                actions.add_entity(SimEvent(start_date=request.request_date,
+                                            end_date=date,
+                                            event_name=f'seized_{self.name}',
+                                            action=request.on_granted,
+                                            action_args=(request.requester, date)))
+        return granted
+
+    # Statistics
+    def utilization(self, date: float):
+        """
+        :return: share of the capacity busy from the simulation start up to date.
+        """
+        self.__accumulate(date)
+        return self.__busy_time/(self.__capacity*date) if date > 0 else 0.0
 
-    @staticmethod
-    def seize(self):
-        pass
+    def mean_queue_length(self, date: float):
+        """
+        :return: time average of the number of waiting requests from the simulation start up to date.
+        """
+        self.__accumulate(date)
+        return self.__queue_time/date if date > 0 else 0.0
+
+    @property
+    def mean_wait_time(self):
+        """
+        :return: mean waiting time, in seconds, of the seizes, including the ones granted right away.
+        """
+        return self.__wait_time_total/self.__seize_count if self.__seize_count else 0.0
 
     # Getters and setters
     @property
     def owner(self):
         return self.__owner
 
-    @owner.setter
-    def owner(self, new_owner: IntelligentObject):
-        self.__owner = new_owner
+    @property
+    def holders(self):
+        return self.__holders
 
     @property
     def seized(self):
-        return self.__seized
+        """
+        :return: True if every unit is in use.
+        """
+        return self.__units_in_use >= self.__capacity
 
-    @seized.setter
-    def seized(self, seize_value: bool):
-        self.__seized = seize_value
+    @property
+    def capacity(self):
+        return self.__capacity
+
+    @capacity.setter
+    def capacity(self, new_capacity: int):
+        self.__capacity = new_capacity
+
+    @property
+    def units_in_use(self):
+        return self.__units_in_use
+
+    @property
+    def seize_count(self):
+        return self.__seize_count
+
+    @property
+    def busy_time(self):
+        return self.__busy_time
+
+    @property
+    def sorting_feature(self):
+        return self.__sorting_feature
 
     @property
     def ride_request_queue(self):
@@ -404,9 +1197,13 @@ class Path(IntelligentObject):
                  node_from: SimNode,
                  node_to: SimNode,
                  speed: Union[float, None] = None,
-                 lead_time: Union[float, None] = None,
+                 lead_time: Union[float, Distribution, None] = None,
                  weight: float = 1.0,
                  available: bool = True):
+        """
+        :param lead_time: travel time in hours, fixed or random.
+        :param weight: relative probability of the path among the outgoing paths of node_from.
+        """
         super().__init__(name=name)
         self.valid_options = ['path_time', 'standard']
         # Validation
@@ -446,7 +1243,7 @@ class Path(IntelligentObject):
         return self.__lead_time
 
     @lead_time.setter
-    def lead_time(self, new_lead_time: float):
+    def lead_time(self, new_lead_time: Union[float, Distribution]):
         self.__lead_time = new_lead_time
 
     @property
@@ -483,52 +1280,210 @@ class Path(IntelligentObject):
 
 
 class Creator(IntelligentObject):
+    # Actions of the creator that simultaneous events can run in bulk, mapped to their batch handler.
+    batch_handlers = {'create_entity': 'create_entity_batch'}
+
     def __init__(self,
                  name: str,
                  position: tuple,
                  arrival_type: str,
-                 arrival_rate: Union[str, None],
-                 arrival_table: Union[pd.DataFrame, None],
-                 datetime_column: str,
+                 arrival_rate: Union[float, Distribution, PiecewiseRate, None],
+                 arrival_table: Union[pd.DataFrame, str, Iterable, None],
+                 datetime_column: Union[str, None],
                  name_column: Union[str, None],
+                 seed: Union[int, None] = None,
+                 time_unit: str = 'hours',
+                 arrival_horizon: Union[float, None] = None,
+                 max_arrivals: Union[int, None] = None
                  ):
+        """
+        Source of entities of the model.
+        :param arrival_type: 'arrival_table' schedules every row of arrival_table before the run starts.
+        'stream' keeps a single pending arrival and reads the next one when it fires, arrival_table may then
+        be a DataFrame sorted by datetime_column, a path to a csv or parquet file, or any iterable of
+        (arrival_date, entity_name) tuples. 'rate' streams random arrivals drawn from arrival_rate.
+        :param arrival_rate: with arrival_type 'rate', arrivals per time unit of a Poisson process, a
+        Distribution of inter-arrival times in time units or a PiecewiseRate.
+        :param seed: seed of the random arrivals. The stream of the creator depends on the seed and its name.
+        :param time_unit: unit of arrival_rate and arrival_horizon.
+        :param arrival_horizon: with arrival_type 'rate', no arrival after arrival_horizon time units.
+        :param max_arrivals: with arrival_type 'rate', number of entities created at most.
+        """
         super().__init__(name=name)
+        self.valid_options = ['arrival_table', 'stream', 'rate']
+        if arrival_type not in self.valid_options:
+            raise NotImplementedError(f'{arrival_type} not a valid arrival_type. '
+                                      f'Valid options are: {", ".join(self.valid_options)}')
         self.__position = position
         self.__arrival_type = arrival_type
         self.__arrival_rate = arrival_rate
         self.__arrival_table = arrival_table
         self.__datetime_column = datetime_column
         self.__name_column = name_column
+        self.__seed = seed
+        self.__time_unit = time_unit
+        self.__arrival_horizon = arrival_horizon
+        self.__max_arrivals = max_arrivals
+        self.__arrival_iterator = None
+        self.__last_arrival_date = None
+        self.__clock = None
+        self.__entity_table = None
         self.__output_node = SimNode(name=f'{name}_output_node',
                                      position=position)
 
+    def schedule_arrivals(self,
+                          network: Network,
+                          actions_queue: HeapQueue,
+                          clock: SimClock):
+        """
+        Schedules the arrivals of the creator according to its arrival_type.
+        """
+        if self.arrival_type in ['stream', 'rate']:
+            self.start_arrival_stream(network=network,
+                                      actions_queue=actions_queue,
+                                      clock=clock)
+        else:
+            self.create_entities_from_arrival_table(network=network,
+                                                    actions_queue=actions_queue,
+                                                    clock=clock)
+
     def create_entities_from_arrival_table(self,
-                                           network: dict,
-                                           events_dict: dict,
-                                           actions_queue: SimQueue):
-        for idx, row in self.arrival_table.iterrows():
-            datetime_loc = row[self.datetime_column]
-            if self.name_column is None:
-                entity_name = f'entity_{idx}'
-            else:
-                entity_name = row[self.name_column]
-            new_event = SimEvent(start_date=datetime_loc,
-                                 end_date=datetime_loc,
-                                 event_name='created_entity',
-                                 object_dictionary={'entity_name': entity_name,
-                                                    'my_network': network,
-                                                    'creation_date': datetime_loc,
-                                                    'creator_output_node': self.output_node,
-                                                    'events_dict': events_dict,
-                                                    'actions_queue': actions_queue},
-                                 action_string='new_entity = Entity(name=entity_name, '
-                                               'creation_date=creation_date, '
-                                               'network=my_network);'
-                                               'creator_output_node.on_entered(entity=new_entity, '
-                                               'enter_date=creation_date, '
-                                               'events=events_dict,'
-                                               'actions=actions_queue)')
-            actions_queue.add_entity(new_event)
+                                           network: Network,
+                                           actions_queue: HeapQueue,
+                                           clock: SimClock):
+        """
+        Schedules the creation of one entity per row of the arrival table. Dates and names are converted
+        once for the whole table and the events are pushed to the actions queue with a single bulk insert.
+        """
+        arrival_dates = clock.to_simulation_times(self.arrival_table[self.datetime_column]).tolist()
+        if self.name_column is None:
+            entity_names = ('entity_' + self.arrival_table.index.astype(str)).to_numpy()
+        else:
+            entity_names = self.arrival_table[self.name_column].to_numpy()
+        actions_queue.add_entities(SimEvent(start_date=datetime_loc,
+                                            end_date=datetime_loc,
+                                            event_name='created_entity',
+                                            action=self.create_entity,
+                                            action_args=(entity_name, datetime_loc, network, actions_queue))
+                                   for datetime_loc, entity_name in zip(arrival_dates, entity_names))
+
+    def start_arrival_stream(self,
+                             network: Network,
+                             actions_queue: HeapQueue,
+                             clock: SimClock):
+        """
+        Opens the arrival source and schedules its first arrival. Following arrivals are read one at a time
+        when the previous one fires, so memory does not grow with the size of the arrival table.
+        """
+        self.__clock = clock
+        self.__arrival_iterator = ResumableArrivals(self.__arrival_source(clock))
+        self.__last_arrival_date = None
+        self.schedule_next_arrival(network=network,
+                                   actions=actions_queue)
+
+    def __arrival_source(self, clock: SimClock):
+        """
+        :return: iterable of (arrival_date, entity_name) of the stream, dates in seconds.
+        """
+        if self.arrival_type == 'rate':
+            return RateArrivals(arrival_rate=self.arrival_rate,
+                                rng=object_rng(seed=self.seed, name=self.name),
+                                time_unit=self.time_unit,
+                                horizon=self.arrival_horizon,
+                                max_arrivals=self.max_arrivals)
+        return make_arrival_source(arrival_table=self.arrival_table,
+                                   datetime_column=self.datetime_column,
+                                   name_column=self.name_column,
+                                   clock=clock)
+
+    def arrival_times(self, clock: SimClock):
+        """
+        Reads every arrival of the creator without scheduling them.
+        :return: array with the creation dates, in seconds, of the entities in creation order.
+        """
+        if self.arrival_type == 'arrival_table':
+            return np.sort(clock.to_simulation_times(self.arrival_table[self.datetime_column]), kind='stable')
+        arrival_dates = np.fromiter((arrival_date for arrival_date, entity_name in self.__arrival_source(clock)),
+                                    dtype=np.float64)
+        if (np.diff(arrival_dates) < 0).any():
+            raise ValueError(f'Arrivals of {self.name} must be sorted by date.')
+        return arrival_dates
+
+    def schedule_next_arrival(self,
+                              network: Network,
+                              actions: HeapQueue):
+        try:
+            datetime_loc, entity_name = next(self.__arrival_iterator)
+        except StopIteration:
+            self.__arrival_iterator = None
+            return
+        if self.__last_arrival_date is not None and datetime_loc < self.__last_arrival_date:
+            raise ValueError(f'Arrivals of {self.name} must be sorted by date: '
+                             f'{entity_name} arrives at {self.__clock.to_datetime(datetime_loc)}, '
+                             f'before {self.__clock.to_datetime(self.__last_arrival_date)}.')
+        self.__last_arrival_date = datetime_loc
+        actions.add_entity(SimEvent(start_date=datetime_loc,
+                                    end_date=datetime_loc,
+                                    event_name='created_entity',
+                                    action=self.create_streamed_entity,
+                                    action_args=(entity_name, datetime_loc, network, actions)))
+
+    def create_streamed_entity(self,
+                               entity_name: str,
+                               creation_date: float,
+                               network: Network,
+                               actions: HeapQueue):
+        """
+        Schedules the next arrival of the stream and creates the current entity.
+        :return: the created entity.
+        """
+        self.schedule_next_arrival(network=network,
+                                   actions=actions)
+        return self.create_entity(entity_name=entity_name,
+                                  creation_date=creation_date,
+                                  network=network,
+                                  actions=actions)
+
+    def create_entity(self,
+                      entity_name: str,
+                      creation_date: float,
+                      network: Network,
+                      actions: HeapQueue):
+        """
+        Creates a new entity and makes it enter the creator output node.
+        :return: the created entity.
+        """
+        if self.entity_table is None:
+            new_entity = Entity(name=entity_name,
+                                creation_date=creation_date,
+                                network=network)
+        else:
+            new_entity = self.entity_table.new_entity(name=entity_name,
+                                                      creation_date=creation_date)
+        self.output_node.on_entered(entity=new_entity,
+                                    enter_date=creation_date,
+                                    actions=actions)
+        return new_entity
+
+    def create_entity_batch(self, events: list):
+        """
+        Batch handler of simultaneous create_entity events of the creator. Entities are created with one bulk
+        insert and enter the output node together, in the order of the events.
+        :return: the created entities.
+        """
+        entity_names = [event.action_args[0] for event in events]
+        creation_date, network, actions = events[0].action_args[1:]
+        if self.entity_table is None:
+            new_entities = [Entity(name=entity_name,
+                                   creation_date=creation_date,
+                                   network=network) for entity_name in entity_names]
+        else:
+            new_entities = self.entity_table.new_entities(names=entity_names,
+                                                          creation_dates=np.full(len(entity_names), creation_date))
+        self.output_node.on_entered_batch(entities=new_entities,
+                                          actions=actions,
+                                          enter_date=creation_date)
+        return new_entities
 
     # Getters and setters
     @property
@@ -547,6 +1502,38 @@ class Creator(IntelligentObject):
     def arrival_rate(self):
         return self.__arrival_rate
 
+    @arrival_rate.setter
+    def arrival_rate(self, new_arrival_rate: Union[float, Distribution, PiecewiseRate]):
+        self.__arrival_rate = new_arrival_rate
+
+    @property
+    def seed(self):
+        return self.__seed
+
+    @seed.setter
+    def seed(self, new_seed: Union[int, None]):
+        self.__seed = new_seed
+
+    @property
+    def time_unit(self):
+        return self.__time_unit
+
+    @property
+    def arrival_horizon(self):
+        return self.__arrival_horizon
+
+    @arrival_horizon.setter
+    def arrival_horizon(self, new_arrival_horizon: Union[float, None]):
+        self.__arrival_horizon = new_arrival_horizon
+
+    @property
+    def max_arrivals(self):
+        return self.__max_arrivals
+
+    @max_arrivals.setter
+    def max_arrivals(self, new_max_arrivals: Union[int, None]):
+        self.__max_arrivals = new_max_arrivals
+
     @property
     def arrival_table(self):
         return self.__arrival_table
@@ -563,6 +1550,14 @@ class Creator(IntelligentObject):
     def output_node(self):
         return self.__output_node
 
+    @property
+    def entity_table(self):
+        return self.__entity_table
+
+    @entity_table.setter
+    def entity_table(self, new_entity_table: Union[EntityTable, None]):
+        self.__entity_table = new_entity_table
+
 
 class Destructor(IntelligentObject):
     def __init__(self,
@@ -570,26 +1565,146 @@ class Destructor(IntelligentObject):
                  str, position: tuple):
         super().__init__(name=name)
         self.__input_node = SimNode(name=f'{name}_input_node',
-                                    position=position)
+                                    position=position,
+                                    is_destructor=True)
 
     @property
     def input_node(self):
         return self.__input_node
 
+    @property
+    def destroyed_count(self):
+        return self.__input_node.destroyed_count
+
+    @property
+    def mean_time_in_system(self):
+        if self.destroyed_count == 0:
+            return np.nan
+        return self.__input_node.time_in_system_total/self.destroyed_count
+
+
+class StationStep(SimProcess):
+    def __init__(self,
+                 name: str,
+                 station,
+                 step: Callable):
+        """
+        Runs a step of a TaskStation, step(entity, actions, date), when its input node admits or releases an
+        entity.
+        """
+        super().__init__(name=name,
+                         associated_object=None,
+                         context_object=station)
+        self.__step = step
+
+    def run_process(self, entity=None, actions=None, date: float = 0.0, **kwargs):
+        return self.__step(entity, actions, date)
+
+    def seed_streams(self, seed: Union[int, None]):
+        """
+        Seeds the process of the station as well.
+        """
+        super().seed_streams(seed)
+        station_process = self.context_object.process
+        if station_process is not EMPTY_PROCESS:
+            station_process.seed_streams(seed)
+
 
 class TaskStation(IntelligentObject):
     def __init__(self,
                  name: str,
-                 position: tuple):
+                 position: tuple,
+                 servers: int = 1,
+                 process: Union[SimProcess, None] = None):
+        """
+        Station with servers working in parallel. An entity admitted by the input node is handed to a free
+        server, taken from a stack in O(1), and the process runs on it. The process is created once and reused
+        for every entity, it is called as run_process(entity=..., actions=..., date=..., station=...) and is
+        not modified, so stations can share it. If it returns a SimEvent, e.g. a DelayProcess, the server works
+        until its end_date, then the entity moves to the output node and the server goes back to the stack.
+        Entities finding every server busy wait in the input node queue. Busy time is accumulated by server.
+        :param servers: number of servers of the station.
+        :param process: process run on every entity. If None, entities go through without delay.
+        """
         super().__init__(name=name)
         self.__name = name
         self.__position = position
-        self.__input_node = SimNode(name='-'.join([name, 'node']),
-                                    position=position)
-        self.__processing_queue = SimQueue(name='-'.join([name, 'processing_queue']))
-        self.__output_node = SimNode(name='-'.join([name, 'node']),
-                                     position=position)
+        self.__servers = servers
+        self.__process = process if process is not None else EMPTY_PROCESS
+        # Server 0 on top of the stack.
+        self.__free_servers = list(range(servers - 1, -1, -1))
+        self.__entity_servers = dict()
+        self.__busy_since = [0.0]*servers
+        self.__server_busy_time = [0.0]*servers
+        self.__processed_count = 0
+        self.__output_node = SimNode(name=f'{name}_output_node',
+                                     position=position,
+                                     capacity=servers)
+        self.__input_node = SimNode(name=f'{name}_input_node',
+                                    position=position,
+                                    capacity=servers,
+                                    next_node=self.__output_node,
+                                    entry_process=StationStep(name=f'{name}_start',
+                                                              station=self,
+                                                              step=self.start_processing),
+                                    exit_process=StationStep(name=f'{name}_finish',
+                                                             station=self,
+                                                             step=self.finish_processing))
+        self.__processing_queue = SimQueue(name=f'{name}_processing_queue')
+
+    def start_processing(self,
+                         entity: BaseEntity,
+                         actions: HeapQueue,
+                         date: float):
+        """
+        Assigns a free server to entity and runs the station process on it.
+        :return: value returned by the process, a SimEvent sets the end of the processing.
+        """
+        server = self.__free_servers.pop()
+        self.__entity_servers[entity] = server
+        self.__busy_since[server] = date
+        self.__processing_queue.add_entity(entity)
+        return self.__process.execute(entity=entity,
+                                      actions=actions,
+                                      date=date,
+                                      station=self)
+
+    def finish_processing(self,
+                          entity: BaseEntity,
+                          actions: HeapQueue,
+                          date: float):
+        """
+        Frees the server of entity.
+        """
+        server = self.__entity_servers.pop(entity)
+        self.__server_busy_time[server] += date - self.__busy_since[server]
+        self.__free_servers.append(server)
+        self.__processing_queue.remove(entity)
+        self.__processed_count += 1
+
+    # Statistics
+    def busy_times(self, date: float):
+        """
+        :return: array with the busy time, in seconds, of every server from the simulation start up to date.
+        """
+        busy_times = np.array(self.__server_busy_time)
+        for server in self.__entity_servers.values():
+            busy_times[server] += date - self.__busy_since[server]
+        return busy_times
+
+    def idle_times(self, date: float):
+        """
+        :return: array with the idle time, in seconds, of every server from the simulation start up to date.
+        """
+        return date - self.busy_times(date)
+
+    def utilization(self, date: float):
+        """
+        :return: share of the servers busy from the simulation start up to date.
+        """
+        return float(self.busy_times(date).sum()/(self.__servers*date)) if date > 0 else 0.0
 
+    # Getters and setters
     @property
     def position(self):
         return self.__position
@@ -610,6 +1725,22 @@ class TaskStation(IntelligentObject):
     def processing_queue(self):
         return self.__processing_queue
 
+    @property
+    def process(self):
+        return self.__process
+
+    @property
+    def servers(self):
+        return self.__servers
+
+    @property
+    def busy_servers(self):
+        return len(self.__entity_servers)
+
+    @property
+    def processed_count(self):
+        return self.__processed_count
+
 
 if __name__ == '__main__':
     e1 = Entity(name='Entity1')
@@ -618,5 +1749,5 @@ if __name__ == '__main__':
     sim_queue = SimQueue(name='NewQueue')
     sim_queue.add_entity(e2)
     sim_queue.add_entity(e3)
-    sim_queue.add_entity(e2)
+    sim_queue.add_entity(e1)
     print(sim_queue.print_content_names())
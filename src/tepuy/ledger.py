@@ -0,0 +1,334 @@
+from typing import Union
+import numpy as np
+
+
+class _CsrMatrix:
+    def __init__(self,
+                 indptr: np.ndarray,
+                 indices: np.ndarray,
+                 data: np.ndarray,
+                 size: int):
+        """
+        Square sparse matrix in compressed sparse row format. Row i holds the quantities of every component
+        needed per unit of material i.
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.size = size
+
+    @classmethod
+    def from_rows(cls, rows: list, size: int):
+        """
+        :param rows: one dictionary per row mapping column to value.
+        """
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(row) for row in rows])
+        indices = np.array([column for row in rows for column in sorted(row)], dtype=np.int64)
+        data = np.array([row[column] for row in rows for column in sorted(row)], dtype=np.float64)
+        return cls(indptr=indptr, indices=indices, data=data, size=size)
+
+    def row(self, row: int):
+        begin, end = self.indptr[row], self.indptr[row + 1]
+        return self.indices[begin:end], self.data[begin:end]
+
+    def vecmat(self, vector: np.ndarray):
+        """
+        :return: vector @ matrix, the components needed by the quantities of vector.
+        """
+        weights = np.repeat(vector[:self.size], np.diff(self.indptr))*self.data
+        return np.bincount(self.indices, weights=weights, minlength=self.size)
+
+    def rows_to_coo(self, rows: np.ndarray, quantities: np.ndarray):
+        """
+        :return: (row position, column, value) of the entries of the given rows scaled by quantities.
+        """
+        counts = self.indptr[rows + 1] - self.indptr[rows]
+        positions = np.repeat(np.arange(len(rows)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        entries = np.repeat(self.indptr[rows], counts) + offsets
+        return positions, self.indices[entries], self.data[entries]*quantities[positions]
+
+
+class MaterialLedger:
+    def __init__(self, initial_capacity: int = 64):
+        """
+        Inventory of every material of a model stored in one NumPy vector indexed by material id, and bills of
+        materials stored as a sparse matrix. Multi-level explosions are precomputed the first time they are
+        needed, so producing or consuming any batch of materials is a handful of vectorized operations.
+        """
+        self.__names = list()
+        self.__ids = dict()
+        self.__units = list()
+        self.__boms = list()
+        self.__inventory = np.zeros(initial_capacity)
+        self.__matrices = None
+        # Incremented when materials are added or boms change, so views of the ledger can tell they are stale.
+        self.__version = 0
+
+    def __resolve(self, material):
+        """
+        :return: id of a material given by name or by any object with a name, e.g. a Material.
+        """
+        name = getattr(material, 'name', material)
+        try:
+            return self.__ids[name]
+        except KeyError:
+            raise KeyError(f'{name} is not a material of the ledger.')
+
+    def add_material(self,
+                     name: str,
+                     quantity: float = 0.0,
+                     unit: Union[str, None] = None,
+                     bom: Union[dict, None] = None):
+        """
+        Registers a material, components of its bom that are not registered yet are added with no stock.
+        :return: id of the material.
+        """
+        if name in self.__ids:
+            raise ValueError(f'{name} is already a material of the ledger.')
+        material_id = len(self.__names)
+        if material_id == len(self.__inventory):
+            self.__inventory = np.concatenate([self.__inventory, np.zeros(len(self.__inventory))])
+        self.__ids[name] = material_id
+        self.__version += 1
+        self.__names.append(name)
+        self.__units.append(unit)
+        self.__boms.append(dict())
+        self.set_quantity(name, quantity)
+        self.set_bom(name, bom)
+        return material_id
+
+    def material_id(self, material):
+        return self.__resolve(material)
+
+    def rename(self, material, new_name: str):
+        if new_name in self.__ids:
+            raise ValueError(f'{new_name} is already a material of the ledger.')
+        material_id = self.__ids.pop(getattr(material, 'name', material))
+        self.__ids[new_name] = material_id
+        self.__names[material_id] = new_name
+
+    def quantity(self, material):
+        return float(self.__inventory[self.__resolve(material)])
+
+    def set_quantity(self, material, quantity: float):
+        if quantity < 0:
+            raise ValueError(f'{getattr(material, "name", material)} can not have a negative quantity.')
+        self.__inventory[self.__resolve(material)] = quantity
+
+    def unit(self, material):
+        return self.__units[self.__resolve(material)]
+
+    def set_unit(self, material, unit: str):
+        self.__units[self.__resolve(material)] = unit
+
+    def bom(self, material):
+        """
+        :return: dictionary mapping component name to the quantity needed per unit of material, None if the
+        material has no bom.
+        """
+        bom = self.__boms[self.__resolve(material)]
+        return {self.__names[component]: quantity for component, quantity in bom.items()} if bom else None
+
+    def set_bom(self, material, bom: Union[dict, None]):
+        material_id = self.__resolve(material)
+        components = dict()
+        for component, quantity in (bom or dict()).items():
+            component_name = getattr(component, 'name', component)
+            if component_name not in self.__ids:
+                self.add_material(name=component_name)
+            components[self.__ids[component_name]] = float(quantity)
+        self.__boms[material_id] = components
+        self.__matrices = None
+        self.__version += 1
+
+    # Compiled boms
+    def __compile(self):
+        """
+        Builds the direct bom matrix, the total requirements matrix summing every level of the explosion and
+        the leaf requirements matrix keeping only materials without bom.
+        """
+        size = len(self.__names)
+        order = self.__components_first_order()
+        totals = [dict() for _ in range(size)]
+        for material_id in order:
+            total = totals[material_id]
+            for component, quantity in self.__boms[material_id].items():
+                total[component] = total.get(component, 0.0) + quantity
+                for sub_component, sub_quantity in totals[component].items():
+                    total[sub_component] = total.get(sub_component, 0.0) + quantity*sub_quantity
+        is_leaf = [len(bom) == 0 for bom in self.__boms]
+        leaves = [{component: quantity for component, quantity in total.items() if is_leaf[component]}
+                  for total in totals]
+        self.__matrices = {'direct': _CsrMatrix.from_rows(self.__boms, size),
+                           'total': _CsrMatrix.from_rows(totals, size),
+                           'leaf': _CsrMatrix.from_rows(leaves, size)}
+
+    def __components_first_order(self):
+        """
+        :return: material ids ordered so every material comes after its components.
+        """
+        size = len(self.__names)
+        pending_components = [len(bom) for bom in self.__boms]
+        parents = [list() for _ in range(size)]
+        for material_id, bom in enumerate(self.__boms):
+            for component in bom:
+                parents[component].append(material_id)
+        ready = [material_id for material_id in range(size) if pending_components[material_id] == 0]
+        order = list()
+        while ready:
+            material_id = ready.pop()
+            order.append(material_id)
+            for parent in parents[material_id]:
+                pending_components[parent] -= 1
+                if pending_components[parent] == 0:
+                    ready.append(parent)
+        if len(order) < size:
+            cyclic = [self.__names[material_id] for material_id in range(size) if pending_components[material_id]]
+            raise ValueError(f'boms of {", ".join(cyclic)} are cyclic.')
+        return order
+
+    def matrix(self, explosion: str = 'direct'):
+        """
+        :param explosion: 'direct' for the components of the bom, 'total' for the components of every level,
+        'leaf' for the materials without bom reached through every level.
+        """
+        valid_options = ['direct', 'total', 'leaf']
+        if explosion not in valid_options:
+            raise NotImplementedError(f'{explosion} not a valid explosion. '
+                                      f'Valid options are: {", ".join(valid_options)}')
+        if self.__matrices is None:
+            self.__compile()
+        return self.__matrices[explosion]
+
+    # Vectorized operations
+    def vector(self, quantities):
+        """
+        :param quantities: dictionary mapping materials, or their names, to quantities, or an array indexed
+        by material id.
+        :return: array of quantities indexed by material id.
+        """
+        if isinstance(quantities, dict):
+            vector = np.zeros(len(self.__names))
+            for material, quantity in quantities.items():
+                vector[self.__resolve(material)] += quantity
+            return vector
+        vector = np.asarray(quantities, dtype=np.float64)
+        if len(vector) != len(self.__names):
+            raise ValueError(f'quantities have {len(vector)} values for {len(self.__names)} materials.')
+        return vector
+
+    def requirements(self, quantities, explosion: str = 'direct'):
+        """
+        :return: array with the quantity of every material needed to produce quantities.
+        """
+        return self.matrix(explosion).vecmat(self.vector(quantities))
+
+    def shortages(self, requirements):
+        """
+        :return: array with the quantity missing in inventory to cover requirements, zero when covered.
+        """
+        return np.maximum(self.vector(requirements) - self.inventory, 0.0)
+
+    def shortages_by_order(self,
+                           materials,
+                           quantities,
+                           explosion: str = 'direct'):
+        """
+        Checks a sequence of orders against the current inventory, every order being served after the previous
+        ones, short or not.
+        :param materials: material of every order, as ids, names or objects with a name.
+        :param quantities: quantity produced by every order.
+        :return: boolean array, True for the orders whose components are short.
+        """
+        material_ids = np.array([material if isinstance(material, (int, np.integer)) else self.__resolve(material)
+                                 for material in materials], dtype=np.int64)
+        quantities = np.asarray(quantities, dtype=np.float64)
+        orders, components, needed = self.matrix(explosion).rows_to_coo(material_ids, quantities)
+        # Cumulative requirement of every component in order sequence.
+        sort = np.lexsort((orders, components))
+        orders, components, needed = orders[sort], components[sort], needed[sort]
+        cumulative = np.cumsum(needed)
+        first_of_component = np.flatnonzero(np.append(True, components[1:] != components[:-1]))
+        group_offsets = np.repeat(cumulative[first_of_component] - needed[first_of_component],
+                                  np.diff(np.append(first_of_component, len(components))))
+        short = np.zeros(len(material_ids), dtype=bool)
+        short[orders[cumulative - group_offsets > self.inventory[components] + 1e-9]] = True
+        return short
+
+    def receive(self, quantities):
+        """
+        Adds quantities to the inventory.
+        """
+        vector = self.vector(quantities)
+        if (vector < 0).any():
+            raise ValueError('Quantity must be positive.')
+        self.__inventory[:len(self.__names)] += vector
+
+    def consume(self, quantities):
+        """
+        Removes quantities from the inventory. Nothing is removed if any material is short.
+        """
+        vector = self.vector(quantities)
+        if (vector < 0).any():
+            raise ValueError('Quantity must be positive.')
+        self.__check_shortages(vector)
+        self.__inventory[:len(self.__names)] -= vector
+
+    def produce(self, quantities, explosion: str = 'direct'):
+        """
+        Adds quantities to the inventory and consumes the components they need. With explosion 'leaf',
+        intermediate materials are not taken from inventory, their own components are.
+        """
+        if isinstance(quantities, dict) and len(quantities) == 1:
+            (material, quantity), = quantities.items()
+            self.__produce_one(self.__resolve(material), quantity, explosion)
+            return
+        vector = self.vector(quantities)
+        if (vector < 0).any():
+            raise ValueError('Quantity must be positive.')
+        requirements = self.matrix(explosion).vecmat(vector)
+        self.__check_shortages(requirements)
+        self.__inventory[:len(self.__names)] += vector - requirements
+
+    def __produce_one(self, material_id: int, quantity: float, explosion: str):
+        """
+        Produce for a single material, only its row of the bom matrix is read.
+        """
+        if quantity < 0:
+            raise ValueError('Quantity must be positive.')
+        components, needed = self.matrix(explosion).row(material_id)
+        needed = needed*quantity
+        self.__check_shortages(needed, components)
+        self.__inventory[components] -= needed
+        self.__inventory[material_id] += quantity
+
+    def __check_shortages(self, requirements: np.ndarray, material_ids: Union[np.ndarray, None] = None):
+        inventory = self.inventory if material_ids is None else self.__inventory[material_ids]
+        missing = np.flatnonzero(requirements > inventory + 1e-9)
+        if len(missing) > 0:
+            if material_ids is not None:
+                missing = material_ids[missing]
+            raise ValueError(f'not enough {", ".join(self.__names[material_id] for material_id in missing)} '
+                             f'in inventory.')
+
+    # Getters and setters
+    @property
+    def names(self):
+        return self.__names
+
+    @property
+    def inventory(self):
+        """
+        :return: view of the inventory vector, indexed by material id.
+        """
+        return self.__inventory[:len(self.__names)]
+
+    @property
+    def version(self):
+        return self.__version
+
+    @property
+    def length(self):
+        return len(self.__names)
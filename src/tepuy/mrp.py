@@ -0,0 +1,329 @@
+import math
+from typing import Union
+import numpy as np
+import pandas as pd
+from tepuy.clock import SimClock
+from tepuy.instrumentation import EventLoopHook
+from tepuy.ledger import MaterialLedger
+from tepuy.processes import SimEvent
+from tepuy.queues import HeapQueue
+
+
+class ShortageProjector(EventLoopHook):
+    def __init__(self,
+                 ledger: MaterialLedger,
+                 horizon: float,
+                 bucket_seconds: float = 3600.0,
+                 explosion: str = 'direct'):
+        """
+        Incremental projection of the stock of every material of a ledger over the pending work orders.
+        Simulation time, up to horizon, is split in buckets of bucket_seconds. A segment tree over the buckets
+        keeps, for every material at once, the net demand (component requirements minus receipts) of each
+        range of buckets and its largest prefix sum. Adding, consuming or receiving an order updates one path of
+        the tree, O(log n), and the first shortage of a material is found by descending the tree, O(log n).
+        The tree follows the ledger: materials added or boms changed after construction resize it and recompute the
+        requirements of the pending orders on the next call.
+        Added to the hooks of a model, receipts scheduled on its calendar are projected when the run starts, and
+        orders and receipts leave the projection as their events are processed and the ledger stock changes.
+        :param ledger: ledger with the boms and the current stock.
+        :param horizon: simulation time, in seconds, covered by the projection.
+        :param bucket_seconds: width of the time buckets.
+        :param explosion: bom explosion used to compute the requirements of an order, see MaterialLedger.
+        """
+        self.__ledger = ledger
+        self.__bucket_seconds = bucket_seconds
+        self.__explosion = explosion
+        self.__bucket_count = max(int(math.ceil(horizon/bucket_seconds)), 1)
+        self.__size = 1 << (self.__bucket_count - 1).bit_length()
+        self.__material_count = ledger.length
+        self.__version = ledger.version
+        self.__sums = np.zeros((2*self.__size, self.__material_count))
+        self.__max_prefix = np.zeros((2*self.__size, self.__material_count))
+        self.__orders = dict()
+        self.__receipts = dict()
+        self.__receipt_count = 0
+
+    def bucket(self, date: float):
+        bucket = int(date//self.__bucket_seconds)
+        if bucket < 0 or bucket >= self.__bucket_count:
+            raise ValueError(f'{date} is outside the projection horizon.')
+        return bucket
+
+    def __update(self, bucket: int, material_ids: np.ndarray, quantities: np.ndarray):
+        """
+        Adds quantities to the net demand of bucket and recomputes the tree nodes above it.
+        """
+        node = self.__size + bucket
+        self.__sums[node, material_ids] += quantities
+        self.__max_prefix[node, material_ids] = self.__sums[node, material_ids]
+        node //= 2
+        while node >= 1:
+            left, right = 2*node, 2*node + 1
+            self.__sums[node, material_ids] = self.__sums[left, material_ids] + self.__sums[right, material_ids]
+            self.__max_prefix[node, material_ids] = np.maximum(self.__max_prefix[left, material_ids],
+                                                               self.__sums[left, material_ids] +
+                                                               self.__max_prefix[right, material_ids])
+            node //= 2
+
+    def __sync(self):
+        """
+        Resizes the tree to the materials of the ledger and recomputes the requirements of the pending orders
+        when materials or boms changed since the last call.
+        """
+        if self.__version == self.__ledger.version:
+            return
+        self.__version = self.__ledger.version
+        self.__material_count = self.__ledger.length
+        self.__sums = np.zeros((2*self.__size, self.__material_count))
+        self.__max_prefix = np.zeros((2*self.__size, self.__material_count))
+        keys = list(self.__orders)
+        buckets = np.array([self.__orders[key][0] for key in keys], dtype=np.int64)
+        material_ids = np.array([self.__orders[key][1] for key in keys], dtype=np.int64)
+        quantities = np.array([self.__orders[key][2] for key in keys], dtype=np.float64)
+        self.__add_requirements(keys, buckets, material_ids, quantities)
+        for bucket, material_ids, demand in self.__receipts.values():
+            np.add.at(self.__sums, (self.__size + bucket, material_ids), demand)
+        self.__rebuild()
+
+    def __add_requirements(self, keys: list, buckets: np.ndarray, material_ids: np.ndarray, quantities: np.ndarray):
+        """
+        Stores the orders and adds their component requirements to the leaves, the tree must be rebuilt after.
+        """
+        matrix = self.__ledger.matrix(self.__explosion)
+        orders, components, needed = matrix.rows_to_coo(material_ids, quantities)
+        bounds = np.searchsorted(orders, np.arange(len(keys) + 1))
+        for position, key in enumerate(keys):
+            begin, end = bounds[position], bounds[position + 1]
+            self.__orders[key] = (int(buckets[position]), int(material_ids[position]), float(quantities[position]),
+                                  components[begin:end], needed[begin:end])
+        np.add.at(self.__sums, (self.__size + buckets[orders], components), needed)
+
+    def __rebuild(self):
+        """
+        Recomputes every internal node from the leaves, level by level.
+        """
+        self.__max_prefix[self.__size:] = self.__sums[self.__size:]
+        level_start = self.__size//2
+        while level_start >= 1:
+            nodes = np.arange(level_start, 2*level_start)
+            left, right = 2*nodes, 2*nodes + 1
+            self.__sums[nodes] = self.__sums[left] + self.__sums[right]
+            self.__max_prefix[nodes] = np.maximum(self.__max_prefix[left],
+                                                  self.__sums[left] + self.__max_prefix[right])
+            level_start //= 2
+
+    def add_order(self,
+                  key,
+                  material,
+                  quantity: float,
+                  date: float):
+        """
+        Adds the component requirements of a work order producing quantity of material at date.
+        :param key: identifier of the order, the name of the entity created for it.
+        """
+        if key in self.__orders:
+            raise ValueError(f'{key} is already a pending order.')
+        self.__sync()
+        material_id = self.__ledger.material_id(material)
+        material_ids, needed = self.__ledger.matrix(self.__explosion).row(material_id)
+        bucket = self.bucket(date)
+        needed = needed*quantity
+        self.__orders[key] = (bucket, material_id, float(quantity), material_ids, needed)
+        self.__update(bucket, material_ids, needed)
+
+    def add_orders(self,
+                   keys,
+                   materials,
+                   quantities,
+                   dates):
+        """
+        Adds many orders at once. The tree is rebuilt in one vectorized pass.
+        """
+        keys = list(keys)
+        duplicated = [key for key in keys if key in self.__orders]
+        if duplicated or len(set(keys)) < len(keys):
+            raise ValueError(f'{duplicated[0] if duplicated else "a key"} is already a pending order.')
+        self.__sync()
+        material_ids = np.array([self.__ledger.material_id(material) for material in materials], dtype=np.int64)
+        quantities = np.broadcast_to(np.asarray(quantities, dtype=np.float64), material_ids.shape)
+        buckets = np.array([self.bucket(date) for date in dates], dtype=np.int64)
+        self.__add_requirements(keys, buckets, material_ids, quantities)
+        self.__rebuild()
+
+    def add_orders_from_table(self,
+                              table: pd.DataFrame,
+                              clock: SimClock,
+                              datetime_column: str,
+                              material_column: str,
+                              quantity_column: Union[str, None] = None,
+                              name_column: Union[str, None] = None):
+        """
+        Adds the orders of an arrival table, keyed by the names the Creator gives to their entities.
+        :param quantity_column: column with the quantity of every order. If None, every order produces one unit.
+        """
+        if name_column is None:
+            keys = ('entity_' + table.index.astype(str)).to_numpy()
+        else:
+            keys = table[name_column].to_numpy()
+        quantities = 1.0 if quantity_column is None else table[quantity_column].to_numpy()
+        self.add_orders(keys=keys,
+                        materials=table[material_column].to_numpy(),
+                        quantities=quantities,
+                        dates=clock.to_simulation_times(table[datetime_column]))
+
+    def consume_order(self, key):
+        """
+        Removes a pending order, once its requirements are taken from the ledger stock.
+        """
+        self.__sync()
+        bucket, material_id, quantity, material_ids, needed = self.__orders.pop(key)
+        self.__update(bucket, material_ids, -needed)
+
+    def add_receipt(self,
+                    material,
+                    quantity: float,
+                    date: float,
+                    key=None):
+        """
+        Adds a planned receipt of quantity of material at date.
+        :param key: identifier of the receipt, used to consume it once it is in the ledger stock.
+        :return: key of the receipt.
+        """
+        return self.__add_receipt(key, {material: quantity}, date)
+
+    def __add_receipt(self, key, quantities: dict, date: float):
+        if key is None:
+            key = f'receipt_{self.__receipt_count}'
+            self.__receipt_count += 1
+        if key in self.__receipts:
+            raise ValueError(f'{key} is already a pending receipt.')
+        self.__sync()
+        material_ids = np.array([self.__ledger.material_id(material) for material in quantities], dtype=np.int64)
+        demand = -np.array([float(quantity) for quantity in quantities.values()])
+        bucket = self.bucket(date)
+        self.__receipts[key] = (bucket, material_ids, demand)
+        self.__update(bucket, material_ids, demand)
+        return key
+
+    def consume_receipt(self, key):
+        """
+        Removes a pending receipt, once its quantities are added to the ledger stock.
+        """
+        self.__sync()
+        bucket, material_ids, demand = self.__receipts.pop(key)
+        self.__update(bucket, material_ids, -demand)
+
+    def schedule_receipt(self,
+                         actions: HeapQueue,
+                         quantities: dict,
+                         date: float):
+        """
+        Schedules the reception of quantities in the ledger at date on the event calendar of a model and projects it.
+        :param quantities: dictionary mapping material to the quantity received.
+        :return: the scheduled event, also the key of the receipt.
+        """
+        event = SimEvent(start_date=date,
+                         end_date=date,
+                         event_name='received_material',
+                         action=self.__ledger.receive,
+                         action_args=(quantities,))
+        self.__add_receipt(event, quantities, date)
+        actions.add_entity(event)
+        return event
+
+    def add_receipts_from_calendar(self, actions: HeapQueue):
+        """
+        Projects the events of the calendar that receive material in the ledger and are not tracked yet. Receipts
+        beyond the horizon do not change the projection and are skipped.
+        """
+        for event in actions.content:
+            if event.action == self.__ledger.receive and event not in self.__receipts and \
+                    event.end_date < self.__bucket_count*self.__bucket_seconds:
+                quantities = event.action_args[0] if event.action_args else event.action_kwargs['quantities']
+                self.__add_receipt(event, quantities, event.end_date)
+
+    def first_shortage(self, material):
+        """
+        :return: start, in simulation seconds, of the first bucket where the projected stock of material is
+        negative. None if the material is covered over the whole horizon.
+        """
+        self.__sync()
+        material_id = self.__ledger.material_id(material)
+        threshold = self.__ledger.inventory[material_id]
+        if self.__max_prefix[1, material_id] <= threshold + 1e-9:
+            return None
+        node = 1
+        while node < self.__size:
+            left = 2*node
+            if self.__max_prefix[left, material_id] > threshold + 1e-9:
+                node = left
+            else:
+                threshold -= self.__sums[left, material_id]
+                node = left + 1
+        return (node - self.__size)*self.__bucket_seconds
+
+    def first_shortages(self):
+        """
+        First shortage of every material, the tree is descended for all materials at once.
+        :return: Series indexed by material name with the start of the first shortage bucket, NaN when the
+        material is covered over the whole horizon.
+        """
+        self.__sync()
+        material_ids = np.arange(self.__material_count)
+        thresholds = self.__ledger.inventory + 1e-9
+        short = self.__max_prefix[1] > thresholds
+        nodes = np.ones(self.__material_count, dtype=np.int64)
+        while nodes[0] < self.__size:
+            left = 2*nodes
+            go_left = self.__max_prefix[left, material_ids] > thresholds
+            thresholds = np.where(go_left, thresholds, thresholds - self.__sums[left, material_ids])
+            nodes = np.where(go_left, left, left + 1)
+        return pd.Series(np.where(short, (nodes - self.__size)*self.__bucket_seconds, np.nan),
+                         index=pd.Index(self.__ledger.names, name='material'))
+
+    def projected_stock(self, material, date: float):
+        """
+        :return: stock of material at the end of the bucket of date, once the pending orders up to it are served.
+        """
+        self.__sync()
+        material_id = self.__ledger.material_id(material)
+        node = self.__size + self.bucket(date)
+        demand = self.__sums[node, material_id]
+        while node > 1:
+            if node % 2 == 1:
+                demand += self.__sums[node - 1, material_id]
+            node //= 2
+        return float(self.__ledger.inventory[material_id] - demand)
+
+    # Event loop hook
+    def on_run_start(self, model):
+        self.add_receipts_from_calendar(model.actions)
+
+    def on_event_end(self, event, result):
+        if event.name == 'created_entity' and event.action_args:
+            key = event.action_args[0]
+            if key in self.__orders:
+                self.consume_order(key)
+        elif event in self.__receipts:
+            self.consume_receipt(event)
+
+    # Getters and setters
+    @property
+    def ledger(self):
+        return self.__ledger
+
+    @property
+    def bucket_seconds(self):
+        return self.__bucket_seconds
+
+    @property
+    def bucket_count(self):
+        return self.__bucket_count
+
+    @property
+    def pending_orders(self):
+        return len(self.__orders)
+
+    @property
+    def pending_receipts(self):
+        return len(self.__receipts)
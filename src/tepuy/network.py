@@ -0,0 +1,334 @@
+import heapq
+import math
+from typing import Union
+import numpy as np
+from tepuy.clock import SECONDS_PER_UNIT
+from tepuy.distributions import Distribution, SampleBuffer, object_rng
+from tepuy.processes import EMPTY_PROCESS
+
+
+def alias_table(weights: np.ndarray):
+    """
+    Walker alias table of a discrete distribution, built with Vose's method.
+    :param weights: non negative weights of the outcomes.
+    :return: (probability, alias) arrays. Outcome i is kept with probability[i], else alias[i] is taken.
+    """
+    size = len(weights)
+    scaled = np.asarray(weights, dtype=np.float64)*size/np.sum(weights)
+    probability = np.ones(size)
+    alias = np.arange(size)
+    small = [idx for idx in range(size) if scaled[idx] < 1.0]
+    large = [idx for idx in range(size) if scaled[idx] >= 1.0]
+    while small and large:
+        small_idx = small.pop()
+        large_idx = large.pop()
+        probability[small_idx] = scaled[small_idx]
+        alias[small_idx] = large_idx
+        scaled[large_idx] = scaled[large_idx] + scaled[small_idx] - 1.0
+        if scaled[large_idx] < 1.0:
+            small.append(large_idx)
+        else:
+            large.append(large_idx)
+    return probability, alias
+
+
+class Network:
+    def __init__(self,
+                 model_network: dict,
+                 routing: str = 'weighted',
+                 seed: Union[int, None] = None,
+                 buffer_size: int = 4096):
+        """
+        Compiled routing structure of a model network. Nodes and paths get integer ids, outgoing paths are stored
+        in CSR arrays and every routing decision is an O(1) array lookup.
+        :param model_network: dictionary with a 'start' entry pointing to the creator, and one entry per node
+        with either 'next' and 'path' keys, or a 'paths' list of the alternative outgoing paths of the node.
+        :param routing: 'weighted' picks an outgoing path at random in proportion to Path.weight, 'shortest'
+        follows the route with the smallest lead time to the nearest destructor.
+        :param seed: seed of the random generator used by weighted routing, of the random lead times and of the
+        processes of the nodes. Paths with a Distribution as lead time, and processes, draw from their own stream,
+        which only depends on seed and their name, so runs with the same seed share common random numbers.
+        :param buffer_size: number of uniform numbers drawn at once for weighted routing.
+        """
+        self.valid_options = ['weighted', 'shortest']
+        if routing not in self.valid_options:
+            raise NotImplementedError(f'{routing} not a valid routing. '
+                                      f'Valid options are: {", ".join(self.valid_options)}')
+        self.__routing = routing
+        self.__model_network = model_network
+        self.__seed = seed
+        self.__path_samplers = dict()
+        self.__seeded_processes = set()
+        self.__rng = np.random.default_rng(seed)
+        self.__buffer_size = buffer_size
+        self.__uniforms = self.__rng.random(buffer_size).tolist()
+        self.__uniform_idx = 0
+        self.compile()
+
+    def compile(self):
+        """
+        Builds the routing arrays from the model network. It can be called again to take into account changes
+        of the network objects, the random streams of routing and of unchanged lead times go on where they were.
+        """
+        model_network = self.__model_network
+        self.__creators = list()
+        self.__nodes = list()
+        self.__node_ids = dict()
+        self.__paths = list()
+        start = model_network.get('start', dict()).get('next')
+        creators = start if isinstance(start, (list, tuple)) else [start]
+        for creator in creators:
+            if creator is not None:
+                self.__creators.append(creator)
+                self.__add_node(creator.output_node)
+        outgoing = dict()
+        for node, item in model_network.items():
+            if node == 'start':
+                continue
+            node_id = self.__add_node(node)
+            paths = item['paths'] if 'paths' in item else [item['path']]
+            for path in paths:
+                if not path.available:
+                    continue
+                target = path.node_to if 'paths' in item else item['next']
+                outgoing.setdefault(node_id, list()).append((path, self.__add_node(target)))
+        self.__seed_processes()
+        node_count = len(self.__nodes)
+        self.__indptr = np.zeros(node_count + 1, dtype=np.int64)
+        targets, lead_times, weights = list(), list(), list()
+        self.__samplers = list()
+        for node_id in range(node_count):
+            for path, target_id in outgoing.get(node_id, list()):
+                self.__paths.append(path)
+                targets.append(target_id)
+                if isinstance(path.lead_time, Distribution):
+                    # Shortest routes use the mean lead time.
+                    lead_times.append(path.lead_time.mean*SECONDS_PER_UNIT['hours'])
+                    sampler = self.__path_samplers.get(path)
+                    if sampler is None or sampler.distribution != path.lead_time:
+                        sampler = SampleBuffer(distribution=path.lead_time,
+                                               rng=object_rng(seed=self.__seed, name=path.name))
+                        self.__path_samplers[path] = sampler
+                    self.__samplers.append(sampler)
+                else:
+                    lead_times.append((path.lead_time or 0.0)*SECONDS_PER_UNIT['hours'])
+                    self.__samplers.append(None)
+                weights.append(path.weight)
+            self.__indptr[node_id + 1] = len(self.__paths)
+        self.__targets = np.array(targets, dtype=np.int64)
+        self.__lead_times = np.array(lead_times, dtype=np.float64)
+        self.__weights = np.array(weights, dtype=np.float64)
+        self.__destructor_ids = np.array([node_id for node_id, node in enumerate(self.__nodes)
+                                          if getattr(node, 'is_destructor', False)], dtype=np.int64)
+        self.__build_alias_tables()
+        self.__build_shortest_routes()
+        self.__build_next_hop_tables()
+
+    def __seed_processes(self):
+        """
+        Seeds the entry and exit processes of the nodes. Processes seeded by a previous compile go on where they
+        were.
+        """
+        for node in self.__nodes:
+            for process in (getattr(node, 'entry_process', EMPTY_PROCESS),
+                            getattr(node, 'exit_process', EMPTY_PROCESS)):
+                if process is not EMPTY_PROCESS and process not in self.__seeded_processes:
+                    process.seed_streams(self.__seed)
+                    self.__seeded_processes.add(process)
+
+    def __add_node(self, node):
+        try:
+            return self.__node_ids[node]
+        except KeyError:
+            node_id = len(self.__nodes)
+            self.__node_ids[node] = node_id
+            self.__nodes.append(node)
+            node.node_id = node_id
+            return node_id
+
+    def __build_alias_tables(self):
+        self.__alias_probability = np.ones(len(self.__paths))
+        self.__alias = np.arange(len(self.__paths), dtype=np.int64)
+        for node_id in range(len(self.__nodes)):
+            begin, end = self.__indptr[node_id], self.__indptr[node_id + 1]
+            if end - begin > 1:
+                probability, alias = alias_table(self.__weights[begin:end])
+                self.__alias_probability[begin:end] = probability
+                self.__alias[begin:end] = alias + begin
+
+    def __build_shortest_routes(self):
+        """
+        Dijkstra from the destructors along reversed paths: smallest lead time from every node to its nearest
+        destructor and the outgoing path position to take first, -1 when no destructor can be reached. Only
+        shortest routing needs them.
+        """
+        node_count = len(self.__nodes)
+        self.__destructor_distances = np.full(node_count, np.inf)
+        self.__nearest_destructor_hop = np.full(node_count, -1, dtype=np.int64)
+        if self.__routing != 'shortest':
+            return
+        sources = np.repeat(np.arange(node_count), np.diff(self.__indptr)).tolist()
+        incoming = [list() for _ in range(node_count)]
+        for position, target in enumerate(self.__targets.tolist()):
+            incoming[target].append(position)
+        lead_times = self.__lead_times.tolist()
+        distances = [math.inf]*node_count
+        hops = [-1]*node_count
+        heap = list()
+        for destructor_id in self.__destructor_ids.tolist():
+            distances[destructor_id] = 0.0
+            heap.append((0.0, destructor_id))
+        heapq.heapify(heap)
+        while heap:
+            distance, node_id = heapq.heappop(heap)
+            if distance > distances[node_id]:
+                continue
+            for position in incoming[node_id]:
+                source = sources[position]
+                new_distance = distance + lead_times[position]
+                if new_distance < distances[source]:
+                    distances[source] = new_distance
+                    hops[source] = position
+                    heapq.heappush(heap, (new_distance, source))
+        self.__destructor_distances = np.array(distances)
+        self.__nearest_destructor_hop = np.array(hops, dtype=np.int64)
+
+    def __shortest_paths(self, source: int):
+        """
+        Dijkstra from source.
+        :return: (smallest lead time to every node, position of the last path of the route to every node, -1
+        when there is no route).
+        """
+        node_count = len(self.__nodes)
+        distances = [math.inf]*node_count
+        last_hops = [-1]*node_count
+        distances[source] = 0.0
+        heap = [(0.0, source)]
+        while heap:
+            distance, node_id = heapq.heappop(heap)
+            if distance > distances[node_id]:
+                continue
+            for position in range(self.__indptr[node_id], self.__indptr[node_id + 1]):
+                target = self.__targets[position]
+                new_distance = distance + self.__lead_times[position]
+                if new_distance < distances[target]:
+                    distances[target] = new_distance
+                    last_hops[target] = position
+                    heapq.heappush(heap, (new_distance, target))
+        return distances, last_hops
+
+    def __build_next_hop_tables(self):
+        """
+        Plain lists used by the routing hot path, indexing them is much cheaper than indexing NumPy arrays.
+        next_hop holds the position of the path to take when it does not depend on a random draw, -1 otherwise.
+        """
+        self.__begin = self.__indptr[:-1].tolist()
+        self.__out_degree = np.diff(self.__indptr).tolist()
+        next_hop = np.where(np.diff(self.__indptr) == 1, self.__indptr[:-1], -1)
+        if self.__routing == 'shortest':
+            next_hop = np.where(np.diff(self.__indptr) > 1, self.__nearest_destructor_hop, next_hop)
+        self.__next_hop = next_hop.tolist()
+        self.__target_nodes = [self.__nodes[target] for target in self.__targets]
+        self.__lead_time_list = [None if sampler is not None else lead_time
+                                 for sampler, lead_time in zip(self.__samplers, self.__lead_times.tolist())]
+        self.__alias_probability_list = self.__alias_probability.tolist()
+        self.__alias_list = self.__alias.tolist()
+
+    def __uniform(self):
+        if self.__uniform_idx == self.__buffer_size:
+            self.__uniforms = self.__rng.random(self.__buffer_size).tolist()
+            self.__uniform_idx = 0
+        value = self.__uniforms[self.__uniform_idx]
+        self.__uniform_idx += 1
+        return value
+
+    def next_path_position(self, node_id: int):
+        """
+        :return: position, in the CSR arrays, of the outgoing path taken from node_id.
+        """
+        position = self.__next_hop[node_id]
+        if position >= 0:
+            return position
+        out_degree = self.__out_degree[node_id]
+        if out_degree == 0:
+            raise KeyError(f'{self.__nodes[node_id].name} has no outgoing path.')
+        scaled = self.__uniform()*out_degree
+        slot = int(scaled)
+        position = self.__begin[node_id] + slot
+        if scaled - slot < self.__alias_probability_list[position]:
+            return position
+        return self.__alias_list[position]
+
+    def route(self, node):
+        """
+        Routing decision of an entity leaving node.
+        :return: (next node, path, lead time in seconds). Random lead times are drawn from the path buffer.
+        """
+        position = self.next_path_position(node.node_id)
+        lead_time = self.__lead_time_list[position]
+        if lead_time is None:
+            lead_time = self.__samplers[position].next()*SECONDS_PER_UNIT['hours']
+        return self.__target_nodes[position], self.__paths[position], lead_time
+
+    def shortest_lead_time(self, node_from, node_to):
+        """
+        :return: smallest lead time, in seconds, from node_from to node_to. Infinite when unreachable.
+        """
+        distances, _ = self.__shortest_paths(node_from.node_id)
+        return float(distances[node_to.node_id])
+
+    def shortest_route(self, node_from, node_to):
+        """
+        :return: list of the paths of the route with the smallest lead time from node_from to node_to.
+        """
+        _, last_hops = self.__shortest_paths(node_from.node_id)
+        route = list()
+        node_id, source_id = node_to.node_id, node_from.node_id
+        while node_id != source_id:
+            position = last_hops[node_id]
+            if position < 0:
+                raise ValueError(f'{node_to.name} can not be reached from {node_from.name}.')
+            route.append(self.__paths[position])
+            node_id = int(np.searchsorted(self.__indptr, position, side='right')) - 1
+        return route[::-1]
+
+    # Getters and setters
+    @property
+    def routing(self):
+        return self.__routing
+
+    @property
+    def creators(self):
+        return self.__creators
+
+    @property
+    def nodes(self):
+        return self.__nodes
+
+    @property
+    def paths(self):
+        return self.__paths
+
+    @property
+    def indptr(self):
+        return self.__indptr
+
+    @property
+    def targets(self):
+        return self.__targets
+
+    @property
+    def lead_times(self):
+        return self.__lead_times
+
+    @property
+    def weights(self):
+        return self.__weights
+
+    @property
+    def destructor_ids(self):
+        return self.__destructor_ids
+
+    @property
+    def destructor_distances(self):
+        return self.__destructor_distances
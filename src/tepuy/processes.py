@@ -1,34 +1,72 @@
-from typing import Union
+from typing import Union, Callable
 from abc import ABC, abstractmethod
-import datetime
-import pandas as pd
+from functools import lru_cache
+from time import perf_counter
+from tepuy.clock import SECONDS_PER_UNIT
+from tepuy.distributions import Distribution, SampleBuffer, object_rng
+from tepuy.ledger import MaterialLedger
+
+
+@lru_cache(maxsize=None)
+def compile_action_string(action_string: str):
+    """
+    Compiles an action string once, later calls with the same string reuse the code object.
+    """
+    return compile(action_string, '<action_string>', 'exec')
 
 
 class SimEvent:
+    __slots__ = ('__start_date', '__end_date', '__sorting_feature', '__sorting_policy', '__object_dictionary',
+                 '__action_string', '__action', '__action_args', '__action_kwargs', '__event_name')
+
     def __init__(self,
-                 start_date: datetime.datetime,
-                 end_date: datetime.datetime,
+                 start_date: float,
+                 end_date: float,
                  event_name: str,
                  sorting_feature: str = 'end_date',
                  sorting_policy: str = 'smallest',
                  object_dictionary: Union[dict, None] = None,
-                 action_string: Union[str, None] = None):
-        self.__start_date = pd.to_datetime(start_date)
-        self.__end_date = pd.to_datetime(end_date)
+                 action_string: Union[str, None] = None,
+                 action: Union[Callable, None] = None,
+                 action_args: tuple = (),
+                 action_kwargs: Union[dict, None] = None):
+        """
+        Scheduled action of the model. Dates are simulation times, in seconds since the model start date.
+        The action is called with action_args and action_kwargs. Positional arguments are preferred for the
+        events the engine schedules in bulk, a tuple is much smaller than a dict.
+        """
+        self.__start_date = start_date
+        self.__end_date = end_date
         self.__sorting_feature = sorting_feature
         self.__sorting_policy = sorting_policy
         self.__object_dictionary = object_dictionary
         self.__action_string = action_string
+        self.__action = action
+        self.__action_args = action_args
+        self.__action_kwargs = action_kwargs
         self.__event_name = event_name
 
     def create_definition_string(self, name: str):
         string_list = [item[0]+'='+f'{name}.object_dictionary["{item[0]}"]' for item in self.object_dictionary.items()]
         return ';'.join(string_list)
 
-    def run_action(self):
-        def_string = self.create_definition_string()
-        exec(def_string)
-        exec(self.action_string)
+    def run_action(self, namespace: Union[dict, None] = None):
+        """
+        Executes the event action. Callable actions are called with action_args as positional arguments and
+        action_kwargs as keyword arguments, action strings are compiled once and executed with
+        object_dictionary as local variables.
+        :param namespace: global names available to action strings.
+        :return: value returned by the callable action, None for action strings.
+        """
+        if self.__action is not None:
+            if self.__action_kwargs is None:
+                return self.__action(*self.__action_args)
+            return self.__action(*self.__action_args, **self.__action_kwargs)
+        if self.__action_string is not None:
+            local_variables = dict(self.__object_dictionary) if self.__object_dictionary is not None else dict()
+            exec(compile_action_string(self.__action_string),
+                 namespace if namespace is not None else dict(),
+                 local_variables)
 
     @property
     def start_date(self):
@@ -46,6 +84,10 @@ class SimEvent:
     def end_date(self):
         return self.__end_date
 
+    @end_date.setter
+    def end_date(self, new_end_date: float):
+        self.__end_date = new_end_date
+
     @property
     def object_dictionary(self):
         return self.__object_dictionary
@@ -54,6 +96,18 @@ class SimEvent:
     def action_string(self):
         return self.__action_string
 
+    @property
+    def action(self):
+        return self.__action
+
+    @property
+    def action_args(self):
+        return self.__action_args
+
+    @property
+    def action_kwargs(self):
+        return self.__action_kwargs
+
     @property
     def name(self):
         return self.__event_name
@@ -64,49 +118,77 @@ class Material:
                  name: str,
                  quantity: float,
                  unit: str,
-                 bom: Union[dict, None]):
+                 bom: Union[dict, None],
+                 ledger: Union[MaterialLedger, None] = None):
+        """
+        View over one material of a MaterialLedger.
+        :param bom: dictionary mapping components, or their names, to the quantity needed per unit.
+        :param ledger: ledger shared by the materials of the model. If None, the material gets its own ledger.
+        """
+        self.__ledger = ledger if ledger is not None else MaterialLedger()
         self.__name = name
-        self.__quantity = quantity
-        self.__unit = unit
-        self.__bom = bom
+        self.__ledger.add_material(name=name, quantity=quantity, unit=unit, bom=bom)
+
+    @classmethod
+    def of(cls, ledger: MaterialLedger, name: str):
+        """
+        :return: view over a material already registered in ledger.
+        """
+        ledger.material_id(name)
+        material = cls.__new__(cls)
+        material.__ledger = ledger
+        material.__name = name
+        return material
 
     # Getters and setters
+    @property
+    def ledger(self):
+        return self.__ledger
+
+    @property
+    def material_id(self):
+        return self.__ledger.material_id(self.__name)
+
     @property
     def name(self):
         return self.__name
 
     @name.setter
     def name(self, new_name: str):
+        self.__ledger.rename(self.__name, new_name)
         self.__name = new_name
 
     @property
     def quantity(self):
-        return self.__name
+        return self.__ledger.quantity(self.__name)
 
     @quantity.setter
-    def quantity(self, delta_quantity: float):
-        if self.__quantity + delta_quantity < 0:
-            raise ValueError(f'reducing {self.name} by {delta_quantity} results in negative material.')
-        self.__quantity = self.__quantity + delta_quantity
+    def quantity(self, new_quantity: float):
+        if new_quantity < 0:
+            raise ValueError(f'{self.name} can not have a negative quantity.')
+        self.__ledger.set_quantity(self.__name, new_quantity)
 
     @property
     def unit(self):
-        return self.__unit
+        return self.__ledger.unit(self.__name)
 
     @unit.setter
     def unit(self, new_unit: str):
-        self.__unit = new_unit
+        self.__ledger.set_unit(self.__name, new_unit)
 
     @property
     def bom(self):
-        return self.__bom
+        return self.__ledger.bom(self.__name)
 
     @bom.setter
     def bom(self, new_bom: dict):
-        self.__bom = new_bom
+        self.__ledger.set_bom(self.__name, new_bom)
 
 
 class SimProcess(ABC):
+    # Hooks timing run_process, set by MainSimModel.run while instrumentation hooks are active.
+    hooks = ()
+
     def __init__(self,
                  name: str,
                  associated_object,
@@ -114,62 +196,137 @@ class SimProcess(ABC):
         self.__name = name
         self.__associated_object = associated_object
         self.__context_object = context_object
+        self.__seed = None
+        self.__sample_buffers = dict()
+
+    def seed_streams(self, seed: Union[int, None]):
+        """
+        Seeds the random durations of the process, their stream only depends on seed and the process name. The
+        network of the model seeds the processes of its nodes when it is compiled, as it does with the lead times
+        of its paths. Buffered samples are dropped.
+        """
+        self.__seed = seed
+        self.__sample_buffers = dict()
 
     @abstractmethod
     def run_process(self, **kwargs):
         pass
 
+    def execute(self, **kwargs):
+        """
+        Runs the process, reporting its wall time to the active hooks, if any.
+        """
+        if not SimProcess.hooks:
+            return self.run_process(**kwargs)
+        start = perf_counter()
+        result = self.run_process(**kwargs)
+        elapsed = perf_counter() - start
+        for hook in SimProcess.hooks:
+            hook.on_process(process=self, elapsed=elapsed)
+        return result
+
     # Steps
+    def sample_buffer(self, distribution: Distribution):
+        """
+        :return: sample buffer of distribution, created on first use from the stream of the process.
+        """
+        try:
+            return self.__sample_buffers[distribution]
+        except KeyError:
+            sample_buffer = SampleBuffer(distribution=distribution,
+                                         rng=object_rng(seed=self.__seed, name=self.__name))
+            self.__sample_buffers[distribution] = sample_buffer
+            return sample_buffer
+
+    def sample(self, distribution: Distribution):
+        """
+        Draws the next value of distribution from its sample buffer.
+        """
+        return self.sample_buffer(distribution).next()
+
     def delay_step(self,
-                   duration: float,
+                   duration: Union[float, Distribution],
                    unit: str,
-                   start_date: datetime.datetime):
-        duration_key = {
-            'seconds': 1,
-            'minutes': 60,
-            'hours': 3600,
-        }
+                   start_date: float,
+                   target=None):
+        """
+        Makes target unavailable for duration.
+        :param duration: fixed duration, or distribution of the duration, in unit.
+        :param target: object delayed, the associated object of the process if None. Processes shared by
+        several entities pass the entity they run on instead of binding it.
+        """
         try:
-            transformed_duration = duration*duration_key[unit]
+            seconds_per_unit = SECONDS_PER_UNIT[unit]
         except KeyError:
-            ValueError(f'{unit} is not a valid option. '
-                       f'Valid options are: {", ".join([it for it in duration_key.keys()])}')
-        available_date = start_date+datetime.timedelta(seconds=transformed_duration)
-        self.associated_object.available_date = available_date
+            raise ValueError(f'{unit} is not a valid option. '
+                             f'Valid options are: {", ".join(SECONDS_PER_UNIT.keys())}')
+        if isinstance(duration, Distribution):
+            duration = self.sample(duration)
+        available_date = start_date + duration*seconds_per_unit
+        (target if target is not None else self.associated_object).available_date = available_date
         way_event = SimEvent(start_date=start_date,
                              end_date=available_date,
                              event_name='Wait')
         return way_event
 
-    def produce_step(self,
-                     material: Material,
-                     quantity: float):
-        if quantity < 0:
-            ValueError('Quantity must be positive.')
-        material.quantity += quantity
-        if material.bom is not None:
-            for mat, qty in material.bom.items():
-                self.consume_step(material=mat,
-                                  quantity=qty)
+    @staticmethod
+    def produce_step(material: Material,
+                     quantity: float,
+                     explosion: str = 'direct'):
+        """
+        Produces quantity of material, consuming the components of its bom from the material ledger.
+        :param explosion: 'direct' consumes the components of the bom, 'leaf' the materials without bom
+        reached through every level of the bom.
+        """
+        material.ledger.produce({material.name: quantity}, explosion=explosion)
 
     @staticmethod
-    def consume_step(material,
+    def consume_step(material: Material,
                      quantity: float):
-        if quantity < 0:
-            ValueError('Quantity must be positive.')
-        material.quantity -= quantity
-
-    def seize_step(self, resource):
-        if resource.seized:
-            resource.ride_request_queue.add_entity(self.associated_object)
-        else:
-            resource.owner = resource
-            resource.seized = True
+        material.ledger.consume({material.name: quantity})
 
     @staticmethod
-    def release_step(resource):
-        resource.owner = None
-        resource.seized = False
+    def produce_batch_step(ledger: MaterialLedger,
+                           quantities,
+                           explosion: str = 'direct'):
+        """
+        Produces several materials at once.
+        :param quantities: dictionary mapping materials to quantities, or array indexed by material id.
+        """
+        ledger.produce(quantities, explosion=explosion)
+
+    def seize_step(self,
+                   resource,
+                   date: float,
+                   units: int = 1,
+                   on_granted: Union[Callable, None] = None,
+                   requester=None):
+        """
+        Seizes units of resource for requester.
+        :param on_granted: called as on_granted(requester, date) if the request has to wait.
+        :param requester: object seizing the resource, the associated object of the process if None. Processes
+        shared by several entities pass the entity they run on.
+        :return: True if the units were granted right away.
+        """
+        return resource.seize(requester=requester if requester is not None else self.associated_object,
+                              date=date,
+                              units=units,
+                              on_granted=on_granted)
+
+    def release_step(self,
+                     resource,
+                     date: float,
+                     actions=None,
+                     units: int = 1,
+                     holder=None):
+        """
+        Releases units of resource held by holder, waking up waiting requests.
+        :param holder: object holding the resource, the associated object of the process if None.
+        """
+        return resource.release(date=date,
+                                actions=actions,
+                                holder=holder if holder is not None else self.associated_object,
+                                units=units)
 
     # Getters and Setters
     @property
@@ -184,10 +341,18 @@ class SimProcess(ABC):
     def associated_object(self):
         return self.__associated_object
 
+    @associated_object.setter
+    def associated_object(self, new_object):
+        self.__associated_object = new_object
+
     @property
     def context_object(self):
         return self.__context_object
 
+    @context_object.setter
+    def context_object(self, new_object):
+        self.__context_object = new_object
+
 
 class EmptyProcess(SimProcess):
     def __init__(self,
@@ -201,3 +366,61 @@ class EmptyProcess(SimProcess):
     def run_process(self, **kwargs):
 
         return self.name
+
+
+# Empty processes keep no state, nodes without process share this one instead of creating one per event.
+EMPTY_PROCESS = EmptyProcess(name='empty_process',
+                             associated_object=None,
+                             context_object=None)
+
+
+class DelayProcess(SimProcess):
+    def __init__(self,
+                 name: str,
+                 duration: Union[float, Distribution],
+                 unit: str = 'hours',
+                 associated_object=None,
+                 context_object=None):
+        """
+        Holds the entity it runs on for duration. Created once and reused: the entity is an argument of every
+        run, the process keeps no state of its own, so nodes and stations can share it.
+        :param duration: fixed duration, or distribution of the duration, in unit.
+        """
+        super().__init__(name=name,
+                         associated_object=associated_object,
+                         context_object=context_object)
+        self.__duration = duration
+        self.__unit = unit
+        self.__sampler = None
+
+    def seed_streams(self, seed: Union[int, None]):
+        super().seed_streams(seed)
+        self.__sampler = None
+
+    def run_process(self, entity=None, date: float = 0.0, **kwargs):
+        """
+        :return: SimEvent ending when the delay is over.
+        """
+        duration = self.__duration
+        if isinstance(duration, Distribution):
+            # The buffer of the duration is kept at hand, random delays skip the lookup by distribution.
+            if self.__sampler is None:
+                self.__sampler = self.sample_buffer(duration)
+            duration = self.__sampler.next()
+        return self.delay_step(duration=duration,
+                               unit=self.__unit,
+                               start_date=date,
+                               target=entity)
+
+    @property
+    def duration(self):
+        return self.__duration
+
+    @duration.setter
+    def duration(self, new_duration: Union[float, Distribution]):
+        self.__duration = new_duration
+        self.__sampler = None
+
+    @property
+    def unit(self):
+        return self.__unit
@@ -0,0 +1,447 @@
+import bisect
+import heapq
+from typing import Union
+
+
+class _ReversedKey:
+    """
+    Wraps a sorting key inverting its order, used by 'greatest' policies on keys that can not be negated.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class _Placeholder:
+    """
+    Left in the item slot of heap entries that were cancelled or popped. Pickled by name, so snapshots keep
+    them identical to the module constants.
+    """
+    def __init__(self, name: str):
+        self.name = name
+
+    def __reduce__(self):
+        return self.name
+
+
+_CANCELLED = _Placeholder('_CANCELLED')
+_POPPED = _Placeholder('_POPPED')
+
+
+class QueueHandle:
+    """
+    Returned when an item is added to a HeapQueue, cancels or moves it while it is queued.
+    """
+    __slots__ = ('queue', 'entry', 'item')
+
+    def __init__(self, queue, entry: list):
+        self.queue = queue
+        self.entry = entry
+        self.item = entry[2]
+
+    def cancel(self):
+        """
+        :return: True if the item was queued and is cancelled, False if it was already popped or cancelled.
+        """
+        return self.queue.cancel(self)
+
+    def reschedule(self, new_value=None):
+        """
+        Moves the item, queued or not, to the sorting key new_value. Required unless the queue is FIFO.
+        """
+        self.queue.reschedule(self, new_value)
+
+    @property
+    def pending(self):
+        return self.entry[2] is not _CANCELLED and self.entry[2] is not _POPPED
+
+
+class HeapQueue:
+    def __init__(self,
+                 name: str,
+                 sorting_feature: Union[str, None] = 'end_date',
+                 sorting_policy: str = 'smallest',
+                 compaction_ratio: float = 0.5):
+        """
+        Binary heap priority queue. It is the future event list of MainSimModel, but works for any object
+        exposing sorting_feature. Items with the same key are served in insertion order (FIFO).
+        Cancelled items are deleted lazily: their heap entries become tombstones skipped when popped, and the
+        heap is compacted once tombstones are more than compaction_ratio of its entries.
+        :param name: name of the queue.
+        :param sorting_feature: attribute read once at insertion to sort items. None means pure FIFO.
+        :param sorting_policy: 'smallest' serves the smallest key first, 'greatest' the greatest one.
+        :param compaction_ratio: share of tombstones in the heap that triggers a compaction.
+        """
+        self.valid_policies = ['smallest', 'greatest']
+        if sorting_policy not in self.valid_policies:
+            raise NotImplementedError(f'{sorting_policy} not a valid sorting_policy. '
+                                      f'Valid options are: {", ".join(self.valid_policies)}')
+        self.__name = name
+        self.__sorting_feature = sorting_feature
+        self.__sorting_policy = sorting_policy
+        self.__compaction_ratio = compaction_ratio
+        self.__heap = list()
+        self.__sequence = 0
+        self.__tombstones = 0
+
+    def sorting_key(self, item):
+        if self.__sorting_feature is None:
+            return 0
+        key = getattr(item, self.__sorting_feature)
+        if self.__sorting_policy == 'smallest':
+            return key
+        try:
+            return -key
+        except TypeError:
+            return _ReversedKey(key)
+
+    def add_entity(self, entity):
+        """
+        Schedules an item in O(log n).
+        :return: handle to cancel or reschedule the item.
+        """
+        sequence = self.__sequence
+        self.__sequence = sequence + 1
+        entry = [self.sorting_key(entity), sequence, entity]
+        heapq.heappush(self.__heap, entry)
+        return QueueHandle(self, entry)
+
+    def add_entities(self, entities):
+        """
+        Bulk insertion of many items, heapifying once in O(n) instead of pushing one by one.
+        Items keep their relative order when they share the same key.
+        :return: list of handles, one per item.
+        """
+        new_entries = [[self.sorting_key(entity), sequence, entity]
+                       for sequence, entity in enumerate(entities, start=self.__sequence)]
+        self.__sequence += len(new_entries)
+        # Pushing costs k*log(n), heapifying n + k. Small batches into a large heap are pushed.
+        if len(new_entries)*max(len(self.__heap).bit_length(), 1) <= len(self.__heap):
+            for entry in new_entries:
+                heapq.heappush(self.__heap, entry)
+        else:
+            self.__heap.extend(new_entries)
+            heapq.heapify(self.__heap)
+        return [QueueHandle(self, entry) for entry in new_entries]
+
+    def cancel(self, handle: QueueHandle):
+        """
+        Cancels a queued item in O(1), its entry stays in the heap as a tombstone.
+        :return: True if the item was queued, False if it was already popped or cancelled.
+        """
+        entry = handle.entry
+        if entry[2] is _CANCELLED or entry[2] is _POPPED:
+            return False
+        entry[2] = _CANCELLED
+        self.__tombstones += 1
+        if self.__tombstones > self.__compaction_ratio*len(self.__heap):
+            self.compact()
+        return True
+
+    def reschedule(self, handle: QueueHandle, new_value=None):
+        """
+        Cancels the item of handle if it is queued and adds it again with new_value as sorting feature. FIFO
+        queues ignore new_value and move the item to the back.
+        """
+        if self.__sorting_feature is not None and new_value is None:
+            raise ValueError(f'{self.__name} is sorted by {self.__sorting_feature}, a new value is required to '
+                             f'reschedule an item.')
+        item = handle.item
+        self.cancel(handle)
+        if self.__sorting_feature is not None:
+            setattr(item, self.__sorting_feature, new_value)
+        handle.entry = self.add_entity(item).entry
+
+    def compact(self):
+        """
+        Removes the tombstones from the heap in O(n).
+        """
+        self.__heap = [entry for entry in self.__heap if entry[2] is not _CANCELLED]
+        heapq.heapify(self.__heap)
+        self.__tombstones = 0
+
+    def __discard_tombstones(self):
+        heap = self.__heap
+        while heap and heap[0][2] is _CANCELLED:
+            heapq.heappop(heap)
+            self.__tombstones -= 1
+
+    def pop(self):
+        """
+        Removes and returns the next item in O(log n).
+        """
+        if self.__tombstones:
+            self.__discard_tombstones()
+        entry = heapq.heappop(self.__heap)
+        item = entry[2]
+        entry[2] = _POPPED
+        return item
+
+    def peek(self):
+        if self.__tombstones:
+            self.__discard_tombstones()
+        return self.__heap[0][2]
+
+    def print_content_names(self):
+        return [item.name for item in self.content]
+
+    def __len__(self):
+        return len(self.__heap) - self.__tombstones
+
+    # Getters and setters
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def content(self):
+        """
+        Copy of the queued items in the order they would be popped.
+        """
+        return [entry[2] for entry in sorted(self.__heap) if entry[2] is not _CANCELLED]
+
+    @property
+    def sorting_feature(self):
+        return self.__sorting_feature
+
+    @property
+    def sorting_policy(self):
+        return self.__sorting_policy
+
+    @property
+    def length(self):
+        return len(self.__heap) - self.__tombstones
+
+    @property
+    def tombstones(self):
+        return self.__tombstones
+
+
+class SortedQueue:
+    def __init__(self,
+                 name: str,
+                 sorting_feature: Union[str, tuple, None] = None,
+                 sorting_policy: Union[str, tuple] = 'smallest',
+                 chunk_size: int = 512):
+        """
+        Sorted list of items split in chunks of at most 2*chunk_size sorted entries, with an index from every
+        item to its entry. Inserting or removing any item bisects the last entry of every chunk, then the
+        chunk, and shifts at most one chunk: O(log n) comparisons. Sorting keys are read once at insertion and
+        cached in the entries, items with the same key are kept in insertion order (FIFO).
+        :param sorting_feature: attribute, or tuple of attributes compared in order, e.g. ('priority',
+        'due_date'). None means pure FIFO.
+        :param sorting_policy: 'smallest' or 'greatest', or a tuple with the policy of every attribute.
+        """
+        self.__name = name
+        self.__set_order(sorting_feature, sorting_policy)
+        self.__chunk_size = chunk_size
+        self.__chunks = list()
+        self.__maxes = list()
+        self.__index = dict()
+        self.__sequence = 0
+
+    def __set_order(self, sorting_feature, sorting_policy):
+        features = () if sorting_feature is None else \
+            (sorting_feature,) if isinstance(sorting_feature, str) else tuple(sorting_feature)
+        policies = (sorting_policy,)*len(features) if isinstance(sorting_policy, str) else tuple(sorting_policy)
+        valid_policies = ['smallest', 'greatest']
+        for policy in policies:
+            if policy not in valid_policies:
+                raise NotImplementedError(f'{policy} not a valid sorting_policy. '
+                                          f'Valid options are: {", ".join(valid_policies)}')
+        if len(policies) != len(features):
+            raise ValueError(f'{self.__name} has {len(features)} sorting features and {len(policies)} policies.')
+        self.__sorting_feature = sorting_feature
+        self.__sorting_policy = sorting_policy
+        self.__features = tuple(zip(features, [policy == 'greatest' for policy in policies]))
+
+    def sorting_key(self, item):
+        """
+        :return: key of item, a tuple with one value per sorting feature.
+        """
+        key = list()
+        for feature, reverse in self.__features:
+            value = getattr(item, feature)
+            if reverse:
+                try:
+                    value = -value
+                except TypeError:
+                    value = _ReversedKey(value)
+            key.append(value)
+        return tuple(key)
+
+    def add_entity(self, entity):
+        """
+        Inserts an item in O(log n). An item can only be queued once.
+        """
+        if entity in self.__index:
+            raise ValueError(f'{getattr(entity, "name", entity)} is already in {self.__name}.')
+        sequence = self.__sequence
+        self.__sequence = sequence + 1
+        entry = (self.sorting_key(entity) if self.__features else (), sequence, entity)
+        self.__index[entity] = entry
+        maxes = self.__maxes
+        if not maxes:
+            self.__chunks.append([entry])
+            maxes.append(entry)
+            return
+        if entry > maxes[-1]:
+            # Appending, the only case of FIFO queues.
+            position = len(maxes) - 1
+            chunk = self.__chunks[position]
+            chunk.append(entry)
+            maxes[position] = entry
+        else:
+            position = bisect.bisect_left(maxes, entry)
+            chunk = self.__chunks[position]
+            bisect.insort(chunk, entry)
+        if len(chunk) > 2*self.__chunk_size:
+            self.__chunks.insert(position + 1, chunk[self.__chunk_size:])
+            del chunk[self.__chunk_size:]
+            maxes.insert(position, chunk[-1])
+
+    def add_entities(self, entities):
+        for entity in entities:
+            self.add_entity(entity)
+
+    def __delete(self, position: int, chunk_position: int):
+        chunk = self.__chunks[position]
+        del chunk[chunk_position]
+        if not chunk:
+            del self.__chunks[position]
+            del self.__maxes[position]
+        elif chunk_position == len(chunk):
+            self.__maxes[position] = chunk[-1]
+
+    def remove(self, entity):
+        """
+        Removes a queued item in O(log n).
+        """
+        try:
+            entry = self.__index.pop(entity)
+        except KeyError:
+            raise ValueError(f'{getattr(entity, "name", entity)} is not in {self.__name}.')
+        position = bisect.bisect_left(self.__maxes, entry)
+        self.__delete(position, bisect.bisect_left(self.__chunks[position], entry))
+
+    def pop(self, rank: int = 0):
+        """
+        Removes and returns the item at rank, the first one by default.
+        """
+        position, chunk_position = self.__locate(rank)
+        entity = self.__chunks[position][chunk_position][2]
+        del self.__index[entity]
+        self.__delete(position, chunk_position)
+        return entity
+
+    def peek(self):
+        return self.__chunks[0][0][2]
+
+    def __locate(self, rank: int):
+        """
+        :return: (chunk, position in the chunk) of the item at rank, in O(n/chunk_size).
+        """
+        if rank < 0:
+            rank += len(self.__index)
+        if rank < 0 or rank >= len(self.__index):
+            raise IndexError(f'{self.__name} has no item at rank {rank}.')
+        for position, chunk in enumerate(self.__chunks):
+            if rank < len(chunk):
+                return position, rank
+            rank -= len(chunk)
+
+    def __getitem__(self, rank: int):
+        position, chunk_position = self.__locate(rank)
+        return self.__chunks[position][chunk_position][2]
+
+    def __iter__(self):
+        """
+        Iterates over the items in order without copying them. The queue must not change while iterating.
+        """
+        for chunk in self.__chunks:
+            for entry in chunk:
+                yield entry[2]
+
+    def __contains__(self, entity):
+        return entity in self.__index
+
+    def __len__(self):
+        return len(self.__index)
+
+    def first(self, predicate):
+        """
+        :return: first item, in queue order, for which predicate is True. None if no item matches.
+        """
+        for entity in self:
+            if predicate(entity):
+                return entity
+        return None
+
+    def filter(self, predicate):
+        """
+        :return: iterator over the items, in queue order, for which predicate is True.
+        """
+        return (entity for entity in self if predicate(entity))
+
+    def sort_queue(self):
+        """
+        Reads the sorting keys of every item again, after their sorting features changed.
+        """
+        entities = list(self)
+        self.__chunks = list()
+        self.__maxes = list()
+        self.__index = dict()
+        self.add_entities(entities)
+
+    def sort_by(self,
+                sorting_feature: Union[str, tuple, None],
+                sorting_policy: Union[str, tuple] = 'smallest'):
+        """
+        Changes the sorting features and policies of the queue and sorts its items again.
+        """
+        self.__set_order(sorting_feature, sorting_policy)
+        self.sort_queue()
+
+    def print_content_names(self):
+        return [item.name for item in self]
+
+    # Getters and setters
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def content(self):
+        """
+        Copy of the queued items in order.
+        """
+        return list(self)
+
+    @property
+    def sorting_feature(self):
+        return self.__sorting_feature
+
+    @sorting_feature.setter
+    def sorting_feature(self, value: Union[str, tuple, None]):
+        self.__set_order(value, self.__sorting_policy)
+        self.sort_queue()
+
+    @property
+    def sorting_policy(self):
+        return self.__sorting_policy
+
+    @sorting_policy.setter
+    def sorting_policy(self, value: Union[str, tuple]):
+        self.__set_order(self.__sorting_feature, value)
+        self.sort_queue()
+
+    @property
+    def length(self):
+        return len(self.__index)
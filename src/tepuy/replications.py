@@ -0,0 +1,98 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from statistics import NormalDist
+from typing import Callable, Iterable, Union
+import numpy as np
+import pandas as pd
+
+
+def run_replication(model_factory: Callable, parameters) -> dict:
+    """
+    Builds one model, runs it and returns its summary. It is executed inside the worker processes, so only the
+    summary travels back to the parent process.
+    :param model_factory: picklable callable receiving parameters and returning a MainSimModel.
+    :param parameters: seed or parameters of the replication.
+    :return: summary of the run together with its parameters.
+    """
+    model = model_factory(parameters)
+    model.run()
+    summary = model.summary()
+    summary['parameters'] = parameters
+    return summary
+
+
+class ReplicationResults:
+    def __init__(self, summaries: list):
+        """
+        Summaries of independent replications of a model.
+        :param summaries: one summary dictionary per replication, as returned by MainSimModel.summary.
+        """
+        self.__summaries = summaries
+
+    def to_dataframe(self):
+        return pd.DataFrame(self.__summaries)
+
+    def aggregate(self, confidence: float = 0.95):
+        """
+        Mean, standard deviation and confidence interval of every numeric metric across replications.
+        The interval uses the normal approximation, suited to the tens or hundreds of replications of a study.
+        :param confidence: confidence level of the interval.
+        :return: DataFrame indexed by metric.
+        """
+        metrics = self.to_dataframe().drop(columns='parameters').select_dtypes(include=np.number)
+        z_value = NormalDist().inv_cdf(0.5 + confidence/2)
+        mean = metrics.mean()
+        std = metrics.std(ddof=1)
+        half_width = z_value*std/np.sqrt(metrics.count())
+        return pd.DataFrame({'mean': mean,
+                             'std': std,
+                             'ci_low': mean - half_width,
+                             'ci_high': mean + half_width,
+                             'replications': metrics.count()})
+
+    def paired_differences(self, other, confidence: float = 0.95):
+        """
+        Confidence interval of the difference of every numeric metric between two configurations run with the
+        same seeds. With common random numbers the paired differences vary much less than the metrics, so
+        fewer replications tell the configurations apart.
+        :param other: results of the other configuration, replication i of both using the same seed.
+        :return: DataFrame indexed by metric, differences are self minus other.
+        """
+        if self.length != other.length:
+            raise ValueError(f'paired replications need the same number of runs, got {self.length} and '
+                             f'{other.length}.')
+        differences = list()
+        for summary, other_summary in zip(self.__summaries, other.summaries):
+            difference = {key: value - other_summary[key] for key, value in summary.items()
+                          if key != 'parameters' and isinstance(value, (int, float, np.number))}
+            difference['parameters'] = summary['parameters']
+            differences.append(difference)
+        return ReplicationResults(summaries=differences).aggregate(confidence)
+
+    @property
+    def summaries(self):
+        return self.__summaries
+
+    @property
+    def length(self):
+        return len(self.__summaries)
+
+
+def run_replications(model_factory: Callable,
+                     parameters: Iterable,
+                     max_workers: Union[int, None] = None,
+                     chunksize: int = 1) -> ReplicationResults:
+    """
+    Runs independent replications of a model in a process pool, one per seed or parameter set.
+    :param model_factory: picklable callable, usually a module level function, receiving one item of
+    parameters and returning a MainSimModel ready to run.
+    :param parameters: seeds or parameter sets, one per replication.
+    :param max_workers: number of worker processes, defaults to the number of cores.
+    :param chunksize: number of replications sent to a worker at once.
+    :return: results of every replication, in the order of parameters.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        summaries = list(executor.map(partial(run_replication, model_factory),
+                                      parameters,
+                                      chunksize=chunksize))
+    return ReplicationResults(summaries=summaries)
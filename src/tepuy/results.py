@@ -0,0 +1,228 @@
+import bisect
+import json
+from typing import Union
+import numpy as np
+import pandas as pd
+from tepuy.trace import TRACE_DTYPE, column_path
+
+
+class TraceReader:
+    def __init__(self,
+                 columns: dict,
+                 metadata: dict,
+                 chunk_rows: int = 1048576):
+        """
+        Discrete event KPIs computed with NumPy over a recorded trace. Rows are processed in chunks of
+        chunk_rows, so memory-mapped traces larger than RAM can be analysed. Every KPI only reads the columns
+        it needs.
+        :param columns: dictionary with one array per field of TRACE_DTYPE, rows sorted by end time, usually
+        memory maps.
+        :param metadata: trace metadata, as written by TraceRecorder.
+        :param chunk_rows: number of rows processed at once.
+        """
+        self.__columns = columns
+        self.__length = len(columns['end'])
+        self.__metadata = metadata
+        self.__chunk_rows = chunk_rows
+        self.__event_names = np.array(metadata['events'], dtype=object)
+        self.__node_names = list(metadata['nodes'])
+
+    @classmethod
+    def open(cls, path: str, chunk_rows: int = 1048576):
+        """
+        Memory-maps the columns of a raw trace written by TraceRecorder.
+        :param path: base name of the trace files, its metadata is read from <path>.json.
+        """
+        with open(f'{path}.json') as metadata_file:
+            metadata = json.load(metadata_file)
+        if metadata['file_format'] != 'raw':
+            raise NotImplementedError(f'{metadata["file_format"]} traces can not be memory-mapped, '
+                                      f'record them with file_format="raw".')
+        if metadata['rows'] == 0:
+            columns = {field: np.empty(0, dtype=TRACE_DTYPE[field]) for field in TRACE_DTYPE.names}
+        else:
+            columns = {field: np.memmap(column_path(path, field), dtype=TRACE_DTYPE[field], mode='r',
+                                        shape=(metadata['rows'],))
+                       for field in TRACE_DTYPE.names}
+        return cls(columns=columns, metadata=metadata, chunk_rows=chunk_rows)
+
+    @classmethod
+    def from_recorder(cls, recorder, chunk_rows: int = 1048576):
+        return cls(columns=recorder.to_columns(), metadata=recorder.metadata(), chunk_rows=chunk_rows)
+
+    def window(self, start: float, end: float):
+        """
+        Zero-copy view of the events ending in [start, end).
+        """
+        end_times = self.__columns['end']
+        first_row = bisect.bisect_left(end_times, start)
+        last_row = bisect.bisect_left(end_times, end, lo=first_row)
+        return TraceReader(columns={field: column[first_row:last_row] for field, column in self.__columns.items()},
+                           metadata=self.__metadata,
+                           chunk_rows=self.__chunk_rows)
+
+    def chunks(self):
+        """
+        :return: iterator over dictionaries of column views of chunk_rows rows. Columns are only read when used.
+        """
+        for first_row in range(0, self.__length, self.__chunk_rows):
+            yield {field: column[first_row:first_row + self.__chunk_rows] for field, column in self.__columns.items()}
+
+    def __event_codes(self, prefix: str):
+        return np.array([code for code, name in enumerate(self.__event_names) if name.startswith(prefix)],
+                        dtype=np.int32)
+
+    def __node_code(self, node_name: str):
+        try:
+            return self.__node_names.index(node_name)
+        except ValueError:
+            raise KeyError(f'{node_name} is not a node of the trace.')
+
+    def __select(self, event_codes: np.ndarray, node_code: Union[int, None], fields: tuple):
+        """
+        :return: fields of the rows of event_codes, and of node_code if given, gathered chunk by chunk.
+        """
+        selected = {field: list() for field in fields}
+        for chunk in self.chunks():
+            mask = np.isin(chunk['event'], event_codes)
+            if node_code is not None:
+                mask &= chunk['node'] == node_code
+            for field in fields:
+                selected[field].append(chunk[field][mask])
+        return {field: np.concatenate(values) if values else np.empty(0, dtype=TRACE_DTYPE[field])
+                for field, values in selected.items()}
+
+    # KPIs
+    @property
+    def horizon(self):
+        """
+        :return: (first start, last end) simulation times of the trace.
+        """
+        if self.__length == 0:
+            return 0.0, 0.0
+        first_start = min(float(chunk['start'].min()) for chunk in self.chunks())
+        return first_start, float(self.__columns['end'][-1])
+
+    def node_utilization(self):
+        """
+        Share of the capacity of each node that was occupied. An entity occupies a node from the start
+        (admission) to the end (exit) of its on_exited event.
+        :return: DataFrame indexed by node with busy time, capacity and utilization.
+        """
+        exited_codes = self.__event_codes('on_exited_')
+        busy_time = np.zeros(len(self.__node_names))
+        for chunk in self.chunks():
+            mask = np.isin(chunk['event'], exited_codes) & (chunk['node'] >= 0)
+            busy_time += np.bincount(chunk['node'][mask],
+                                     weights=chunk['end'][mask] - chunk['start'][mask],
+                                     minlength=len(self.__node_names))
+        first_start, last_end = self.horizon
+        capacity = np.array(self.__metadata['capacities'], dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            utilization = busy_time/(capacity*(last_end - first_start))
+        return pd.DataFrame({'busy_time': busy_time,
+                             'capacity': capacity,
+                             'utilization': utilization},
+                            index=pd.Index(self.__node_names, name='node'))
+
+    def queue_length(self, node_name: str):
+        """
+        Number of entities waiting to be admitted in a node over time. An entity waits from its arrival (end
+        of its on_entered or created_entity event) to its admission (start of its on_exited event).
+        :return: DataFrame with the simulation time of every change and the queue length after it.
+        """
+        node_code = self.__node_code(node_name)
+        arrival_codes = np.concatenate([self.__event_codes('on_entered_'), self.__event_codes('created_entity')])
+        arrivals = self.__select(arrival_codes, node_code, ('end',))['end']
+        admissions = self.__select(self.__event_codes('on_exited_'), node_code, ('start',))['start']
+        times = np.concatenate([arrivals, admissions])
+        deltas = np.concatenate([np.ones(len(arrivals)), -np.ones(len(admissions))])
+        order = np.argsort(times, kind='stable')
+        times = times[order]
+        lengths = np.cumsum(deltas[order])
+        # Keep the length after the last change of each time.
+        last_of_time = np.append(times[1:] != times[:-1], True)
+        return pd.DataFrame({'simulation_time': times[last_of_time],
+                             'queue_length': lengths[last_of_time].astype(np.int64)})
+
+    def mean_queue_length(self, node_name: str):
+        """
+        :return: time average of the queue length of a node over the trace horizon.
+        """
+        series = self.queue_length(node_name)
+        first_start, last_end = self.horizon
+        if last_end <= first_start or len(series) == 0:
+            return 0.0
+        durations = np.diff(np.append(series['simulation_time'].to_numpy(), last_end))
+        return float((series['queue_length'].to_numpy()*durations).sum()/(last_end - first_start))
+
+    def cycle_times(self):
+        """
+        Time from creation to destruction of every entity that reached a destructor.
+        :return: DataFrame indexed by entity id with creation date, exit date and cycle time.
+        """
+        created = self.__select(self.__event_codes('created_entity'), None, ('entity', 'end'))
+        destructor_codes = np.flatnonzero(np.array(self.__metadata['destructors'], dtype=bool))
+        exited = {field: list() for field in ('entity', 'end')}
+        exited_codes = self.__event_codes('on_exited_')
+        for chunk in self.chunks():
+            mask = np.isin(chunk['event'], exited_codes) & np.isin(chunk['node'], destructor_codes)
+            exited['entity'].append(chunk['entity'][mask])
+            exited['end'].append(chunk['end'][mask])
+        exited_entities = np.concatenate(exited['entity']) if exited['entity'] else np.empty(0, np.int64)
+        exit_dates = np.concatenate(exited['end']) if exited['end'] else np.empty(0)
+        order = np.argsort(created['entity'], kind='stable')
+        created_entities = created['entity'][order]
+        creation_dates = created['end'][order]
+        if len(created_entities) == 0:
+            position = np.zeros(len(exited_entities), dtype=np.int64)
+            found = np.zeros(len(exited_entities), dtype=bool)
+        else:
+            position = np.minimum(np.searchsorted(created_entities, exited_entities), len(created_entities) - 1)
+            found = created_entities[position] == exited_entities
+        return pd.DataFrame({'creation_date': creation_dates[position[found]],
+                             'exit_date': exit_dates[found],
+                             'cycle_time': exit_dates[found] - creation_dates[position[found]]},
+                            index=pd.Index(exited_entities[found], name='entity'))
+
+    def throughput(self, bin_seconds: float):
+        """
+        :return: number of entities reaching a destructor per time bin of bin_seconds.
+        """
+        exit_dates = self.cycle_times()['exit_date'].to_numpy()
+        first_start, last_end = self.horizon
+        edges = np.arange(first_start, last_end + bin_seconds, bin_seconds)
+        counts, edges = np.histogram(exit_dates, bins=edges)
+        return pd.DataFrame({'bin_start': edges[:-1], 'throughput': counts})
+
+    def work_in_process(self):
+        """
+        :return: DataFrame with the number of entities in the system after each creation or destruction.
+        """
+        cycle_times = self.cycle_times()
+        created = self.__select(self.__event_codes('created_entity'), None, ('end',))['end']
+        times = np.concatenate([created, cycle_times['exit_date'].to_numpy()])
+        deltas = np.concatenate([np.ones(len(created)), -np.ones(len(cycle_times))])
+        order = np.argsort(times, kind='stable')
+        times = times[order]
+        levels = np.cumsum(deltas[order])
+        last_of_time = np.append(times[1:] != times[:-1], True)
+        return pd.DataFrame({'simulation_time': times[last_of_time],
+                             'work_in_process': levels[last_of_time].astype(np.int64)})
+
+    # Getters and setters
+    @property
+    def columns(self):
+        return self.__columns
+
+    @property
+    def metadata(self):
+        return self.__metadata
+
+    @property
+    def node_names(self):
+        return self.__node_names
+
+    @property
+    def length(self):
+        return self.__length
@@ -0,0 +1,94 @@
+from typing import Union
+import numpy as np
+from tepuy.clock import SECONDS_PER_UNIT
+from tepuy.distributions import Distribution, object_rng
+from tepuy.network import Network
+from tepuy.processes import DelayProcess, EMPTY_PROCESS
+
+
+def lindley_departures(arrivals: np.ndarray, service_times: Union[float, np.ndarray]):
+    """
+    Departure times of a FIFO single server queue with unlimited waiting room. The Lindley recursion
+    d_k = max(a_k, d_k-1) + s_k unrolls to d_k = S_k + max over j <= k of (a_j - S_j-1), with S the cumulative
+    service time, so the whole arrival array is solved with a cumulative sum and a running maximum.
+    :param arrivals: arrival times, sorted.
+    :param service_times: service time of every arrival, or the same for all of them.
+    """
+    service_times = np.broadcast_to(np.asarray(service_times, dtype=np.float64), arrivals.shape)
+    cumulative_service = np.cumsum(service_times)
+    return cumulative_service + np.maximum.accumulate(arrivals - (cumulative_service - service_times))
+
+
+def serial_line(network: Network):
+    """
+    Checks if a compiled network is a serial line the Lindley recursion can solve: one creator whose output node
+    leads, through fixed lead time paths, along single-server nodes, each either without process or with a
+    DelayProcess, to a destructor. Nodes must be empty and available.
+    :return: list of (node, lead time in seconds of the path leaving it) from the creator output node to the
+    destructor node, None if the network is not a serial line.
+    """
+    if len(network.creators) != 1:
+        return None
+    indptr = network.indptr
+    node = network.creators[0].output_node
+    stages = list()
+    visited = set()
+    random_delays = set()
+    while True:
+        if node.node_id in visited or not node.available or node.population.length or node.queue.length:
+            return None
+        visited.add(node.node_id)
+        process = node.entry_process
+        if node.exit_process is not EMPTY_PROCESS or node.next_node is not None:
+            return None
+        if process is not EMPTY_PROCESS:
+            if type(process) is not DelayProcess or node.capacity != 1:
+                return None
+            if isinstance(process.duration, Distribution):
+                # A process shared by several nodes draws their durations from one stream in the event loop.
+                if process in random_delays:
+                    return None
+                random_delays.add(process)
+        begin, end = indptr[node.node_id], indptr[node.node_id + 1]
+        if node.is_destructor:
+            if end > begin:
+                return None
+            stages.append((node, 0.0))
+            return stages
+        if end - begin != 1 or isinstance(network.paths[begin].lead_time, Distribution):
+            return None
+        stages.append((node, float(network.lead_times[begin])))
+        node = network.nodes[network.targets[begin]]
+
+
+def service_times(process, count: int, seed: Union[int, None], block_size: int = 4096):
+    """
+    Service times, in seconds, of count entities going through the entry process of a serial line node. Random
+    durations are drawn in blocks from the stream of the process, as its sample buffer does in the event loop once
+    the network seeded it.
+    :return: a float if every entity takes the same time, otherwise an array.
+    """
+    if process is EMPTY_PROCESS:
+        return 0.0
+    seconds_per_unit = SECONDS_PER_UNIT[process.unit]
+    if not isinstance(process.duration, Distribution):
+        return process.duration*seconds_per_unit
+    rng = object_rng(seed=seed, name=process.name)
+    blocks = [process.duration.sample(rng, block_size) for _ in range(-(-count//block_size))]
+    if not blocks:
+        return np.zeros(0)
+    return np.concatenate(blocks)[:count]*seconds_per_unit
+
+
+def solve_serial_line(stages: list, arrivals: np.ndarray, seed: Union[int, None] = None):
+    """
+    Propagates the arrivals of a serial line through its stages.
+    :param stages: stages of the line, see serial_line.
+    :param arrivals: creation dates, in seconds, of the entities in creation order.
+    :param seed: seed of the random durations.
+    :return: array with the date every entity reaches the destructor.
+    """
+    times = np.asarray(arrivals, dtype=np.float64)
+    for node, lead_time in stages:
+        times = lindley_departures(times, service_times(node.entry_process, len(times), seed)) + lead_time
+    return times
@@ -0,0 +1,241 @@
+import json
+import os
+from typing import Union
+import numpy as np
+import pandas as pd
+from tepuy.instrumentation import EventLoopHook
+
+# Fields of the trace and their types. Every field is stored in its own column.
+TRACE_DTYPE = np.dtype([('event', np.int32),
+                        ('start', np.float64),
+                        ('end', np.float64),
+                        ('entity', np.int64),
+                        ('node', np.int32)])
+
+
+def column_path(path: str, field: str):
+    """
+    :return: file of field in a raw trace written to path.
+    """
+    return f'{path}.{field}'
+
+
+class TraceRecorder(EventLoopHook):
+    def __init__(self,
+                 path: Union[str, None] = None,
+                 chunk_size: int = 65536,
+                 file_format: str = 'raw'):
+        """
+        Append-only columnar log of the processed events. Every event is stored in one row of preallocated
+        NumPy columns: event name code, start and end simulation times, entity id and node code. Full chunks are
+        spilled to disk, so memory stays bounded by chunk_size whatever the length of the run.
+        :param path: base name of the trace files. Metadata (names of events and nodes, start date) is written to
+        <path>.json. If None, chunks are kept in memory.
+        :param chunk_size: number of rows buffered before spilling.
+        :param file_format: 'raw' appends every column to its own file, <path>.<field>, so each column can be
+        memory-mapped and read alone, 'parquet' writes one row group per chunk to path and requires pyarrow. The
+        parquet file stays open across the run segments of a model and is only complete once the recorder is
+        closed.
+        """
+        self.valid_formats = ['raw', 'parquet']
+        if file_format not in self.valid_formats:
+            raise NotImplementedError(f'{file_format} not a valid file_format. '
+                                      f'Valid options are: {", ".join(self.valid_formats)}')
+        self.__path = path
+        self.__chunk_size = chunk_size
+        self.__file_format = file_format
+        self.__columns = {field: np.empty(chunk_size, dtype=TRACE_DTYPE[field]) for field in TRACE_DTYPE.names}
+        self.__event_column = self.__columns['event']
+        self.__start_column = self.__columns['start']
+        self.__end_column = self.__columns['end']
+        self.__entity_column = self.__columns['entity']
+        self.__node_column = self.__columns['node']
+        self.__buffered = 0
+        self.__rows = 0
+        self.__chunks = list()
+        self.__event_codes = dict()
+        self.__node_codes = dict()
+        self.__nodes = list()
+        self.__start_date = None
+        self.__parquet_writer = None
+        if path is not None:
+            for trace_path in [path] + [column_path(path, field) for field in TRACE_DTYPE.names]:
+                if os.path.exists(trace_path):
+                    os.remove(trace_path)
+
+    def event_code(self, event_name: str):
+        try:
+            return self.__event_codes[event_name]
+        except KeyError:
+            self.__event_codes[event_name] = len(self.__event_codes)
+            return self.__event_codes[event_name]
+
+    def node_code(self, node):
+        if node is None:
+            return -1
+        try:
+            return self.__node_codes[node]
+        except KeyError:
+            self.__node_codes[node] = len(self.__nodes)
+            self.__nodes.append(node)
+            return self.__node_codes[node]
+
+    def record(self,
+               event_name: str,
+               start_date: float,
+               end_date: float,
+               entity_id: int,
+               node):
+        if self.__buffered == self.__chunk_size:
+            self.flush()
+        row = self.__buffered
+        self.__event_column[row] = self.event_code(event_name)
+        self.__start_column[row] = start_date
+        self.__end_column[row] = end_date
+        self.__entity_column[row] = entity_id
+        self.__node_column[row] = self.node_code(node)
+        self.__buffered += 1
+        self.__rows += 1
+
+    def flush(self):
+        """
+        Moves the buffered rows to disk, or to the in memory chunks when the recorder has no path.
+        """
+        if self.__buffered == 0:
+            return
+        chunk = self.__buffered_columns()
+        if self.__path is None:
+            self.__chunks.append({field: column.copy() for field, column in chunk.items()})
+        elif self.__file_format == 'raw':
+            for field, column in chunk.items():
+                with open(column_path(self.__path, field), 'ab') as column_file:
+                    column.tofile(column_file)
+        else:
+            self.__write_parquet(chunk)
+        self.__buffered = 0
+
+    def __buffered_columns(self):
+        return {field: column[:self.__buffered] for field, column in self.__columns.items()}
+
+    def __write_parquet(self, chunk: dict):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('pyarrow is required to write traces in parquet format.')
+        table = pa.Table.from_arrays([pa.array(chunk[field]) for field in TRACE_DTYPE.names],
+                                     names=list(TRACE_DTYPE.names))
+        if self.__parquet_writer is None:
+            # A closed trace that records again is written back first, the writer would truncate it.
+            written = pq.read_table(self.__path) if os.path.exists(self.__path) else None
+            self.__parquet_writer = pq.ParquetWriter(self.__path, table.schema)
+            if written is not None:
+                self.__parquet_writer.write_table(written)
+        self.__parquet_writer.write_table(table)
+
+    def close(self):
+        """
+        Flushes the buffered rows, completes the parquet file and writes the metadata.
+        """
+        self.flush()
+        if self.__parquet_writer is not None:
+            self.__parquet_writer.close()
+            self.__parquet_writer = None
+        self.__write_metadata()
+
+    def __write_metadata(self):
+        if self.__path is not None:
+            with open(f'{self.__path}.json', 'w') as metadata_file:
+                json.dump(self.metadata(), metadata_file)
+
+    def metadata(self):
+        return {'rows': self.__rows,
+                'file_format': self.__file_format,
+                'dtype': TRACE_DTYPE.descr,
+                'start_date': None if self.__start_date is None else str(self.__start_date),
+                'events': list(self.__event_codes.keys()),
+                'nodes': [node.name for node in self.__nodes],
+                'capacities': [getattr(node, 'capacity', 0) for node in self.__nodes],
+                'destructors': [bool(getattr(node, 'is_destructor', False)) for node in self.__nodes]}
+
+    # Event loop hook
+    def on_run_start(self, model):
+        self.__start_date = model.start_date
+
+    def on_event_end(self, event, result):
+        """
+        Records an event once processed. Events run by a Creator are attributed to its output node and to the
+        entity they returned, events run by a node to the entity they were scheduled for.
+        """
+        owner = getattr(event.action, '__self__', None)
+        node = getattr(owner, 'output_node', owner)
+        entity = result
+        if entity is None:
+            if event.action_args:
+                entity = event.action_args[0]
+            elif event.action_kwargs is not None:
+                entity = event.action_kwargs.get('entity')
+        self.record(event_name=event.name,
+                    start_date=event.start_date,
+                    end_date=event.end_date,
+                    entity_id=getattr(entity, 'entity_id', -1),
+                    node=node)
+
+    def on_run_end(self, model):
+        """
+        Flushes the rows of the run segment. The parquet writer stays open, so a resumed run appends to the same
+        file, see close.
+        """
+        self.flush()
+        self.__write_metadata()
+
+    # Results
+    def to_columns(self):
+        """
+        :return: dictionary with one array per field holding every recorded row.
+        """
+        if self.__path is None:
+            chunks = self.__chunks
+        elif self.__file_format == 'raw':
+            chunks = [{field: np.fromfile(column_path(self.__path, field), dtype=TRACE_DTYPE[field])
+                       if os.path.exists(column_path(self.__path, field)) else np.empty(0, dtype=TRACE_DTYPE[field])
+                       for field in TRACE_DTYPE.names}]
+        else:
+            self.close()
+            written = pd.read_parquet(self.__path)
+            chunks = [{field: written[field].to_numpy(dtype=TRACE_DTYPE[field]) for field in TRACE_DTYPE.names}]
+        chunks = chunks + [self.__buffered_columns()]
+        return {field: np.concatenate([chunk[field] for chunk in chunks]) for field in TRACE_DTYPE.names}
+
+    def to_numpy(self):
+        """
+        :return: structured array with every recorded row.
+        """
+        columns = self.to_columns()
+        records = np.empty(len(columns['event']), dtype=TRACE_DTYPE)
+        for field, column in columns.items():
+            records[field] = column
+        return records
+
+    def to_dataframe(self, clock=None):
+        """
+        :param clock: if given, start and end are reported as dates of this clock.
+        :return: DataFrame with one row per event and names instead of codes.
+        """
+        records = self.to_columns()
+        trace = pd.DataFrame(records)
+        trace['event'] = pd.Categorical.from_codes(records['event'], categories=list(self.__event_codes.keys()))
+        node_names = np.array([node.name for node in self.__nodes] + [None], dtype=object)
+        trace['node'] = node_names[records['node']]
+        if clock is not None:
+            trace['start'] = clock.to_datetimes(trace['start'])
+            trace['end'] = clock.to_datetimes(trace['end'])
+        return trace
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def length(self):
+        return self.__rows
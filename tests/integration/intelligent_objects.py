@@ -1,5 +1,11 @@
+import sys
 import pandas as pd
-from tepuy.intelligent_objects import Creator, MainSimModel, Destructor, Path
+from tepuy.intelligent_objects import Creator, MainSimModel, Destructor, Path, EntityTable, TaskStation, SimNode, \
+    Entity
+from tepuy.processes import DelayProcess, EMPTY_PROCESS, SimEvent, SimProcess
+from tepuy.queues import HeapQueue
+from tepuy.instrumentation import EventProfiler
+from tepuy.distributions import Exponential
 
 
 def create_mock_work_orders():
@@ -53,3 +59,369 @@ def test_source():
                                              new_source.output_node: {'next': new_sink.input_node,
                                                                       'path': new_path}})
     main_model.run()
+
+
+def test_streamed_source():
+    wo_df = create_mock_work_orders()
+    new_source = Creator(name='wo_creator',
+                         position=(1, 1),
+                         arrival_type='stream',
+                         arrival_rate=None,
+                         arrival_table=wo_df,
+                         datetime_column='order_date',
+                         name_column=None)
+    new_sink = Destructor(name='wo_destructor', position=(2, 1))
+    new_path = Path(name='main_type',
+                    path_type='path_time',
+                    node_from=new_source.output_node,
+                    node_to=new_sink.input_node,
+                    lead_time=10)
+    main_model = MainSimModel(name='new_model', start_date=pd.to_datetime('2021-09-30 15:00:00'),
+                              model_network={'start': {'next': new_source},
+                                             new_source.output_node: {'next': new_sink.input_node,
+                                                                      'path': new_path}})
+    main_model.run()
+    assert main_model.actions.length == 0
+
+
+def test_entity_table_statistics():
+    wo_df = create_mock_work_orders()
+    new_source = Creator(name='wo_creator',
+                         position=(1, 1),
+                         arrival_type='arrival_table',
+                         arrival_rate=None,
+                         arrival_table=wo_df,
+                         datetime_column='order_date',
+                         name_column=None)
+    new_sink = Destructor(name='wo_destructor', position=(2, 1))
+    new_path = Path(name='main_type',
+                    path_type='path_time',
+                    node_from=new_source.output_node,
+                    node_to=new_sink.input_node,
+                    lead_time=10)
+    entity_table = EntityTable(name='work_orders', initial_capacity=2)
+    main_model = MainSimModel(name='new_model', start_date=pd.to_datetime('2021-09-30 15:00:00'),
+                              model_network={'start': {'next': new_source},
+                                             new_source.output_node: {'next': new_sink.input_node,
+                                                                      'path': new_path}},
+                              entity_table=entity_table)
+    main_model.run()
+    statistics = entity_table.statistics()
+    assert statistics['entities_created'] == 4
+    assert statistics['entities_destroyed'] == 4
+    assert statistics['mean_time_in_system'] == 10*3600
+    assert entity_table.count_by_node() == {'wo_creator_output_node': 0, 'wo_destructor_input_node': 0}
+    results = entity_table.to_dataframe(clock=main_model.clock)
+    assert results['exit_date'].iloc[0] == pd.Timestamp('2021-10-01 01:00:00')
+
+
+def test_table_entities_forward_to_their_row():
+    entity_table = EntityTable(name='work_orders')
+    entity = entity_table.new_entity(name='order_0', creation_date=5.0)
+    assert sys.getsizeof(entity) < sys.getsizeof(Entity(name='order_1'))
+    assert not hasattr(entity, '__dict__')
+    entity.name = 'renamed'
+    entity.available_date = 7.0
+    entity.exit_date = 9.0
+    assert entity_table.names == ['renamed']
+    assert entity_table.column('available_date').tolist() == [7.0]
+    assert entity_table.statistics()['mean_time_in_system'] == 4.0
+    entity.network = 'network'
+    assert entity_table.network == 'network'
+
+
+def test_blocked_entities_are_admitted_in_order():
+    wo_df = pd.DataFrame({'order_date': ['2021-09-30 15:00:00']*50})
+    new_source = Creator(name='wo_creator',
+                         position=(1, 1),
+                         arrival_type='arrival_table',
+                         arrival_rate=None,
+                         arrival_table=wo_df,
+                         datetime_column='order_date',
+                         name_column=None)
+    new_sink = Destructor(name='wo_destructor', position=(2, 1))
+    new_path = Path(name='main_type',
+                    path_type='path_time',
+                    node_from=new_source.output_node,
+                    node_to=new_sink.input_node,
+                    lead_time=1)
+    profiler = EventProfiler(sample_every=1)
+    main_model = MainSimModel(name='new_model', start_date=pd.to_datetime('2021-09-30 15:00:00'),
+                              model_network={'start': {'next': new_source},
+                                             new_source.output_node: {'next': new_sink.input_node,
+                                                                      'path': new_path}},
+                              entity_table=EntityTable(name='work_orders'),
+                              hooks=[profiler])
+    main_model.run()
+    assert new_sink.destroyed_count == 50
+    assert new_source.output_node.queue.length == 0
+    # Creation, two exits and one entry per entity, blocked entities are not retried.
+    assert main_model.summary()['events_processed'] == 50*4
+    assert profiler.calendar_dataframe()['calendar_length'].max() <= 51
+
+
+def test_simultaneous_arrivals_run_in_bulk():
+    wo_df = pd.DataFrame({'order_date': ['2021-09-30 15:00:00']*6 + ['2021-09-30 16:00:00']*6})
+    results = list()
+    for hooks in [None, [EventProfiler()]]:
+        new_source = Creator(name='wo_creator',
+                             position=(1, 1),
+                             arrival_type='arrival_table',
+                             arrival_rate=None,
+                             arrival_table=wo_df,
+                             datetime_column='order_date',
+                             name_column=None)
+        new_source.output_node.capacity = 4
+        new_sink = Destructor(name='wo_destructor', position=(2, 1))
+        new_path = Path(name='main_type',
+                        path_type='path_time',
+                        node_from=new_source.output_node,
+                        node_to=new_sink.input_node,
+                        lead_time=1)
+        entity_table = EntityTable(name='work_orders')
+        main_model = MainSimModel(name='new_model', start_date=pd.to_datetime('2021-09-30 15:00:00'),
+                                  model_network={'start': {'next': new_source},
+                                                 new_source.output_node: {'next': new_sink.input_node,
+                                                                          'path': new_path}},
+                                  entity_table=entity_table,
+                                  hooks=hooks)
+        main_model.run()
+        results.append((main_model.summary(), entity_table.to_dataframe()))
+    # The instrumented run steps events one by one, the plain run in batches.
+    assert results[0][0] == results[1][0]
+    pd.testing.assert_frame_equal(results[0][1], results[1][1])
+
+
+class RecordingProcess(SimProcess):
+    def __init__(self, log: list):
+        super().__init__(name='recording', associated_object=None, context_object=None)
+        self.__log = log
+
+    def run_process(self, entity=None, actions=None, date: float = 0.0, **kwargs):
+        self.__log.append(entity.current_node.population.length)
+        actions.add_entity(SimEvent(start_date=date, end_date=date, event_name=f'{entity.name}_step',
+                                    action=self.__log.append, action_args=(entity.name,)))
+
+
+def test_batch_entry_matches_single_entries():
+    logs, orders = list(), list()
+    for batch in [False, True]:
+        log = list()
+        node = SimNode(name='node', position=(1, 1), capacity=2, entry_process=RecordingProcess(log))
+        actions = HeapQueue(name='actions', sorting_feature='end_date')
+        entities = [Entity(name=f'entity_{idx}') for idx in range(3)]
+        if batch:
+            node.on_entered_batch(entities=entities, actions=actions, enter_date=0.0)
+        else:
+            for entity in entities:
+                node.on_entered(entity=entity, actions=actions, enter_date=0.0)
+        orders.append([actions.pop().name for _ in range(actions.length)])
+        logs.append(log)
+    assert orders[0] == orders[1]
+    assert logs[0] == logs[1] == [1, 2]
+
+
+def test_random_arrivals():
+    new_source = Creator(name='wo_creator',
+                         position=(1, 1),
+                         arrival_type='rate',
+                         arrival_rate=2,
+                         arrival_table=None,
+                         datetime_column=None,
+                         name_column=None,
+                         seed=11,
+                         arrival_horizon=100)
+    new_sink = Destructor(name='wo_destructor', position=(2, 1))
+    new_path = Path(name='main_type',
+                    path_type='path_time',
+                    node_from=new_source.output_node,
+                    node_to=new_sink.input_node,
+                    lead_time=1)
+    main_model = MainSimModel(name='new_model', start_date=pd.to_datetime('2021-09-30 15:00:00'),
+                              model_network={'start': {'next': new_source},
+                                             new_source.output_node: {'next': new_sink.input_node,
+                                                                      'path': new_path}})
+    main_model.run()
+    assert 150 < new_sink.destroyed_count < 250
+    assert main_model.summary()['end_time'] <= 101*3600
+
+
+def create_random_model():
+    new_source = Creator(name='wo_creator',
+                         position=(1, 1),
+                         arrival_type='rate',
+                         arrival_rate=2,
+                         arrival_table=None,
+                         datetime_column=None,
+                         name_column=None,
+                         seed=5,
+                         arrival_horizon=100)
+    new_sink = Destructor(name='wo_destructor', position=(2, 1))
+    new_path = Path(name='main_type',
+                    path_type='path_time',
+                    node_from=new_source.output_node,
+                    node_to=new_sink.input_node,
+                    lead_time=Exponential(2))
+    return MainSimModel(name='new_model', start_date=pd.to_datetime('2021-09-30 15:00:00'),
+                        model_network={'start': {'next': new_source},
+                                       new_source.output_node: {'next': new_sink.input_node,
+                                                                'path': new_path}},
+                        seed=5)
+
+
+def test_snapshot_and_resume(tmp_path):
+    full_model = create_random_model()
+    full_model.run()
+    warm_model = create_random_model()
+    warm_model.run(until=50*3600)
+    assert warm_model.current_time == 50*3600
+    assert warm_model.summary()['end_time'] <= 50*3600
+    assert warm_model.summary()['entities_destroyed'] < full_model.summary()['entities_destroyed']
+    warm_model.snapshot(tmp_path/'warm.pkl.gz')
+    resumed_model = MainSimModel.restore(tmp_path/'warm.pkl.gz')
+    resumed_model.run()
+    assert resumed_model.summary() == full_model.summary()
+
+
+def test_fork_branches_are_independent():
+    model = create_random_model()
+    model.run(until=50*3600)
+    branch = model.fork()
+    branch.run()
+    assert model.summary()['end_time'] <= 50*3600
+    model.run()
+    assert model.summary() == branch.summary()
+
+
+def create_listed_arrivals_model():
+    arrivals = [(pd.Timestamp('2021-09-30 15:00:00') + pd.Timedelta(hours=idx), f'order_{idx}') for idx in range(6)]
+    new_source = Creator(name='wo_creator',
+                         position=(1, 1),
+                         arrival_type='stream',
+                         arrival_rate=None,
+                         arrival_table=arrivals,
+                         datetime_column=None,
+                         name_column=None)
+    new_sink = Destructor(name='wo_destructor', position=(2, 1))
+    new_path = Path(name='main_type',
+                    path_type='path_time',
+                    node_from=new_source.output_node,
+                    node_to=new_sink.input_node,
+                    lead_time=2)
+    return MainSimModel(name='new_model', start_date=pd.to_datetime('2021-09-30 15:00:00'),
+                        model_network={'start': {'next': new_source},
+                                       new_source.output_node: {'next': new_sink.input_node,
+                                                                'path': new_path}},
+                        solver='events')
+
+
+def test_snapshot_of_listed_arrivals(tmp_path):
+    full_model = create_listed_arrivals_model()
+    full_model.run()
+    warm_model = create_listed_arrivals_model()
+    warm_model.run(until=3*3600)
+    warm_model.snapshot(tmp_path/'warm.pkl.gz')
+    branch = warm_model.fork()
+    resumed_model = MainSimModel.restore(tmp_path/'warm.pkl.gz')
+    resumed_model.run()
+    branch.run()
+    assert resumed_model.summary() == full_model.summary()
+    assert branch.summary() == full_model.summary()
+    assert full_model.summary()['entities_destroyed'] == 6
+
+
+def test_task_station_servers():
+    wo_df = pd.DataFrame({'order_date': ['2021-09-30 15:00:00']*5 + ['2021-09-30 20:00:00']})
+    new_source = Creator(name='wo_creator',
+                         position=(1, 1),
+                         arrival_type='arrival_table',
+                         arrival_rate=None,
+                         arrival_table=wo_df,
+                         datetime_column='order_date',
+                         name_column=None)
+    press = TaskStation(name='press',
+                        position=(2, 1),
+                        servers=2,
+                        process=DelayProcess(name='press_delay', duration=1))
+    new_sink = Destructor(name='wo_destructor', position=(3, 1))
+    to_press = Path(name='to_press',
+                    path_type='path_time',
+                    node_from=new_source.output_node,
+                    node_to=press.input_node,
+                    lead_time=0)
+    to_sink = Path(name='to_sink',
+                   path_type='path_time',
+                   node_from=press.output_node,
+                   node_to=new_sink.input_node,
+                   lead_time=0)
+    main_model = MainSimModel(name='new_model', start_date=pd.to_datetime('2021-09-30 15:00:00'),
+                              model_network={'start': {'next': new_source},
+                                             new_source.output_node: {'next': press.input_node, 'path': to_press},
+                                             press.output_node: {'next': new_sink.input_node, 'path': to_sink}})
+    main_model.run()
+    assert press.input_node.name != press.output_node.name
+    assert new_sink.destroyed_count == 6
+    assert press.processed_count == 6
+    assert press.busy_servers == 0
+    assert main_model.summary()['end_time'] == 6*3600
+    # Orders of the first batch finish after 1, 1, 2, 2 and 3 hours.
+    assert new_sink.mean_time_in_system == (1 + 1 + 2 + 2 + 3 + 1)*3600/6
+    assert press.busy_times(6*3600).tolist() == [4*3600, 2*3600]
+    assert press.utilization(6*3600) == 0.5
+
+
+def test_stations_share_a_process():
+    wo_df = pd.DataFrame({'order_date': ['2021-09-30 15:00:00']*2})
+    new_source = Creator(name='wo_creator',
+                         position=(1, 1),
+                         arrival_type='arrival_table',
+                         arrival_rate=None,
+                         arrival_table=wo_df,
+                         datetime_column='order_date',
+                         name_column=None)
+    delay = DelayProcess(name='shared_delay', duration=1)
+    stations = [TaskStation(name='press', position=(2, 1), servers=2, process=delay),
+                TaskStation(name='drill', position=(3, 1), servers=1, process=delay),
+                TaskStation(name='check', position=(4, 1))]
+    new_sink = Destructor(name='wo_destructor', position=(5, 1))
+    nodes = [new_source.output_node] + [node for station in stations
+                                        for node in (station.input_node, station.output_node)] + [new_sink.input_node]
+    model_network = {'start': {'next': new_source}}
+    for idx, node_from in enumerate(nodes[:-1:2]):
+        model_network[node_from] = {'next': nodes[2*idx + 1],
+                                    'path': Path(name=f'path_{idx}', path_type='path_time', node_from=node_from,
+                                                 node_to=nodes[2*idx + 1], lead_time=0)}
+    main_model = MainSimModel(name='new_model', start_date=pd.to_datetime('2021-09-30 15:00:00'),
+                              model_network=model_network)
+    main_model.run()
+    assert new_sink.mean_time_in_system == (2 + 3)*3600/2
+    assert delay.associated_object is None and delay.context_object is None
+    assert stations[2].process is EMPTY_PROCESS
+    assert EMPTY_PROCESS.associated_object is None and EMPTY_PROCESS.context_object is None
+
+
+def run_timeout_race(hooks):
+    model = create_random_model()
+    model = MainSimModel(name='race', start_date=model.start_date, model_network=model.network, solver='events',
+                         hooks=hooks)
+    log = list()
+    handles = dict()
+
+    def complete():
+        log.append('completion')
+        handles['timeout'].cancel()
+        handles['retry'].reschedule(3600.0)
+
+    handles['completion'] = model.actions.add_entity(SimEvent(start_date=0, end_date=3600.0,
+                                                              event_name='completion', action=complete))
+    handles['timeout'] = model.actions.add_entity(SimEvent(start_date=0, end_date=3600.0, event_name='timeout',
+                                                           action=lambda: log.append('timeout')))
+    handles['retry'] = model.actions.add_entity(SimEvent(start_date=0, end_date=3600.0, event_name='retry',
+                                                         action=lambda: log.append('retry')))
+    model.run()
+    return log
+
+
+def test_cancel_at_the_same_instant():
+    assert run_timeout_race(hooks=None) == ['completion', 'retry']
+    assert run_timeout_race(hooks=[EventProfiler()]) == ['completion', 'retry']
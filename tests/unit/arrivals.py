@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+from tepuy.arrivals import make_arrival_source, RateArrivals
+from tepuy.distributions import Gamma, Empirical, PiecewiseRate, object_rng
+from tepuy.clock import SimClock
+from tepuy.intelligent_objects import Creator
+from tepuy.queues import HeapQueue
+
+
+def create_arrival_table():
+    return pd.DataFrame({'order_date': ['2021-09-30 15:00:00',
+                                        '2021-09-30 16:00:00',
+                                        '2021-09-30 17:00:00']})
+
+
+def test_csv_and_dataframe_sources_match(tmp_path):
+    arrival_table = create_arrival_table()
+    csv_path = str(tmp_path / 'orders.csv')
+    arrival_table.to_csv(csv_path, index=False)
+    from_frame = list(make_arrival_source(arrival_table, datetime_column='order_date'))
+    from_csv = list(make_arrival_source(csv_path, datetime_column='order_date'))
+    assert from_frame == from_csv
+    assert [name for _, name in from_frame] == ['entity_0', 'entity_1', 'entity_2']
+
+
+def test_stream_keeps_one_pending_arrival():
+    creator = Creator(name='wo_creator',
+                      position=(1, 1),
+                      arrival_type='stream',
+                      arrival_rate=None,
+                      arrival_table=create_arrival_table(),
+                      datetime_column='order_date',
+                      name_column=None)
+    actions = HeapQueue(name='actions')
+    creator.start_arrival_stream(network={}, actions_queue=actions,
+                                 clock=SimClock(start_date='2021-09-30 15:00:00'))
+    assert actions.length == 1
+    first_arrival = actions.pop()
+    assert first_arrival.action_args[0] == 'entity_0'
+    assert first_arrival.end_date == 0.0
+    creator.schedule_next_arrival(network={}, actions=actions)
+    second_arrival = actions.pop()
+    assert second_arrival.action_args[0] == 'entity_1'
+    assert second_arrival.end_date == 3600.0
+
+
+def test_unsorted_stream_raises():
+    creator = Creator(name='wo_creator',
+                      position=(1, 1),
+                      arrival_type='stream',
+                      arrival_rate=None,
+                      arrival_table=iter([('2021-09-30 16:00:00', 'late'), ('2021-09-30 15:00:00', 'early')]),
+                      datetime_column='order_date',
+                      name_column=None)
+    actions = HeapQueue(name='actions')
+    creator.start_arrival_stream(network={}, actions_queue=actions,
+                                 clock=SimClock(start_date='2021-09-30 15:00:00'))
+    with pytest.raises(ValueError):
+        creator.schedule_next_arrival(network={}, actions=actions)
+
+
+def test_poisson_arrivals():
+    arrivals = list(RateArrivals(arrival_rate=10, rng=object_rng(seed=1, name='creator'), horizon=1000))
+    times = np.array([arrival_time for arrival_time, _ in arrivals])
+    assert np.all(np.diff(times) >= 0)
+    assert times[-1] <= 1000*3600
+    assert abs(len(times) - 10000) < 400
+    assert arrivals[0][1] == 'entity_0'
+
+
+def test_renewal_arrivals_stop_at_max_arrivals():
+    gamma = list(RateArrivals(arrival_rate=Gamma(shape=2, scale=0.5), rng=object_rng(seed=1, name='creator'),
+                              max_arrivals=2500))
+    assert len(gamma) == 2500
+    empirical = list(RateArrivals(arrival_rate=Empirical([1.0, 3.0]), rng=object_rng(seed=1, name='creator'),
+                                  time_unit='minutes', max_arrivals=10))
+    assert set(np.diff([0.0] + [arrival_time for arrival_time, _ in empirical])) <= {60.0, 180.0}
+
+
+def test_piecewise_rate_arrivals():
+    rate = PiecewiseRate(rates=[0, 20], breakpoints=[0, 12], period=24)
+    times = np.array([arrival_time for arrival_time, _ in
+                      RateArrivals(arrival_rate=rate, rng=object_rng(seed=3, name='creator'), horizon=240)])
+    hours = np.mod(times/3600, 24)
+    assert np.all(hours >= 12)
+    assert abs(len(times) - 2400) < 200
+
+
+def test_seeded_creator_is_reproducible():
+    runs = list()
+    for _ in range(2):
+        creator = Creator(name='wo_creator',
+                          position=(1, 1),
+                          arrival_type='rate',
+                          arrival_rate=4,
+                          arrival_table=None,
+                          datetime_column=None,
+                          name_column=None,
+                          seed=42,
+                          max_arrivals=3)
+        actions = HeapQueue(name='actions')
+        creator.start_arrival_stream(network={}, actions_queue=actions,
+                                     clock=SimClock(start_date=pd.to_datetime('2021-09-30 15:00:00')))
+        runs.append(actions.pop().end_date)
+    assert runs[0] == runs[1]
+    with pytest.raises(ValueError):
+        list(RateArrivals(arrival_rate=4, rng=object_rng(seed=1, name='creator')))
@@ -0,0 +1,12 @@
+import pandas as pd
+from tepuy.clock import SimClock
+
+
+def test_round_trip():
+    clock = SimClock(start_date='2021-09-30 15:00:00')
+    dates = ['2021-09-30 15:00:00', '2021-09-30 16:30:00', '2021-10-01 15:00:00']
+    simulation_times = clock.to_simulation_times(dates)
+    assert simulation_times.tolist() == [0.0, 5400.0, 86400.0]
+    assert clock.to_simulation_time(dates[1]) == 5400.0
+    assert clock.to_datetime(5400.0) == pd.Timestamp(dates[1])
+    assert (clock.to_datetimes(simulation_times) == pd.DatetimeIndex(dates)).all()
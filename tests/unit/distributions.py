@@ -0,0 +1,36 @@
+import pickle
+import numpy as np
+from tepuy.distributions import Constant, Exponential, Gamma, Uniform, Triangular, Empirical, SampleBuffer, \
+    object_rng
+
+
+def test_object_streams():
+    first = object_rng(seed=7, name='path_a').random(5)
+    assert np.array_equal(first, object_rng(seed=7, name='path_a').random(5))
+    assert not np.array_equal(first, object_rng(seed=7, name='path_b').random(5))
+    assert not np.array_equal(first, object_rng(seed=8, name='path_a').random(5))
+
+
+def test_sample_means():
+    rng = object_rng(seed=1, name='test')
+    for distribution in [Constant(2.0), Exponential(2.0), Gamma(shape=4, scale=0.5), Uniform(1.0, 3.0),
+                         Triangular(1.0, 2.0, 3.0), Empirical([1.0, 2.0, 3.0], weights=[1, 2, 1])]:
+        samples = distribution.sample(rng, 20000)
+        assert abs(samples.mean() - distribution.mean) < 0.05
+
+
+def test_sample_buffer_matches_block_draws():
+    sample_buffer = SampleBuffer(distribution=Exponential(2.0), rng=object_rng(seed=1, name='path'), block_size=3)
+    samples = [sample_buffer.next() for _ in range(7)]
+    rng = object_rng(seed=1, name='path')
+    expected = np.concatenate([rng.exponential(2.0, 3) for _ in range(3)])[:7]
+    assert np.allclose(samples, expected)
+
+
+def test_equal_distributions_share_their_hash():
+    distribution = Empirical([1.0, 2.0, 3.0], weights=[1, 2, 1])
+    assert hash(distribution) == hash(distribution)
+    assert distribution.parameters() == Empirical([1.0, 2.0, 3.0], weights=[1, 2, 1]).parameters()
+    assert distribution == pickle.loads(pickle.dumps(distribution))
+    assert {Gamma(2, 1): 'first'}.get(Gamma(2, 1)) == 'first'
+    assert Gamma(2, 1) != Gamma(1, 2)
@@ -0,0 +1,110 @@
+from functools import partial
+import pandas as pd
+import pytest
+from tepuy.distributions import Gamma
+from tepuy.experiments import Experiment, ResultCache, apply_parameters, configured_model, describe_object, \
+    fingerprint
+from tepuy.intelligent_objects import Creator
+from tepuy.ledger import MaterialLedger
+from models import create_line_model
+
+model_factory = partial(create_line_model, orders=2, name='experiment')
+
+
+def create_ledger_model():
+    ledger = MaterialLedger()
+    ledger.add_material(name='mat_1', bom={'mat_a': 1, 'mat_b': 2})
+    return create_line_model(orders=2, name='ledger', ledger=ledger)
+
+
+class Settings:
+    def __init__(self):
+        self.__values = {'size': 1}
+
+    @property
+    def values(self):
+        return dict(self.__values)
+
+
+class Broken:
+    @property
+    def ratio(self):
+        return 1/0
+
+
+def settings_objects(model):
+    return {'settings': Settings()}
+
+
+def test_fingerprint_depends_on_configuration():
+    first = fingerprint(configured_model(model_factory, {'main_type.lead_time': 1}))
+    assert first == fingerprint(configured_model(model_factory, {'main_type.lead_time': 1}))
+    assert first != fingerprint(configured_model(model_factory, {'main_type.lead_time': 2}))
+    assert first != fingerprint(configured_model(model_factory, {'wo_creator_output_node.capacity': 2}))
+
+
+@pytest.mark.parametrize('settings', [{'seed': 1}, {'routing': 'shortest'}, {'solver': 'events'},
+                                      {'durations': (4,)}, {'durations': (Gamma(2, 1),)}])
+def test_fingerprint_depends_on_model_settings(settings):
+    base_settings = {'durations': (12,), 'lead_times': (1, 1)}
+    base = fingerprint(create_line_model(**base_settings))
+    assert base == fingerprint(create_line_model(**base_settings))
+    assert base != fingerprint(create_line_model(**{**base_settings, **settings}))
+    assert fingerprint(create_line_model(**{**base_settings, 'durations': (Gamma(2, 1),)})) != \
+        fingerprint(create_line_model(**{**base_settings, 'durations': (Gamma(1, 2),)}))
+
+
+def test_fingerprint_reads_input_files(tmp_path):
+    path = str(tmp_path / 'orders.csv')
+    pd.DataFrame({'order_date': ['2021-09-30 15:00:00', '2021-09-30 16:00:00']}).to_csv(path, index=False)
+    creator = Creator(name='wo_creator', position=(1, 1), arrival_type='stream', arrival_rate=None,
+                      arrival_table=path, datetime_column='order_date', name_column=None)
+    first = describe_object(creator)
+    assert first == describe_object(creator)
+    pd.DataFrame({'order_date': ['2021-09-30 15:00:00', '2021-09-30 17:00:00']}).to_csv(path, index=False)
+    assert describe_object(creator) != first
+    model = create_line_model()
+    assert fingerprint(model, input_tables={'orders': path}) != fingerprint(model, input_tables={'orders': 'x'})
+
+
+def test_broken_properties_are_not_fingerprinted():
+    with pytest.raises(ZeroDivisionError):
+        describe_object(Broken())
+
+
+def test_sweep_reuses_cached_points(tmp_path):
+    cache = ResultCache(directory=str(tmp_path))
+    results = Experiment(name='lead_times',
+                         model_factory=model_factory,
+                         grid={'main_type.lead_time': [1, 2]},
+                         cache=cache).run()
+    assert results['mean_time_in_system'].tolist() == [3600.0, 7200.0]
+    assert not results['cached'].any()
+    results = Experiment(name='more_lead_times',
+                         model_factory=model_factory,
+                         grid={'main_type.lead_time': [2, 3]},
+                         cache=cache).run()
+    assert results['cached'].tolist() == [True, False]
+    assert results['mean_time_in_system'].tolist() == [7200.0, 10800.0]
+
+
+def test_cache_is_bounded(tmp_path):
+    cache = ResultCache(directory=str(tmp_path), max_bytes=1000)
+    for key in range(10):
+        cache.put(str(key), {'payload': 'x'*300})
+    assert cache.size <= 1000
+    assert '9' in cache
+    assert '0' not in cache
+
+
+def test_sweep_material_boms():
+    model = configured_model(create_ledger_model, {'mat_1.bom.mat_a': 3})
+    assert model.ledger.bom('mat_1') == {'mat_a': 3, 'mat_b': 2}
+    assert fingerprint(model) != fingerprint(create_ledger_model())
+    with pytest.raises(AttributeError):
+        apply_parameters(model, {'settings.values.size': 2}, objects=settings_objects)
+    results = Experiment(name='boms',
+                         model_factory=create_ledger_model,
+                         grid={'mat_1.bom.mat_b': [2, 5]},
+                         objects=settings_objects).run()
+    assert results['fingerprint'].nunique() == 2
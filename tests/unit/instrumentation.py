@@ -0,0 +1,26 @@
+from tepuy.instrumentation import EventProfiler, CProfileHook
+from models import create_line_model
+
+
+def create_model(hooks):
+    return create_line_model(name='instrumented', hooks=hooks)
+
+
+def test_event_profiler():
+    profiler = EventProfiler(sample_every=1)
+    model = create_model(hooks=[profiler])
+    model.run()
+    report = profiler.to_dict()
+    assert report['events_processed'] == model.summary()['events_processed'] == 12
+    assert report['events']['created_entity']['count'] == 3
+    assert report['events']['on_exited_wo_creator_output_node']['count'] == 3
+    assert report['events']['on_entered_wo_destructor_input_node']['count'] == 3
+    assert report['processes']['EmptyProcess']['count'] == 12
+    assert profiler.calendar_dataframe()['calendar_length'].iloc[0] == 2
+    assert set(profiler.to_dataframe().index) == set(report['events'])
+
+
+def test_cprofile_hook():
+    hook = CProfileHook()
+    create_model(hooks=[hook]).run()
+    assert hook.stats().total_calls > 0
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from tepuy.ledger import MaterialLedger
+from tepuy.processes import Material, SimProcess
+
+
+def create_ledger():
+    ledger = MaterialLedger(initial_capacity=2)
+    ledger.add_material(name='mat_a', quantity=30)
+    ledger.add_material(name='mat_b', quantity=40)
+    ledger.add_material(name='sub_1', quantity=2, bom={'mat_a': 1, 'mat_b': 2})
+    ledger.add_material(name='mat_1', bom={'sub_1': 2, 'mat_b': 5})
+    return ledger
+
+
+def test_multi_level_explosion():
+    ledger = create_ledger()
+    total = ledger.requirements({'mat_1': 3}, explosion='total')
+    assert dict(zip(ledger.names, total.tolist())) == {'mat_a': 6.0, 'mat_b': 27.0, 'sub_1': 6.0, 'mat_1': 0.0}
+    leaf = ledger.requirements({'mat_1': 3}, explosion='leaf')
+    assert dict(zip(ledger.names, leaf.tolist())) == {'mat_a': 6.0, 'mat_b': 27.0, 'sub_1': 0.0, 'mat_1': 0.0}
+
+
+def test_produce_and_shortages():
+    ledger = create_ledger()
+    ledger.produce({'mat_1': 1})
+    assert ledger.inventory.tolist() == [30.0, 35.0, 0.0, 1.0]
+    with pytest.raises(ValueError):
+        ledger.produce({'mat_1': 1})
+    assert ledger.inventory.tolist() == [30.0, 35.0, 0.0, 1.0]
+    ledger.produce({'mat_1': 2}, explosion='leaf')
+    assert ledger.inventory.tolist() == [26.0, 17.0, 0.0, 3.0]
+    shortages = ledger.shortages(ledger.requirements({'mat_1': 2}, explosion='leaf'))
+    assert shortages.tolist() == [0.0, 1.0, 0.0, 0.0]
+
+
+def test_shortages_by_order():
+    ledger = create_ledger()
+    short = ledger.shortages_by_order(['sub_1', 'sub_1', 'mat_a', 'sub_1'], [10, 10, 1, 5])
+    assert short.tolist() == [False, False, False, True]
+
+
+def test_cyclic_bom():
+    ledger = create_ledger()
+    ledger.set_bom('mat_a', {'mat_1': 1})
+    with pytest.raises(ValueError):
+        ledger.requirements({'mat_1': 1})
+
+
+def test_material_view():
+    ledger = MaterialLedger()
+    mat_a = Material(name='mat_a', quantity=30, unit='kg', bom=None, ledger=ledger)
+    mat_1 = Material(name='mat_1', quantity=0, unit='unit', bom={mat_a: 2}, ledger=ledger)
+    SimProcess.produce_step(material=mat_1, quantity=4)
+    assert mat_1.quantity == 4
+    assert mat_a.quantity == 22
+    SimProcess.consume_step(material=mat_a, quantity=2)
+    assert ledger.quantity('mat_a') == 20
+    assert mat_1.bom == {'mat_a': 2.0}
+    mat_a.quantity = 5
+    assert np.array_equal(ledger.inventory, [5.0, 4.0])
+    with pytest.raises(ValueError):
+        mat_a.quantity = -1
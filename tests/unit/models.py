@@ -0,0 +1,56 @@
+import pandas as pd
+from tepuy.distributions import Exponential
+from tepuy.intelligent_objects import Creator, MainSimModel, Destructor, Path, SimNode
+from tepuy.processes import DelayProcess
+
+
+def create_line_model(orders: int = 3,
+                      lead_times: tuple = (1,),
+                      durations: tuple = (),
+                      frequency: str = 'h',
+                      arrival_type: str = 'arrival_table',
+                      bypass: bool = False,
+                      name: str = 'line',
+                      **model_kwargs):
+    """
+    Model shared by the unit tests: a creator, one station node per duration and a destructor, connected by
+    paths with lead_times, in hours. Orders arrive every frequency from 2021-09-30 15:00.
+    :param durations: duration, in hours, of the DelayProcess of every station, None for stations without process.
+    :param arrival_type: 'arrival_table', 'stream', or 'rate' for exponential inter-arrival times of 0.4 hours.
+    :param bypass: adds a path from the last station straight to the destructor.
+    :param model_kwargs: passed to MainSimModel, e.g. hooks, history, seed or solver.
+    """
+    work_orders = pd.DataFrame({'order_date': pd.date_range('2021-09-30 15:00:00', periods=orders, freq=frequency)})
+    source = Creator(name='wo_creator',
+                     position=(1, 1),
+                     arrival_type=arrival_type,
+                     arrival_rate=Exponential(0.4) if arrival_type == 'rate' else None,
+                     arrival_table=None if arrival_type == 'rate' else work_orders,
+                     datetime_column='order_date',
+                     name_column=None,
+                     seed=3,
+                     max_arrivals=orders)
+    stations = [SimNode(name=f'station_{idx}',
+                        position=(idx + 2, 1),
+                        entry_process=None if duration is None else DelayProcess(name=f'station_{idx}_delay',
+                                                                                 duration=duration))
+                for idx, duration in enumerate(durations)]
+    sink = Destructor(name='wo_destructor', position=(len(durations) + 2, 1))
+    nodes = [source.output_node] + stations + [sink.input_node]
+    paths = [Path(name='main_type' if idx == 0 else f'path_{idx}',
+                  path_type='path_time',
+                  node_from=node_from,
+                  node_to=node_to,
+                  lead_time=lead_time)
+             for idx, (node_from, node_to, lead_time) in enumerate(zip(nodes[:-1], nodes[1:], lead_times))]
+    model_network = {'start': {'next': source}}
+    for path in paths:
+        model_network[path.node_from] = {'next': path.node_to, 'path': path}
+    if bypass:
+        bypass_path = Path(name='bypass', path_type='path_time', node_from=stations[-1], node_to=sink.input_node,
+                           lead_time=lead_times[-1])
+        model_network[stations[-1]] = {'paths': [paths[-1], bypass_path]}
+    return MainSimModel(name=name,
+                        start_date=pd.to_datetime('2021-09-30 15:00:00'),
+                        model_network=model_network,
+                        **model_kwargs)
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+from tepuy.clock import SimClock
+from tepuy.intelligent_objects import Creator, MainSimModel, Destructor, Path
+from tepuy.ledger import MaterialLedger
+from tepuy.mrp import ShortageProjector
+from tepuy.processes import SimEvent
+
+
+def create_scenario(orders=40):
+    work_orders = pd.DataFrame({'order_date': pd.date_range('2021-09-30 15:00:00', periods=orders, freq='h'),
+                                'material': ['mat_1', 'mat_2']*(orders//2)})
+    ledger = MaterialLedger()
+    ledger.add_material(name='mat_a', quantity=30)
+    ledger.add_material(name='mat_b', quantity=40)
+    ledger.add_material(name='mat_1', bom={'mat_a': 2, 'mat_b': 5})
+    ledger.add_material(name='mat_2', bom={'mat_a': 4, 'mat_b': 3})
+    clock = SimClock(start_date=pd.to_datetime('2021-09-30 15:00:00'))
+    projector = ShortageProjector(ledger=ledger, horizon=orders*3600.0)
+    projector.add_orders_from_table(work_orders, clock=clock, datetime_column='order_date',
+                                    material_column='material')
+    return work_orders, ledger, projector
+
+
+def brute_force_first_shortage(work_orders, ledger, material, receipts=()):
+    stock = ledger.quantity(material)
+    events = [(hour*3600.0, ledger.bom(row).get(material, 0)) for hour, row in enumerate(work_orders['material'])]
+    events += [(date, -quantity) for date, quantity in receipts]
+    for date, demand in sorted(events):
+        stock -= demand
+        if stock < 0:
+            return date
+    return None
+
+
+def test_first_shortage_matches_brute_force():
+    work_orders, ledger, projector = create_scenario()
+    assert projector.first_shortage('mat_a') == brute_force_first_shortage(work_orders, ledger, 'mat_a')
+    assert projector.first_shortage('mat_b') == brute_force_first_shortage(work_orders, ledger, 'mat_b')
+    projector.add_receipt('mat_b', quantity=50, date=3*3600.0)
+    assert projector.first_shortage('mat_b') == \
+        brute_force_first_shortage(work_orders, ledger, 'mat_b', receipts=[(3*3600.0, 50)])
+    shortages = projector.first_shortages()
+    assert shortages['mat_b'] == projector.first_shortage('mat_b')
+    assert np.isnan(shortages['mat_1'])
+
+
+def test_consumed_orders_leave_the_projection():
+    work_orders, ledger, projector = create_scenario()
+    assert projector.projected_stock('mat_a', date=1*3600.0) == 24.0
+    projector.consume_order('entity_0')
+    ledger.consume({'mat_a': 2, 'mat_b': 5})
+    assert projector.projected_stock('mat_a', date=1*3600.0) == 24.0
+    assert projector.pending_orders == 39
+
+
+def test_projector_as_hook():
+    work_orders, ledger, projector = create_scenario(orders=4)
+    source = Creator(name='wo_creator',
+                     position=(1, 1),
+                     arrival_type='arrival_table',
+                     arrival_rate=None,
+                     arrival_table=work_orders,
+                     datetime_column='order_date',
+                     name_column=None)
+    sink = Destructor(name='wo_destructor', position=(2, 1))
+    path = Path(name='main_type', path_type='path_time', node_from=source.output_node,
+                node_to=sink.input_node, lead_time=1)
+    model = MainSimModel(name='mrp', start_date=pd.to_datetime('2021-09-30 15:00:00'),
+                         model_network={'start': {'next': source},
+                                        source.output_node: {'next': sink.input_node, 'path': path}},
+                         hooks=[projector])
+    assert projector.pending_orders == 4
+    model.run()
+    assert projector.pending_orders == 0
+
+
+def test_projection_follows_the_ledger():
+    work_orders, ledger, projector = create_scenario()
+    ledger.add_material(name='mat_c', quantity=10)
+    ledger.set_bom('mat_2', {'mat_a': 4, 'mat_b': 3, 'mat_c': 1})
+    assert projector.first_shortage('mat_c') == brute_force_first_shortage(work_orders, ledger, 'mat_c')
+    assert projector.first_shortage('mat_b') == brute_force_first_shortage(work_orders, ledger, 'mat_b')
+    shortages = projector.first_shortages()
+    assert shortages['mat_c'] == projector.first_shortage('mat_c')
+    ledger.add_material(name='mat_3', bom={'mat_c': 2})
+    projector.add_order('extra', material='mat_3', quantity=1, date=0.0)
+    assert projector.projected_stock('mat_c', date=0.0) == 8.0
+
+
+def test_calendar_receipts_are_projected():
+    work_orders, ledger, projector = create_scenario(orders=4)
+    source = Creator(name='wo_creator',
+                     position=(1, 1),
+                     arrival_type='arrival_table',
+                     arrival_rate=None,
+                     arrival_table=work_orders,
+                     datetime_column='order_date',
+                     name_column=None)
+    sink = Destructor(name='wo_destructor', position=(2, 1))
+    path = Path(name='main_type', path_type='path_time', node_from=source.output_node,
+                node_to=sink.input_node, lead_time=1)
+    model = MainSimModel(name='mrp', start_date=pd.to_datetime('2021-09-30 15:00:00'),
+                         model_network={'start': {'next': source},
+                                        source.output_node: {'next': sink.input_node, 'path': path}},
+                         hooks=[projector])
+    model.actions.add_entity(SimEvent(start_date=0.0, end_date=1800.0, event_name='received_material',
+                                      action=ledger.receive, action_args=({'mat_b': 50},)))
+    projector.schedule_receipt(model.actions, {'mat_a': 10}, date=5400.0)
+    assert projector.first_shortage('mat_a') == \
+        brute_force_first_shortage(work_orders, ledger, 'mat_a', receipts=[(5400.0, 10)])
+    projector.add_receipts_from_calendar(model.actions)
+    assert projector.pending_receipts == 2
+    assert projector.first_shortage('mat_b') == \
+        brute_force_first_shortage(work_orders, ledger, 'mat_b', receipts=[(1800.0, 50)])
+    model.run()
+    assert projector.pending_receipts == 0
+    assert projector.pending_orders == 0
+    assert ledger.quantity('mat_b') == 90
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from tepuy.intelligent_objects import Creator, MainSimModel, Destructor, Path, SimNode
+from tepuy.network import Network, alias_table
+
+
+def create_branching_model(routing='weighted', orders=400):
+    work_orders = pd.DataFrame({'order_date': pd.date_range('2021-09-30 15:00:00', periods=orders, freq='min')})
+    source = Creator(name='wo_creator',
+                     position=(1, 1),
+                     arrival_type='arrival_table',
+                     arrival_rate=None,
+                     arrival_table=work_orders,
+                     datetime_column='order_date',
+                     name_column=None)
+    middle = SimNode(name='middle', position=(2, 1), capacity=orders)
+    fast_sink = Destructor(name='fast_sink', position=(3, 1))
+    slow_sink = Destructor(name='slow_sink', position=(3, 2))
+    to_middle = Path(name='to_middle', path_type='path_time', node_from=source.output_node, node_to=middle,
+                     lead_time=1)
+    to_fast = Path(name='to_fast', path_type='path_time', node_from=middle, node_to=fast_sink.input_node,
+                   lead_time=1, weight=1.0)
+    to_slow = Path(name='to_slow', path_type='path_time', node_from=middle, node_to=slow_sink.input_node,
+                   lead_time=5, weight=3.0)
+    model = MainSimModel(name='branching', start_date=pd.to_datetime('2021-09-30 15:00:00'),
+                         model_network={'start': {'next': source},
+                                        source.output_node: {'next': middle, 'path': to_middle},
+                                        middle: {'paths': [to_fast, to_slow]}},
+                         routing=routing,
+                         seed=7)
+    return model, fast_sink, slow_sink
+
+
+def test_alias_table_matches_weights():
+    weights = np.array([1.0, 2.0, 3.0, 4.0])
+    probability, alias = alias_table(weights)
+    implied = probability.copy()
+    for idx in range(len(weights)):
+        implied[alias[idx]] += 1.0 - probability[idx]
+    assert np.allclose(implied/len(weights), weights/weights.sum())
+
+
+def test_weighted_branching():
+    model, fast_sink, slow_sink = create_branching_model()
+    model.run()
+    assert fast_sink.destroyed_count + slow_sink.destroyed_count == 400
+    assert 0.65 < slow_sink.destroyed_count/400 < 0.85
+    assert model.summary()['entities_destroyed'] == 400
+
+
+def test_shortest_routing():
+    model, fast_sink, slow_sink = create_branching_model(routing='shortest', orders=10)
+    model.run()
+    assert fast_sink.destroyed_count == 10
+    assert slow_sink.destroyed_count == 0
+    network = model.compiled_network
+    source_node = network.creators[0].output_node
+    assert network.shortest_lead_time(source_node, slow_sink.input_node) == 6*3600.0
+    assert [path.name for path in network.shortest_route(source_node, fast_sink.input_node)] == \
+        ['to_middle', 'to_fast']
+
+
+def test_csr_arrays():
+    model, fast_sink, slow_sink = create_branching_model()
+    network = Network(model_network=model.network)
+    middle_id = model.network_objects()['middle'].node_id
+    begin, end = network.indptr[middle_id], network.indptr[middle_id + 1]
+    assert end - begin == 2
+    assert network.weights[begin:end].tolist() == [1.0, 3.0]
+    assert network.lead_times[begin:end].tolist() == [3600.0, 5*3600.0]
+    assert len(network.destructor_ids) == 2
+
+
+def test_routes_are_built_for_shortest_routing_only():
+    model, fast_sink, slow_sink = create_branching_model(routing='shortest', orders=10)
+    network = model.compile_network()
+    middle = model.network_objects()['middle']
+    assert network.destructor_distances[network.creators[0].output_node.node_id] == 2*3600.0
+    assert network.destructor_distances[middle.node_id] == 3600.0
+    model, fast_sink, slow_sink = create_branching_model(orders=10)
+    assert np.isinf(model.compile_network().destructor_distances).all()
+
+
+def test_solver_fallback_compiles_once(monkeypatch):
+    compiled = list()
+    compile_network = Network.compile
+    monkeypatch.setattr(Network, 'compile', lambda network: compiled.append(network) or compile_network(network))
+    model, fast_sink, slow_sink = create_branching_model(orders=10)
+    model.run()
+    assert len(compiled) == 1
+    assert fast_sink.destroyed_count + slow_sink.destroyed_count == 10
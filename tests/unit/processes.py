@@ -0,0 +1,82 @@
+import pytest
+from tepuy.distributions import Exponential
+from tepuy.intelligent_objects import Entity
+from tepuy.processes import SimEvent, DelayProcess, EmptyProcess, compile_action_string
+from models import create_line_model
+
+
+def test_callable_action():
+    received = dict()
+    event = SimEvent(start_date=0.0,
+                     end_date=0.0,
+                     event_name='callable',
+                     action=received.update,
+                     action_kwargs={'value': 1})
+    event.run_action()
+    assert received == {'value': 1}
+
+
+def test_action_string_is_compiled_once():
+    received = list()
+    compile_action_string.cache_clear()
+    for value in range(3):
+        event = SimEvent(start_date=0.0,
+                         end_date=0.0,
+                         event_name='string',
+                         object_dictionary={'received': received, 'value': value},
+                         action_string='received.append(value)')
+        event.run_action()
+    assert received == [0, 1, 2]
+    assert compile_action_string.cache_info().misses == 1
+
+
+def test_events_have_no_instance_dict():
+    event = SimEvent(start_date=0.0, end_date=0.0, event_name='compact')
+    assert not hasattr(event, '__dict__')
+
+
+def test_delay_step():
+    entity = Entity(name='entity_0')
+    process = EmptyProcess(name='drill', associated_object=entity, context_object=None)
+    event = process.delay_step(duration=2, unit='minutes', start_date=10.0)
+    assert event.end_date == 130.0
+    assert entity.available_date == 130.0
+    with pytest.raises(ValueError):
+        process.delay_step(duration=2, unit='weeks', start_date=0.0)
+
+
+def test_random_delays_are_reproducible():
+    durations = list()
+    for _ in range(2):
+        process = EmptyProcess(name='drill', associated_object=Entity(name='entity_0'), context_object=None)
+        process.seed_streams(3)
+        durations.append([process.delay_step(duration=Exponential(1.0), unit='hours', start_date=0.0).end_date
+                          for _ in range(3)])
+    assert durations[0] == durations[1]
+    assert len(set(durations[0])) == 3
+
+
+def test_processes_keep_their_own_streams():
+    first, second = DelayProcess(name='drill', duration=Exponential(1.0)), DelayProcess(name='drill',
+                                                                                      duration=Exponential(1.0))
+    first.seed_streams(3)
+    second.seed_streams(3)
+    first_delays = [first.run_process(entity=Entity(name='entity_0')).end_date for _ in range(3)]
+    assert [second.run_process(entity=Entity(name='entity_1')).end_date for _ in range(3)] == first_delays
+    first.seed_streams(4)
+    assert first.run_process(entity=Entity(name='entity_0')).end_date != first_delays[0]
+
+
+def test_models_do_not_share_random_streams():
+    def create_model():
+        return create_line_model(orders=20, lead_times=(1, 1), durations=(Exponential(0.5),), frequency='15min',
+                                 seed=3, solver='events')
+
+    alone = create_model()
+    alone.run()
+    first, second = create_model(), create_model()
+    for model in [first, second]:
+        model.run(until=2*3600.0)
+    second.run()
+    first.run()
+    assert first.summary() == second.summary() == alone.summary()
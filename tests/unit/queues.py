@@ -0,0 +1,103 @@
+import pytest
+from tepuy.queues import HeapQueue, SortedQueue
+
+
+class Item:
+    def __init__(self, name, end_date, priority=0):
+        self.name = name
+        self.end_date = end_date
+        self.priority = priority
+
+
+def test_smallest_policy_is_fifo_on_ties():
+    queue = HeapQueue(name='calendar')
+    for name, end_date in [('a', 3), ('b', 1), ('c', 3), ('d', 1), ('e', 2)]:
+        queue.add_entity(Item(name, end_date))
+    assert queue.print_content_names() == ['b', 'd', 'e', 'a', 'c']
+    assert [queue.pop().name for _ in range(queue.length)] == ['b', 'd', 'e', 'a', 'c']
+
+
+def test_greatest_policy():
+    queue = HeapQueue(name='calendar', sorting_policy='greatest')
+    for name, end_date in [('a', 3), ('b', 1), ('c', 3)]:
+        queue.add_entity(Item(name, end_date))
+    assert [queue.pop().name for _ in range(queue.length)] == ['a', 'c', 'b']
+
+
+def test_invalid_policy():
+    with pytest.raises(NotImplementedError):
+        HeapQueue(name='calendar', sorting_policy='random')
+
+
+def test_bulk_insert_keeps_fifo_ties():
+    queue = HeapQueue(name='calendar')
+    queue.add_entity(Item('a', 2))
+    queue.add_entities([Item('b', 1), Item('c', 2), Item('d', 1)])
+    assert [queue.pop().name for _ in range(queue.length)] == ['b', 'd', 'a', 'c']
+
+
+def test_cancel_and_reschedule():
+    queue = HeapQueue(name='calendar')
+    handles = queue.add_entities([Item(name, end_date) for name, end_date in [('a', 1), ('b', 2), ('c', 3)]])
+    timeout = queue.add_entity(Item('timeout', 4))
+    assert handles[0].cancel()
+    assert not handles[0].cancel()
+    assert queue.length == 3
+    handles[2].reschedule(0.5)
+    assert handles[2].item.end_date == 0.5
+    assert queue.print_content_names() == ['c', 'b', 'timeout']
+    assert queue.peek().name == 'c'
+    assert queue.pop().name == 'c'
+    assert not handles[2].cancel()
+    timeout.reschedule(2)
+    assert [queue.pop().name for _ in range(queue.length)] == ['b', 'timeout']
+    assert queue.length == 0
+
+
+def test_tombstones_are_compacted():
+    queue = HeapQueue(name='calendar', compaction_ratio=0.5)
+    handles = queue.add_entities([Item(f'item_{idx}', idx) for idx in range(100)])
+    for handle in handles[:50]:
+        handle.cancel()
+    assert queue.tombstones == 50
+    handles[50].cancel()
+    assert queue.tombstones == 0
+    assert queue.length == 49
+    assert queue.pop().name == 'item_51'
+
+
+def test_sorted_queue_removal_keeps_order():
+    queue = SortedQueue(name='population', chunk_size=2)
+    items = [Item(f'item_{idx}', idx) for idx in range(20)]
+    queue.add_entities(items)
+    for item in items[::3]:
+        queue.remove(item)
+    remaining = [item for idx, item in enumerate(items) if idx % 3]
+    assert queue.content == remaining
+    assert queue[5] is remaining[5]
+    assert queue.pop() is remaining[0]
+    assert queue.length == len(remaining) - 1
+    with pytest.raises(ValueError):
+        queue.remove(items[0])
+
+
+def test_sorted_queue_composite_keys():
+    queue = SortedQueue(name='line', sorting_feature=('priority', 'end_date'),
+                        sorting_policy=('greatest', 'smallest'), chunk_size=2)
+    for name, end_date, priority in [('a', 3, 1), ('b', 1, 0), ('c', 2, 1), ('d', 2, 1), ('e', 0, 2)]:
+        queue.add_entity(Item(name, end_date, priority))
+    assert queue.print_content_names() == ['e', 'c', 'd', 'a', 'b']
+    assert queue.first(lambda item: item.end_date == 3).name == 'a'
+    assert queue.first(lambda item: item.end_date > 5) is None
+    assert [item.name for item in queue.filter(lambda item: item.priority == 1)] == ['c', 'd', 'a']
+    queue.sort_by('end_date')
+    assert queue.print_content_names() == ['e', 'b', 'c', 'd', 'a']
+
+
+def test_reschedule_needs_a_new_value():
+    queue = HeapQueue(name='calendar')
+    handle = queue.add_entity(Item('a', 1))
+    with pytest.raises(ValueError):
+        handle.reschedule()
+    assert handle.pending
+    assert queue.pop().name == 'a'
@@ -0,0 +1,35 @@
+from tepuy.distributions import Exponential
+from tepuy.replications import run_replications, run_replication, ReplicationResults
+from models import create_line_model
+
+
+def model_factory(lead_time):
+    return create_line_model(lead_times=(lead_time,), name='replication')
+
+
+def test_replications_are_summarized():
+    results = run_replications(model_factory=model_factory, parameters=[1, 2, 3], max_workers=2)
+    assert [summary['parameters'] for summary in results.summaries] == [1, 2, 3]
+    assert [summary['mean_time_in_system'] for summary in results.summaries] == [3600.0, 7200.0, 10800.0]
+    aggregated = results.aggregate()
+    assert aggregated.loc['mean_time_in_system', 'mean'] == 7200.0
+    assert aggregated.loc['entities_destroyed', 'ci_low'] == 3
+
+
+def random_lead_time_factory(mean_lead_time, seed):
+    model = model_factory(Exponential(mean=mean_lead_time))
+    model.seed = seed
+    return model
+
+
+def test_common_random_numbers():
+    results = dict()
+    for mean_lead_time in [1.0, 1.5]:
+        results[mean_lead_time] = ReplicationResults(summaries=[
+            run_replication(lambda seed: random_lead_time_factory(mean_lead_time, seed), seed)
+            for seed in range(5)])
+    times = results[1.0].to_dataframe()['mean_time_in_system']
+    assert times.nunique() == 5
+    # Both configurations draw the same uniforms, lead times only differ by their scale.
+    differences = results[1.5].paired_differences(results[1.0])
+    assert abs(differences.loc['mean_time_in_system', 'mean'] - 0.5*times.mean()) < 1e-6
@@ -0,0 +1,75 @@
+import pytest
+from tepuy.intelligent_objects import Resource, Entity
+from tepuy.processes import EmptyProcess, SimProcess
+from tepuy.queues import HeapQueue
+
+
+def test_multi_unit_seize_and_wake_up():
+    resource = Resource(name='forklift', capacity=2)
+    actions = HeapQueue(name='actions')
+    entities = [Entity(name=f'entity_{idx}') for idx in range(4)]
+    granted = list()
+    assert resource.seize(entities[0], date=0.0)
+    assert resource.seize(entities[1], date=0.0)
+    assert resource.seized
+    assert not resource.seize(entities[2], date=10.0, on_granted=lambda entity, date: granted.append(entity))
+    assert not resource.seize(entities[3], date=20.0, on_granted=lambda entity, date: granted.append(entity))
+    assert resource.release(date=30.0, actions=actions, holder=entities[0]) == [entities[2]]
+    assert actions.length == 1
+    wake_up = actions.pop()
+    assert wake_up.name == 'seized_forklift'
+    assert (wake_up.start_date, wake_up.end_date) == (10.0, 30.0)
+    wake_up.run_action()
+    assert granted == [entities[2]]
+    assert resource.holders == {entities[1]: 1, entities[2]: 1}
+    assert resource.utilization(date=40.0) == 1.0
+    assert resource.mean_queue_length(date=40.0) == (10.0 + 2*10.0 + 10.0)/40.0
+    assert resource.mean_wait_time == 20.0/3
+
+
+def test_priority_waiting_line():
+    resource = Resource(name='crane', sorting_feature='creation_date', sorting_policy='greatest')
+    first, old, new = Entity(name='first'), Entity(name='old', creation_date=1.0), Entity(name='new',
+                                                                                         creation_date=5.0)
+    resource.seize(first, date=0.0)
+    resource.seize(old, date=1.0)
+    resource.seize(new, date=2.0)
+    assert resource.release(date=3.0) == [new]
+    assert resource.owner is new
+    with pytest.raises(ValueError):
+        resource.release(date=4.0, holder=first)
+
+
+def test_process_steps():
+    resource = Resource(name='press')
+    entity = Entity(name='entity_0')
+    process = EmptyProcess(name='press_process', associated_object=entity, context_object=None)
+    assert process.seize_step(resource, date=0.0)
+    assert resource.owner is entity
+    process.release_step(resource, date=5.0)
+    assert resource.owner is None
+    assert resource.busy_time == 5.0
+
+
+class PressProcess(SimProcess):
+    def __init__(self, resource: Resource):
+        super().__init__(name='press_process', associated_object=None, context_object=None)
+        self.__resource = resource
+
+    def run_process(self, entity=None, actions=None, date: float = 0.0, release: bool = False, **kwargs):
+        if release:
+            return self.release_step(self.__resource, date=date, actions=actions, holder=entity)
+        return self.seize_step(self.__resource, date=date, requester=entity)
+
+
+def test_shared_process_seizes_for_its_entity():
+    resource = Resource(name='press')
+    actions = HeapQueue(name='actions')
+    process = PressProcess(resource)
+    first, second = Entity(name='entity_0'), Entity(name='entity_1')
+    assert process.run_process(entity=first, date=0.0)
+    assert not process.run_process(entity=second, date=1.0)
+    assert resource.owner is first
+    assert process.run_process(entity=first, actions=actions, date=4.0, release=True) == [second]
+    assert resource.holders == {second: 1}
+    assert process.associated_object is None
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from tepuy.results import TraceReader
+from tepuy.trace import TraceRecorder
+from models import create_line_model
+
+
+def run_traced_model(path):
+    model = create_line_model(orders=4, lead_times=(2,), name='traced',
+                              history=TraceRecorder(path=path, chunk_size=4))
+    model.run()
+    return model
+
+
+def test_kpis_over_memory_mapped_trace(tmp_path):
+    path = str(tmp_path / 'trace.bin')
+    run_traced_model(path)
+    reader = TraceReader.open(path, chunk_rows=3)
+    assert reader.length == 16
+    assert reader.horizon == (0.0, 5*3600.0)
+    cycle_times = reader.cycle_times()
+    assert len(cycle_times) == 4
+    assert (cycle_times['cycle_time'] == 2*3600.0).all()
+    assert reader.throughput(bin_seconds=3600.0)['throughput'].tolist() == [0, 0, 1, 1, 2]
+    assert reader.work_in_process()['work_in_process'].max() == 2
+    assert reader.queue_length('wo_creator_output_node')['queue_length'].max() == 0
+    assert reader.node_utilization().loc['wo_destructor_input_node', 'capacity'] == 1
+
+
+def test_kpis_from_recorder_match_memory_map(tmp_path):
+    path = str(tmp_path / 'trace.bin')
+    model = run_traced_model(path)
+    reader = TraceReader.open(path)
+    assert all(isinstance(column, np.memmap) for column in reader.columns.values())
+    from_recorder = TraceReader.from_recorder(model.history)
+    pd.testing.assert_frame_equal(reader.cycle_times(), from_recorder.cycle_times())
+
+
+def test_window_is_a_view(tmp_path):
+    path = str(tmp_path / 'trace.bin')
+    run_traced_model(path)
+    reader = TraceReader.open(path)
+    window = reader.window(start=3600.0, end=2*3600.0)
+    assert window.columns['end'].base is not None
+    assert (window.columns['end'] >= 3600.0).all()
+    assert (window.columns['end'] < 2*3600.0).all()
+    assert window.length == 2
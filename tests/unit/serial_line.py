@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from tepuy.distributions import Gamma
+from tepuy.processes import SimEvent
+from tepuy.serial_line import lindley_departures
+from models import create_line_model
+
+
+def create_serial_line(solver, arrival_type='arrival_table', orders=500, bypass=False):
+    return create_line_model(orders=orders,
+                             lead_times=(0.5, 0, 0.25, 1),
+                             durations=(Gamma(2, 0.15), 1/3, None),
+                             frequency='20min',
+                             arrival_type=arrival_type,
+                             bypass=bypass,
+                             name='serial',
+                             seed=9,
+                             solver=solver)
+
+
+def test_lindley_departures_match_recursion():
+    rng = np.random.default_rng(1)
+    arrivals = np.cumsum(rng.exponential(1.0, 200))
+    services = rng.exponential(0.9, 200)
+    expected = np.empty(200)
+    last = -np.inf
+    for idx in range(200):
+        last = max(arrivals[idx], last) + services[idx]
+        expected[idx] = last
+    assert np.allclose(lindley_departures(arrivals, services), expected)
+    assert np.allclose(lindley_departures(arrivals, 0.0), arrivals)
+
+
+@pytest.mark.parametrize('arrival_type', ['arrival_table', 'stream', 'rate'])
+def test_serial_line_matches_event_loop(arrival_type):
+    events_model = create_serial_line(solver='events', arrival_type=arrival_type)
+    events_model.run()
+    line_model = create_serial_line(solver='serial_line', arrival_type=arrival_type)
+    line_model.run()
+    events_summary, line_summary = events_model.summary(), line_model.summary()
+    assert line_summary['entities_destroyed'] == events_summary['entities_destroyed'] == 500
+    assert line_summary['events_processed'] == 0
+    for key in ['end_time', 'mean_time_in_system', 'std_time_in_system']:
+        assert np.isclose(line_summary[key], events_summary[key])
+    # Orders wait: the time in system is above the 2.4 hours of lead and mean process times.
+    assert events_summary['mean_time_in_system'] > 3*3600
+
+
+def test_auto_solver_falls_back_to_event_loop():
+    model = create_serial_line(solver='auto', bypass=True)
+    model.run()
+    assert model.summary()['entities_destroyed'] == 500
+    with pytest.raises(ValueError):
+        create_serial_line(solver='serial_line', bypass=True).run()
+
+
+def test_scheduled_events_run_under_the_default_solver():
+    model = create_line_model(orders=5)
+    ran = list()
+    model.actions.add_entity(SimEvent(start_date=0.0, end_date=1800.0, event_name='breakdown', action=ran.append,
+                                      action_args=('breakdown',)))
+    model.run()
+    assert ran == ['breakdown']
+    assert model.actions.length == 0
+    assert model.summary()['entities_destroyed'] == 5
+    assert model.summary()['events_processed'] > 0
+
+
+def test_serial_line_solver_raises_instead_of_falling_back():
+    model = create_serial_line(solver='serial_line', orders=5)
+    model.actions.add_entity(SimEvent(start_date=0.0, end_date=1800.0, event_name='breakdown', action=print))
+    with pytest.raises(ValueError):
+        model.run()
+    with pytest.raises(ValueError):
+        create_serial_line(solver='serial_line', orders=5).run(until=3600.0)
@@ -0,0 +1,53 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from tepuy.trace import TraceRecorder, TRACE_DTYPE, column_path
+from models import create_line_model
+
+
+def create_model(history):
+    return create_line_model(name='traced', history=history)
+
+
+def test_in_memory_trace():
+    model = create_model(history=TraceRecorder(chunk_size=5))
+    model.run()
+    trace = model.history.to_dataframe(clock=model.clock)
+    assert len(trace) == model.history.length == 12
+    assert trace['end'].is_monotonic_increasing
+    created = trace[trace['event'] == 'created_entity']
+    assert created['node'].tolist() == ['wo_creator_output_node']*3
+    assert (created['entity'] >= 0).all()
+    assert trace['start'].iloc[0] == pd.Timestamp('2021-09-30 15:00:00')
+
+
+def test_trace_spills_to_raw_file(tmp_path):
+    path = str(tmp_path / 'trace.bin')
+    model = create_model(history=TraceRecorder(path=path, chunk_size=5))
+    model.run()
+    end_times = np.fromfile(column_path(path, 'end'), dtype=TRACE_DTYPE['end'])
+    assert len(end_times) == 12
+    assert os.path.getsize(column_path(path, 'node')) == 12*TRACE_DTYPE['node'].itemsize
+    with open(f'{path}.json') as metadata_file:
+        metadata = json.load(metadata_file)
+    assert metadata['rows'] == 12
+    assert metadata['destructors'] == [False, True]
+    assert (end_times == model.history.to_numpy()['end']).all()
+    assert (end_times == model.history.to_columns()['end']).all()
+
+
+def test_parquet_trace_of_resumed_run(tmp_path):
+    path = str(tmp_path / 'trace.parquet')
+    model = create_model(history=TraceRecorder(path=path, chunk_size=5, file_format='parquet'))
+    model.run(until=3600)
+    first_segment = model.history.length
+    model.run()
+    model.history.close()
+    records = pd.read_parquet(path)
+    assert 0 < first_segment < len(records) == model.history.length == 12
+    assert records['end'].is_monotonic_increasing
+    assert (records['end'].to_numpy() == model.history.to_numpy()['end']).all()
+    model.history.record(event_name='extra', start_date=0.0, end_date=0.0, entity_id=-1, node=None)
+    model.history.close()
+    assert len(pd.read_parquet(path)) == 13